@@ -0,0 +1,82 @@
+"""add full-text search index for objects and customers
+
+Revision ID: 5b2e7c41a9d0
+Revises: 1e4d4483d8f3
+Create Date: 2025-03-03 10:00:00.000000
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "5b2e7c41a9d0"
+down_revision = "1e4d4483d8f3"
+branch_labels = None
+depends_on = None
+
+# DDL зафиксирован в ревизии: живой install_search_index может измениться вместе со SEARCH_SPECS
+# (fts-таблица, таблица, короткие колонки, длинные тексты)
+SEARCH_SPECS = (
+    ("objects_search", "objects", ("address",), ()),
+    ("customers_search", "customers", ("full_name", "phone"), ("portrait_text",)),
+)
+
+
+def upgrade() -> None:
+    # SQLite: FTS5 (trigram) + триггеры; Postgres: pg_trgm и tsvector GIN-индексы
+    dialect_name = op.get_bind().dialect.name
+
+    if dialect_name == "sqlite":
+        for fts_table, table_name, columns, text_columns in SEARCH_SPECS:
+            cols = ", ".join(columns + text_columns)
+            new_cols = ", ".join(f"NEW.{name}" for name in columns + text_columns)
+            op.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} "
+                f"USING fts5(entity_id UNINDEXED, {cols}, tokenize='trigram')"
+            )
+            op.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {table_name} BEGIN "
+                f"INSERT INTO {fts_table} (entity_id, {cols}) VALUES (NEW.id, {new_cols}); END"
+            )
+            op.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF {cols} ON {table_name} BEGIN "
+                f"DELETE FROM {fts_table} WHERE entity_id = OLD.id; "
+                f"INSERT INTO {fts_table} (entity_id, {cols}) VALUES (NEW.id, {new_cols}); END"
+            )
+            op.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {table_name} BEGIN "
+                f"DELETE FROM {fts_table} WHERE entity_id = OLD.id; END"
+            )
+            # Заполняем индекс существующими строками
+            op.execute(f"DELETE FROM {fts_table}")
+            op.execute(f"INSERT INTO {fts_table} (entity_id, {cols}) SELECT id, {cols} FROM {table_name}")
+
+    elif dialect_name == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for _, table_name, columns, text_columns in SEARCH_SPECS:
+            for name in columns:
+                op.execute(
+                    f"CREATE INDEX IF NOT EXISTS ix_{table_name}_{name}_trgm "
+                    f"ON {table_name} USING gin ({name} gin_trgm_ops)"
+                )
+            if text_columns:
+                document = " || ' ' || ".join(f"coalesce({name}, '')" for name in text_columns)
+                op.execute(
+                    f"CREATE INDEX IF NOT EXISTS ix_{table_name}_fts "
+                    f"ON {table_name} USING gin (to_tsvector('simple'::regconfig, {document}))"
+                )
+
+
+def downgrade() -> None:
+    dialect_name = op.get_bind().dialect.name
+
+    for fts_table, table_name, columns, text_columns in SEARCH_SPECS:
+        if dialect_name == "sqlite":
+            for suffix in ("ai", "au", "ad"):
+                op.execute(f"DROP TRIGGER IF EXISTS {fts_table}_{suffix}")
+            op.execute(f"DROP TABLE IF EXISTS {fts_table}")
+        elif dialect_name == "postgresql":
+            for name in columns:
+                op.execute(f"DROP INDEX IF EXISTS ix_{table_name}_{name}_trgm")
+            if text_columns:
+                op.execute(f"DROP INDEX IF EXISTS ix_{table_name}_fts")
@@ -0,0 +1,26 @@
+"""add report cache fingerprint
+
+Revision ID: a3c9e5d71b48
+Revises: e7b1f3a9c260
+Create Date: 2025-04-21 10:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a3c9e5d71b48"
+down_revision = "e7b1f3a9c260"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("report_jobs", sa.Column("fingerprint", sa.String(length=64), nullable=True))
+    op.create_index("ix_change_log_table_seq", "change_log", ["table_name", "seq"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_change_log_table_seq", table_name="change_log")
+    op.drop_column("report_jobs", "fingerprint")
@@ -0,0 +1,25 @@
+"""add change log changed columns
+
+Revision ID: a7c3e5f19b24
+Revises: f2a9c4d81e37
+Create Date: 2025-03-31 10:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a7c3e5f19b24"
+down_revision = "f2a9c4d81e37"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Существующие записи остаются с NULL - клиент получит по ним строку целиком
+    op.add_column("change_log", sa.Column("changed_columns", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("change_log", "changed_columns")
@@ -0,0 +1,25 @@
+"""add sync token entity version
+
+Revision ID: b8d2f6a3c915
+Revises: a3c9e5d71b48
+Create Date: 2025-04-28 10:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b8d2f6a3c915"
+down_revision = "a3c9e5d71b48"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Старые токены без версии не дают короткого пути unchanged - повтор идёт обычным путём
+    op.add_column("sync_tokens", sa.Column("entity_version", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("sync_tokens", "entity_version")
@@ -0,0 +1,148 @@
+"""add change log scope
+
+Revision ID: c5d8b2f47a16
+Revises: a7c3e5f19b24
+Create Date: 2025-04-07 10:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c5d8b2f47a16"
+down_revision = "a7c3e5f19b24"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("change_log", sa.Column("city_id", sa.UUID(), nullable=True))
+    op.add_column("change_log", sa.Column("district_id", sa.UUID(), nullable=True))
+    op.add_column("change_log", sa.Column("owner_id", sa.UUID(), nullable=True))
+    op.create_index("ix_change_log_city_seq", "change_log", ["city_id", "seq"])
+    op.create_index("ix_change_log_owner_seq", "change_log", ["owner_id", "seq"])
+
+    # Территория существующих записей - по текущим строкам (удалённые остаются видны всем)
+    op.execute(
+        "UPDATE change_log SET "
+        "city_id = (SELECT city_id FROM objects WHERE objects.id = change_log.entity_id), "
+        "district_id = (SELECT district_id FROM objects WHERE objects.id = change_log.entity_id), "
+        "owner_id = (SELECT responsible_user_id FROM objects WHERE objects.id = change_log.entity_id) "
+        "WHERE table_name = 'objects'"
+    )
+    op.execute(
+        "UPDATE change_log SET "
+        "owner_id = (SELECT engineer_id FROM visits WHERE visits.id = change_log.entity_id) "
+        "WHERE table_name = 'visits'"
+    )
+    op.execute(
+        "UPDATE change_log SET "
+        "city_id = (SELECT objects.city_id FROM customers JOIN objects ON objects.id = customers.object_id "
+        "WHERE customers.id = change_log.entity_id), "
+        "district_id = (SELECT objects.district_id FROM customers JOIN objects ON objects.id = customers.object_id "
+        "WHERE customers.id = change_log.entity_id) "
+        "WHERE table_name = 'customers'"
+    )
+
+    # Tombstone'ы тоже пишут территорию (DDL зафиксирован в ревизии, как и прежние триггеры ниже)
+    bind = op.get_bind()
+    _drop_triggers(bind)
+    _install_scope_triggers(bind)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    _drop_triggers(bind)
+    op.drop_index("ix_change_log_owner_seq", table_name="change_log")
+    op.drop_index("ix_change_log_city_seq", table_name="change_log")
+    op.drop_column("change_log", "owner_id")
+    op.drop_column("change_log", "district_id")
+    op.drop_column("change_log", "city_id")
+    _install_previous_triggers(bind)
+
+
+TABLES = ("objects", "visits", "customers")
+
+
+def _drop_triggers(bind) -> None:
+    for table_name in TABLES:
+        if bind.dialect.name == "sqlite":
+            op.execute(f"DROP TRIGGER IF EXISTS change_log_{table_name}_ad")
+        elif bind.dialect.name == "postgresql":
+            op.execute(f"DROP TRIGGER IF EXISTS change_log_{table_name}_ad ON {table_name}")
+    if bind.dialect.name == "postgresql":
+        op.execute("DROP FUNCTION IF EXISTS change_log_tombstone()")
+
+
+def _install_scope_triggers(bind) -> None:
+    """Триггеры tombstone'ов с территорией и владельцем сущности"""
+    if bind.dialect.name == "sqlite":
+        scopes = {
+            "objects": "OLD.city_id, OLD.district_id, OLD.responsible_user_id",
+            "visits": "NULL, NULL, OLD.engineer_id",
+            "customers": (
+                "(SELECT city_id FROM objects WHERE id = OLD.object_id), "
+                "(SELECT district_id FROM objects WHERE id = OLD.object_id), NULL"
+            ),
+        }
+        for table_name in TABLES:
+            version = "NULL" if table_name == "customers" else "OLD.version"
+            op.execute(
+                f"CREATE TRIGGER change_log_{table_name}_ad AFTER DELETE ON {table_name} BEGIN "
+                f"INSERT INTO change_log (table_name, entity_id, action, version, city_id, district_id, owner_id, changed_at) "
+                f"VALUES ('{table_name}', OLD.id, 'delete', {version}, {scopes[table_name]}, CURRENT_TIMESTAMP); END"
+            )
+    elif bind.dialect.name == "postgresql":
+        op.execute(
+            "CREATE OR REPLACE FUNCTION change_log_tombstone() RETURNS trigger AS $$ "
+            "DECLARE "
+            "old_row jsonb := to_jsonb(OLD); "
+            "scope_city uuid := (old_row ->> 'city_id')::uuid; "
+            "scope_district uuid := (old_row ->> 'district_id')::uuid; "
+            "BEGIN "
+            "PERFORM pg_advisory_xact_lock(1667787879); "
+            "IF TG_TABLE_NAME = 'customers' THEN "
+            "SELECT city_id, district_id INTO scope_city, scope_district "
+            "FROM objects WHERE id = (old_row ->> 'object_id')::uuid; "
+            "END IF; "
+            "INSERT INTO change_log (table_name, entity_id, action, version, city_id, district_id, owner_id, changed_at) "
+            "VALUES (TG_TABLE_NAME, OLD.id, 'delete', (old_row ->> 'version')::integer, scope_city, scope_district, "
+            "COALESCE(old_row ->> 'responsible_user_id', old_row ->> 'engineer_id')::uuid, "
+            "timezone('utc', clock_timestamp())); "
+            "RETURN OLD; "
+            "END; $$ LANGUAGE plpgsql"
+        )
+        for table_name in TABLES:
+            op.execute(
+                f"CREATE TRIGGER change_log_{table_name}_ad AFTER DELETE ON {table_name} "
+                f"FOR EACH ROW EXECUTE FUNCTION change_log_tombstone()"
+            )
+
+
+def _install_previous_triggers(bind) -> None:
+    """Триггеры tombstone'ов ревизии f2a9c4d81e37 (без территории)"""
+    if bind.dialect.name == "sqlite":
+        for table_name in ("objects", "visits", "customers"):
+            version = "NULL" if table_name == "customers" else "OLD.version"
+            op.execute(
+                f"CREATE TRIGGER change_log_{table_name}_ad AFTER DELETE ON {table_name} BEGIN "
+                f"INSERT INTO change_log (table_name, entity_id, action, version, changed_at) "
+                f"VALUES ('{table_name}', OLD.id, 'delete', {version}, CURRENT_TIMESTAMP); END"
+            )
+    elif bind.dialect.name == "postgresql":
+        op.execute(
+            "CREATE OR REPLACE FUNCTION change_log_tombstone() RETURNS trigger AS $$ "
+            "BEGIN "
+            "PERFORM pg_advisory_xact_lock(1667787879); "
+            "INSERT INTO change_log (table_name, entity_id, action, version, changed_at) "
+            "VALUES (TG_TABLE_NAME, OLD.id, 'delete', (to_jsonb(OLD) ->> 'version')::integer, "
+            "timezone('utc', clock_timestamp())); "
+            "RETURN OLD; "
+            "END; $$ LANGUAGE plpgsql"
+        )
+        for table_name in ("objects", "visits", "customers"):
+            op.execute(
+                f"CREATE TRIGGER change_log_{table_name}_ad AFTER DELETE ON {table_name} "
+                f"FOR EACH ROW EXECUTE FUNCTION change_log_tombstone()"
+            )
@@ -0,0 +1,47 @@
+"""add change log
+
+Revision ID: d41a7e9c2b58
+Revises: 8c3f1d27e6b4
+Create Date: 2025-03-17 10:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "d41a7e9c2b58"
+down_revision = "8c3f1d27e6b4"
+branch_labels = None
+depends_on = None
+
+SYNC_TABLES = ("objects", "visits", "customers")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "change_log",
+        sa.Column("seq", sa.BigInteger().with_variant(sa.Integer(), "sqlite"), autoincrement=True, nullable=False),
+        sa.Column("table_name", sa.String(length=50), nullable=False),
+        sa.Column("entity_id", sa.UUID(), nullable=False),
+        sa.Column("action", sa.String(length=10), nullable=False),
+        sa.Column("changed_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("seq"),
+        sqlite_autoincrement=True,
+    )
+    op.create_index("ix_change_log_changed_at", "change_log", ["changed_at"])
+
+    # Существующие записи попадают в журнал в порядке последнего изменения
+    union = " UNION ALL ".join(
+        f"SELECT '{table_name}' AS table_name, id, updated_at FROM {table_name}" for table_name in SYNC_TABLES
+    )
+    op.execute(
+        "INSERT INTO change_log (table_name, entity_id, action, changed_at) "
+        f"SELECT table_name, id, 'update', COALESCE(updated_at, CURRENT_TIMESTAMP) FROM ({union}) AS existing "
+        "ORDER BY updated_at"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_change_log_changed_at", table_name="change_log")
+    op.drop_table("change_log")
@@ -0,0 +1,28 @@
+"""add report job worker fields
+
+Revision ID: e7b1f3a9c260
+Revises: c5d8b2f47a16
+Create Date: 2025-04-14 10:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e7b1f3a9c260"
+down_revision = "c5d8b2f47a16"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("report_jobs", sa.Column("worker_id", sa.String(length=100), nullable=True))
+    op.add_column("report_jobs", sa.Column("heartbeat_at", sa.DateTime(), nullable=True))
+    op.add_column("report_jobs", sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade() -> None:
+    op.drop_column("report_jobs", "attempts")
+    op.drop_column("report_jobs", "heartbeat_at")
+    op.drop_column("report_jobs", "worker_id")
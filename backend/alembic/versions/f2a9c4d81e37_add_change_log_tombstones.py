@@ -0,0 +1,72 @@
+"""add change log tombstones
+
+Revision ID: f2a9c4d81e37
+Revises: d41a7e9c2b58
+Create Date: 2025-03-24 10:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "f2a9c4d81e37"
+down_revision = "d41a7e9c2b58"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("change_log", sa.Column("version", sa.Integer(), nullable=True))
+    op.create_index("ix_change_log_entity", "change_log", ["table_name", "entity_id", "seq"])
+    # AFTER DELETE-триггеры objects/visits/customers пишут tombstone'ы в change_log.
+    # DDL зафиксирован в ревизии: живой install_change_log_triggers пишет колонки более поздних ревизий
+    _install_triggers(op.get_bind())
+
+
+def downgrade() -> None:
+    _drop_triggers(op.get_bind())
+    op.drop_index("ix_change_log_entity", table_name="change_log")
+    op.drop_column("change_log", "version")
+
+
+TABLES = ("objects", "visits", "customers")
+
+
+def _install_triggers(bind) -> None:
+    if bind.dialect.name == "sqlite":
+        for table_name in TABLES:
+            version = "NULL" if table_name == "customers" else "OLD.version"
+            op.execute(f"DROP TRIGGER IF EXISTS change_log_{table_name}_ad")
+            op.execute(
+                f"CREATE TRIGGER change_log_{table_name}_ad AFTER DELETE ON {table_name} BEGIN "
+                f"INSERT INTO change_log (table_name, entity_id, action, version, changed_at) "
+                f"VALUES ('{table_name}', OLD.id, 'delete', {version}, CURRENT_TIMESTAMP); END"
+            )
+    elif bind.dialect.name == "postgresql":
+        op.execute(
+            "CREATE OR REPLACE FUNCTION change_log_tombstone() RETURNS trigger AS $$ "
+            "BEGIN "
+            "PERFORM pg_advisory_xact_lock(1667787879); "
+            "INSERT INTO change_log (table_name, entity_id, action, version, changed_at) "
+            "VALUES (TG_TABLE_NAME, OLD.id, 'delete', (to_jsonb(OLD) ->> 'version')::integer, "
+            "timezone('utc', clock_timestamp())); "
+            "RETURN OLD; "
+            "END; $$ LANGUAGE plpgsql"
+        )
+        for table_name in TABLES:
+            op.execute(f"DROP TRIGGER IF EXISTS change_log_{table_name}_ad ON {table_name}")
+            op.execute(
+                f"CREATE TRIGGER change_log_{table_name}_ad AFTER DELETE ON {table_name} "
+                f"FOR EACH ROW EXECUTE FUNCTION change_log_tombstone()"
+            )
+
+
+def _drop_triggers(bind) -> None:
+    for table_name in TABLES:
+        if bind.dialect.name == "sqlite":
+            op.execute(f"DROP TRIGGER IF EXISTS change_log_{table_name}_ad")
+        elif bind.dialect.name == "postgresql":
+            op.execute(f"DROP TRIGGER IF EXISTS change_log_{table_name}_ad ON {table_name}")
+    if bind.dialect.name == "postgresql":
+        op.execute("DROP FUNCTION IF EXISTS change_log_tombstone()")
@@ -3,12 +3,14 @@ Health и readiness пробы
 """
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, text
+from sqlalchemy import distinct, func, select, text
 from typing import Optional
 
 from app.infrastructure.db.base import get_db
+from app.infrastructure.db.models import ReportJob
 from app.infrastructure.cache.redis_client import get_redis_client
 from app.core.config import settings
+from app.infrastructure.queues.report_queue import REPORT_QUEUE_KEY
 
 router = APIRouter()
 
@@ -55,7 +57,7 @@ async def metrics(
                 try:
                     from redis import Redis
                     r = Redis.from_url(settings.REDIS_URL)
-                    queue_length = r.llen("rq:queue:default")
+                    queue_length = r.llen(REPORT_QUEUE_KEY)
                 except:
                     pass
         except:
@@ -85,8 +87,8 @@ async def metrics(
 
 
 @router.get("/worker/health")
-async def worker_health():
-    """Проверка работоспособности worker (RQ)"""
+async def worker_health(db: AsyncSession = Depends(get_db)):
+    """Проверка работоспособности воркера отчётов"""
     try:
         from redis import Redis
         r = Redis.from_url(settings.REDIS_URL)
@@ -95,11 +97,12 @@ async def worker_health():
         r.ping()
         
         # Длина очереди
-        queue_length = r.llen("rq:queue:default")
+        queue_length = r.llen(REPORT_QUEUE_KEY)
         
-        # Количество воркеров
-        workers = r.smembers("rq:workers")
-        worker_count = len(workers)
+        # Воркеры, выполняющие задачи (свободные воркеры себя не регистрируют)
+        worker_count = await db.scalar(
+            select(func.count(distinct(ReportJob.worker_id))).where(ReportJob.status == "processing")
+        )
         
         return {
             "status": "ok",
@@ -11,6 +11,9 @@ from app.core.security import get_token_payload, get_scopes_from_role
 from app.core.errors import UnauthorizedError, ForbiddenError
 from app.infrastructure.db.base import get_db
 from app.infrastructure.db.models import User, UserRole
+from app.infrastructure.db.repositories.base import LoadProfile
+from app.infrastructure.db.repositories.user_repository import UserRepository
+from app.infrastructure.cache.user_cache import get_cached_user, cache_user
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
@@ -33,8 +36,16 @@ async def get_current_user(
     except ValueError:
         raise UnauthorizedError("Invalid user ID")
     
-    result = await db.execute(select(User).where(User.id == user_uuid))
-    user = result.scalar_one_or_none()
+    user = await get_cached_user(user_uuid)
+    if user is None:
+        result = await db.execute(
+            select(User)
+            .where(User.id == user_uuid)
+            .options(*UserRepository.loader_options(LoadProfile.LEAN))
+        )
+        user = result.scalar_one_or_none()
+        if user:
+            await cache_user(user)
     
     if not user or not user.is_active:
         raise UnauthorizedError("User not found or inactive")
@@ -7,10 +7,17 @@ from fastapi import APIRouter, Depends, Query
 from datetime import datetime, timedelta
 
 from app.api.v1.deps.security import get_current_user
-from app.infrastructure.db.base import get_db
-from app.infrastructure.db.models import User, Object, Visit
-from app.infrastructure.db.repositories.object_repository import ObjectRepository
-from app.infrastructure.db.repositories.visit_repository import VisitRepository
+from app.infrastructure.db.base import get_read_db
+from app.infrastructure.db.models import User, Object, ObjectStatus, Visit, VisitStatus
+from app.infrastructure.db.filtering import (
+    OBJECTS_QUERY,
+    VISITS_QUERY,
+    ObjectFilterParams,
+    VisitFilterParams,
+    apply_filters,
+    filter_conditions,
+)
+from app.infrastructure.db.repositories.base import count_exact
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 
@@ -22,9 +29,17 @@ async def get_summary(
     period: str = Query(default="month", description="Период: day, week, month, year"),
     city_id: Optional[UUID] = Query(None),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """Сводная аналитика (использует индексы для быстрых запросов)"""
+    """
+    Сводная аналитика (использует индексы для быстрых запросов)
+
+    - objects_in_work - объекты со статусом INTEREST (как in_work в /objects/by-city)
+    - total_visits, completed_visits - визиты за период, точный COUNT
+
+    Изменение ответа: раньше objects_in_work считал все объекты города (не
+    больше 1000), а total_visits и completed_visits - не больше 1000 визитов.
+    """
     # Вычисляем период
     now = datetime.utcnow()
     period_map = {
@@ -35,41 +50,45 @@ async def get_summary(
     }
     since = now - period_map.get(period, timedelta(days=30))
     
-    obj_repo = ObjectRepository(db)
-    visit_repo = VisitRepository(db)
+    dialect_name = db.get_bind().dialect.name
     
-    # Объекты в работе (использует индекс status)
-    objects_in_work, _ = await obj_repo.find_by_filters(
-        status="INTEREST" if hasattr(Object, "INTEREST") else None,
-        city_id=city_id,
-        limit=1000,
-        offset=0,
+    # Объекты в работе - статус INTEREST (индекс city_id + status), COUNT в БД
+    objects_stmt = apply_filters(
+        select(Object.id),
+        OBJECTS_QUERY,
+        ObjectFilterParams(city_id=city_id, status=ObjectStatus.INTEREST),
+        dialect_name,
     )
+    objects_in_work = await count_exact(db, objects_stmt)
     
-    # Визиты за период (использует индекс scheduled_at)
-    visits, _ = await visit_repo.find_by_filters(
-        date_from=since,
-        date_to=now,
-        limit=1000,
-        offset=0,
+    # Визиты за период (индекс scheduled_at): всего и завершённых одним запросом
+    visit_conditions = filter_conditions(
+        VISITS_QUERY,
+        VisitFilterParams(date_from=since, date_to=now),
+        dialect_name,
     )
-    
-    completed_visits = [v for v in visits if v.status == "DONE"]
+    result = await db.execute(
+        select(
+            func.count(Visit.id),
+            func.count(Visit.id).filter(Visit.status == VisitStatus.DONE),
+        ).where(*visit_conditions)
+    )
+    total_visits, completed_visits = result.one()
     
     return {
         "period": period,
         "since": since.isoformat(),
-        "objects_in_work": len(objects_in_work),
-        "total_visits": len(visits),
-        "completed_visits": len(completed_visits),
-        "completion_rate": len(completed_visits) / len(visits) if visits else 0,
+        "objects_in_work": objects_in_work,
+        "total_visits": total_visits,
+        "completed_visits": completed_visits,
+        "completion_rate": completed_visits / total_visits if total_visits else 0,
     }
 
 
 @router.get("/objects/by-city")
 async def get_objects_by_city(
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Распределение объектов по городам (использует индекс city_id)"""
     stmt = select(
@@ -2,24 +2,47 @@
 Роутер аудита
 """
 from uuid import UUID
-from typing import Optional
+from typing import Optional, Union
 from fastapi import APIRouter, Depends, Query
 from datetime import datetime
 
 from app.api.v1.schemas.audit import AuditLogOut, AuditFilterParams
-from app.api.v1.schemas.pagination import PageParams, PageResponse
+from app.api.v1.schemas.pagination import PageParams, PageResponse, CursorParams, CursorResponse
 from app.api.v1.deps.security import get_current_user, require_roles
-from app.infrastructure.db.base import get_db
+from app.infrastructure.db.base import get_read_db
 from app.infrastructure.db.models import User, UserRole, AuditLog, ActionType
+from app.infrastructure.db.repositories.base import apply_keyset, keyset_page, count_total
 from app.core.pagination import get_pagination_offset
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, func
+from sqlalchemy.orm import joinedload
 
 
 router = APIRouter()
 
+# Нужно только имя автора: автор подтягивается тем же запросом, его связи не грузятся
+_ACTOR_ONLY = joinedload(AuditLog.actor).raiseload("*")
 
-@router.get("/", response_model=PageResponse[AuditLogOut])
+
+def _audit_log_out(item: AuditLog) -> AuditLogOut:
+    """Преобразование записи аудита с учетом relationship actor"""
+    actor_name = item.actor.full_name if item.actor else None
+    return AuditLogOut(
+        id=item.id,
+        actor_id=item.actor_id,
+        actor_name=actor_name,
+        action=item.action,
+        entity_type=item.entity_type,
+        entity_id=item.entity_id,
+        before_json=item.before_json,
+        after_json=item.after_json,
+        ip_address=item.ip_address,
+        user_agent=item.user_agent,
+        occurred_at=item.occurred_at,
+    )
+
+
+@router.get("/", response_model=Union[PageResponse[AuditLogOut], CursorResponse[AuditLogOut]])
 async def list_audit_logs(
     actor_id: Optional[UUID] = Query(None),
     entity_type: Optional[str] = Query(None),
@@ -28,8 +51,9 @@ async def list_audit_logs(
     since: Optional[datetime] = Query(None),
     until: Optional[datetime] = Query(None),
     params: PageParams = Depends(),
+    cursor_params: CursorParams = Depends(),
     current_user: User = Depends(require_roles(UserRole.ADMIN, UserRole.SUPERVISOR)),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Список записей аудита с фильтрацией"""
     stmt = select(AuditLog)
@@ -56,55 +80,48 @@ async def list_audit_logs(
     if conditions:
         stmt = stmt.where(and_(*conditions))
     
+    if cursor_params.enabled:
+        size = cursor_params.page_size
+        stmt = apply_keyset(stmt, AuditLog.occurred_at, AuditLog.id, cursor_params.cursor, size)
+        stmt = stmt.options(_ACTOR_ONLY)
+        result = await db.execute(stmt)
+        items, next_cursor = keyset_page(list(result.scalars().all()), "occurred_at", size)
+        return CursorResponse(
+            items=[_audit_log_out(item) for item in items],
+            next_cursor=next_cursor,
+            has_more=next_cursor is not None,
+        )
+    
     # Подсчёт общего количества
-    count_stmt = select(AuditLog).where(and_(*conditions)) if conditions else select(AuditLog)
-    total_result = await db.execute(select(func.count()).select_from(count_stmt.subquery()))
-    total = total_result.scalar_one() or 0
+    filters = dict(
+        actor_id=actor_id,
+        entity_type=entity_type,
+        entity_id=entity_id,
+        action=action,
+        since=since,
+        until=until,
+    )
+    total = await count_total(db, stmt, params.count, AuditLog.__tablename__, filters)
     
     # Применяем пагинацию
     offset = get_pagination_offset(params.page, params.limit)
-    stmt = stmt.order_by(AuditLog.occurred_at.desc()).limit(params.limit).offset(offset)
+    stmt = stmt.order_by(AuditLog.occurred_at.desc()).limit(params.fetch_limit).offset(offset)
+    stmt = stmt.options(_ACTOR_ONLY)
     
     result = await db.execute(stmt)
     items = list(result.scalars().all())
     
-    pages = (total + params.limit - 1) // params.limit if total > 0 else 0
-    
-    # Преобразуем с учетом relationship actor
-    audit_items = []
-    for item in items:
-        actor_name = item.actor.full_name if item.actor else None
-        audit_items.append(AuditLogOut(
-            id=item.id,
-            actor_id=item.actor_id,
-            actor_name=actor_name,
-            action=item.action,
-            entity_type=item.entity_type,
-            entity_id=item.entity_id,
-            before_json=item.before_json,
-            after_json=item.after_json,
-            ip_address=item.ip_address,
-            user_agent=item.user_agent,
-            occurred_at=item.occurred_at,
-        ))
-    
-    return PageResponse(
-        items=audit_items,
-        page=params.page,
-        limit=params.limit,
-        total=total,
-        pages=pages,
-    )
+    return PageResponse.build([_audit_log_out(item) for item in items], params, total)
 
 
 @router.get("/{log_id}", response_model=AuditLogOut)
 async def get_audit_log(
     log_id: UUID,
     current_user: User = Depends(require_roles(UserRole.ADMIN, UserRole.SUPERVISOR)),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Получить запись аудита по ID"""
-    result = await db.execute(select(AuditLog).where(AuditLog.id == log_id))
+    result = await db.execute(select(AuditLog).where(AuditLog.id == log_id).options(_ACTOR_ONLY))
     log = result.scalar_one_or_none()
     
     if not log:
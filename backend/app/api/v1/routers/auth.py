@@ -20,6 +20,7 @@ from app.domain.services.audit_service import AuditService
 from app.infrastructure.db.models import ActionType
 from app.infrastructure.db.base import get_db
 from app.infrastructure.db.models import User, UserRole
+from app.infrastructure.cache.user_cache import invalidate_user
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
@@ -55,7 +56,18 @@ async def login(
     # Обновляем last_login_at
     from datetime import datetime
     user.last_login_at = datetime.utcnow()
+    
+    # Аудит через outbox - один commit вместе с last_login_at
+    audit_service = AuditService(db)
+    await audit_service.log_action(
+        action=ActionType.LOGIN,
+        entity_type="user",
+        entity_id=user.id,
+        actor_id=user.id,
+        after={"email": user.email, "role": user.role.value},
+    )
     await db.commit()
+    await invalidate_user(user.id)
     
     # Получаем scopes для роли
     scopes = get_scopes_from_role(user.role.value)
@@ -78,21 +90,6 @@ async def login(
         }
     )
     
-    # Логируем в аудит
-    try:
-        audit_service = AuditService(db)
-        await audit_service.log_action(
-            action=ActionType.LOGIN,
-            entity_type="user",
-            entity_id=user.id,
-            actor_id=user.id,
-            after={"email": user.email, "role": user.role.value},
-        )
-        await db.commit()
-        logger.debug("Audit log created for login", user_id=str(user.id))
-    except Exception as e:
-        logger.error("Failed to create audit log for login", error=str(e), user_id=str(user.id))
-    
     logger.info(
         "Login successful",
         user_id=str(user.id),
@@ -2,28 +2,51 @@
 Роутер клиентов
 """
 from uuid import UUID
-from typing import Optional
+from typing import Optional, Union
 from fastapi import APIRouter, Depends, Query
 
-from app.api.v1.schemas.customers import CustomerOut, CustomerCreate, CustomerUpdate
-from app.api.v1.schemas.pagination import PageParams, PageResponse
+from app.api.v1.schemas.customers import CustomerOut, CustomerCreate, CustomerUpdate, CustomerBulkItem
+from app.api.v1.schemas.bulk import BulkRequest, BulkResponse
+from app.api.v1.schemas.pagination import PageParams, PageResponse, CursorParams, CursorResponse
 from app.api.v1.deps.security import get_current_user, require_scopes
-from app.infrastructure.db.base import get_db
-from app.infrastructure.db.models import User, Customer
+from app.infrastructure.db.base import get_db, get_read_db
+from app.infrastructure.db.models import User, Customer, Object, Unit
+from app.infrastructure.db.repositories.base import LoadProfile
+from app.infrastructure.db.repositories.customer_repository import CustomerRepository
+from app.infrastructure.db.filtering import CustomerFilterParams
 from app.core.pagination import get_pagination_offset
-from app.core.security import SCOPES
+from app.core.security import SCOPES, has_pii_access
 from app.core.phone_normalization import normalize_phone
 from app.core.logging_config import get_logger
 from app.domain.services.audit_service import AuditService
+from app.domain.services.bulk_service import BulkService, BulkSpec
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_, func
-from app.api.v1.schemas.common import mask_phone
+from sqlalchemy import select
+from app.api.v1.schemas.common import mask_row_phones
 
 router = APIRouter()
 logger = get_logger(__name__)
 
+# Списки читаются Core-проекцией: dict'ы валидирует только сериализатор response_model
+_OUT_COLUMNS = tuple(CustomerOut.model_fields)
 
-@router.get("/", response_model=PageResponse[CustomerOut])
+# Телефон клиента уникален - повторный импорт жителя обновляет запись
+_BULK_SPEC = BulkSpec(
+    model=Customer,
+    schema=CustomerBulkItem,
+    entity_type="customer",
+    references={"object_id": Object, "unit_id": Unit},
+    phone_fields=("phone",),
+    unique_phone="phone",
+)
+
+
+def _mask_rows(rows: list[dict], pii_access: bool) -> list[dict]:
+    """Маскирование PII в строках проекции для пользователей без доступа"""
+    return rows if pii_access else mask_row_phones(rows)
+
+
+@router.get("/", response_model=Union[PageResponse[CustomerOut], CursorResponse[CustomerOut]])
 async def list_customers(
     q: Optional[str] = Query(None, description="Поиск по имени/телефону/адресу"),
     object_id: Optional[UUID] = Query(None),
@@ -31,88 +54,48 @@ async def list_customers(
     interests: Optional[str] = Query(None, description="Список интересов через запятую"),
     rating_min: Optional[int] = Query(None, ge=1, le=5),
     rating_max: Optional[int] = Query(None, ge=1, le=5),
+    sort: Optional[str] = Query(None, description="Сортировка: -updated_at (только по индексам)"),
     params: PageParams = Depends(),
+    cursor_params: CursorParams = Depends(),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Список клиентов с фильтрацией"""
     # Проверка доступа
-    from app.core.security import get_scopes_from_role
-    user_scopes = get_scopes_from_role(current_user.role.value)
-    has_pii_access = "admin:*" in user_scopes or current_user.role.value == "ADMIN"
-    
-    stmt = select(Customer)
-    conditions = []
+    pii_access = has_pii_access(current_user.role.value)
+    
+    # Условия фильтров объединяются через AND и выполняются в БД (CUSTOMERS_QUERY)
+    repo = CustomerRepository(db)
+    filters = CustomerFilterParams(
+        q=q,
+        object_id=object_id,
+        phone=phone,
+        interests=[i.strip() for i in interests.split(",") if i.strip()] if interests else None,
+        rating_min=rating_min,
+        rating_max=rating_max,
+        sort=sort,
+    )
     
-    if q:
-        search_pattern = f"%{q.lower()}%"
-        conditions.append(
-            or_(
-                Customer.full_name.ilike(search_pattern),
-                Customer.phone.ilike(search_pattern),
-                Customer.portrait_text.ilike(search_pattern),
-            )
+    if cursor_params.enabled:
+        items, next_cursor = await repo.find_by_filters_cursor(
+            filters,
+            cursor=cursor_params.cursor,
+            size=cursor_params.page_size,
+            columns=_OUT_COLUMNS,
         )
+        return CursorResponse.payload(_mask_rows(items, pii_access), next_cursor)
     
-    if object_id:
-        conditions.append(Customer.object_id == object_id)
-    
-    if phone:
-        conditions.append(Customer.phone == phone)
-    
-    if interests:
-        interest_list = [i.strip() for i in interests.split(",")]
-        # Упрощённо - поиск по JSON массиву (для SQLite работает, для Postgres нужен другой подход)
-        for interest in interest_list:
-            conditions.append(Customer.interests.contains([interest]))
-    
-    if rating_min is not None:
-        conditions.append(Customer.provider_rating >= rating_min)
-    
-    if rating_max is not None:
-        conditions.append(Customer.provider_rating <= rating_max)
-    
-    if conditions:
-        if len(conditions) == 1:
-            stmt = stmt.where(conditions[0])
-        else:
-            stmt = stmt.where(or_(*conditions))
-    
-    # Подсчёт общего количества
-    count_stmt = select(Customer)
-    if conditions:
-        if len(conditions) == 1:
-            count_stmt = count_stmt.where(conditions[0])
-        else:
-            count_stmt = count_stmt.where(or_(*conditions))
-    
-    total_result = await db.execute(select(func.count()).select_from(count_stmt.subquery()))
-    total = total_result.scalar_one() or 0
-    
-    # Применяем пагинацию
     offset = get_pagination_offset(params.page, params.limit)
-    stmt = stmt.order_by(Customer.updated_at.desc()).limit(params.limit).offset(offset)
-    
-    result = await db.execute(stmt)
-    items = list(result.scalars().all())
-    
-    pages = (total + params.limit - 1) // params.limit if total > 0 else 0
     
-    # Применяем маскирование PII для пользователей без доступа
-    customers_out = []
-    for customer in items:
-        customer_dict = CustomerOut.model_validate(customer).model_dump()
-        if not has_pii_access and customer_dict.get("phone"):
-            customer_dict["phone"] = mask_phone(customer_dict["phone"])
-        customers_out.append(CustomerOut(**customer_dict))
-    
-    return PageResponse(
-        items=customers_out,
-        page=params.page,
-        limit=params.limit,
-        total=total,
-        pages=pages,
+    items, total = await repo.find_by_filters(
+        filters,
+        limit=params.fetch_limit,
+        offset=offset,
+        count=params.count,
+        columns=_OUT_COLUMNS,
     )
+    
+    return PageResponse.payload(_mask_rows(items, pii_access), params, total)
 
 
 @router.post("/", response_model=CustomerOut, status_code=201)
@@ -138,27 +121,22 @@ async def create_customer(
     new_customer = Customer(**customer_data)
     
     db.add(new_customer)
+    await db.flush()
+    
+    # Аудит через outbox - один commit вместе с клиентом
+    audit_service = AuditService(db)
+    after_data = {
+        "id": str(new_customer.id),
+        "object_id": str(new_customer.object_id),
+        "phone": "***" if new_customer.phone else None,  # Маскируем PII
+    }
+    await audit_service.log_create(
+        entity_type="customer",
+        entity_id=new_customer.id,
+        actor_id=current_user.id,
+        after=after_data,
+    )
     await db.commit()
-    await db.refresh(new_customer)
-    
-    # Логируем в аудит
-    try:
-        audit_service = AuditService(db)
-        after_data = {
-            "id": str(new_customer.id),
-            "object_id": str(new_customer.object_id),
-            "phone": "***" if new_customer.phone else None,  # Маскируем PII
-        }
-        await audit_service.log_create(
-            entity_type="customer",
-            entity_id=new_customer.id,
-            actor_id=current_user.id,
-            after=after_data,
-        )
-        await db.commit()
-        logger.debug("Audit log created for customer creation", customer_id=str(new_customer.id))
-    except Exception as e:
-        logger.error("Failed to create audit log", error=str(e), customer_id=str(new_customer.id))
     
     logger.info(
         "Customer created successfully",
@@ -169,27 +147,41 @@ async def create_customer(
     return CustomerOut.model_validate(new_customer)
 
 
+@router.post("/bulk", response_model=BulkResponse)
+async def bulk_upsert_customers(
+    data: BulkRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Bulk create/upsert клиентов (импорт): результат по каждой строке"""
+    logger.info(
+        "Bulk customers import requested",
+        user_id=str(current_user.id),
+        items=len(data.items),
+    )
+    return await BulkService(db).upsert(_BULK_SPEC, data.items, current_user)
+
+
 @router.get("/{customer_id}", response_model=CustomerOut)
 async def get_customer(
     customer_id: UUID,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Получить клиента по ID"""
-    result = await db.execute(select(Customer).where(Customer.id == customer_id))
+    result = await db.execute(
+        select(Customer)
+        .where(Customer.id == customer_id)
+        .options(*CustomerRepository.loader_options(LoadProfile.LEAN))
+    )
     customer = result.scalar_one_or_none()
     
     if not customer:
         from app.core.errors import NotFoundError
         raise NotFoundError("Customer", customer_id)
     
-    # Проверка доступа к PII
-    from app.core.security import get_scopes_from_role
-    user_scopes = get_scopes_from_role(current_user.role.value)
-    has_pii_access = "admin:*" in user_scopes or current_user.role.value == "ADMIN"
-    
     customer_out = CustomerOut.model_validate(customer)
-    if not has_pii_access:
+    if not has_pii_access(current_user.role.value):
         customer_out = customer_out.mask_pii(has_access=False)
     
     return customer_out
@@ -210,7 +202,11 @@ async def update_customer(
         user_name=current_user.full_name,
     )
     
-    result = await db.execute(select(Customer).where(Customer.id == customer_id))
+    result = await db.execute(
+        select(Customer)
+        .where(Customer.id == customer_id)
+        .options(*CustomerRepository.loader_options(LoadProfile.LEAN))
+    )
     customer = result.scalar_one_or_none()
     
     if not customer:
@@ -246,27 +242,22 @@ async def update_customer(
             new_value=str(value) if value is not None else None,
         )
     
-    await db.commit()
-    await db.refresh(customer)
+    await db.flush()
     
-    # Логируем в аудит
-    try:
-        audit_service = AuditService(db)
-        after_data = {
-            "id": str(customer.id),
-            "object_id": str(customer.object_id),
-        }
-        await audit_service.log_update(
-            entity_type="customer",
-            entity_id=customer.id,
-            actor_id=current_user.id,
-            before=before_data,
-            after=after_data,
-        )
-        await db.commit()
-        logger.debug("Audit log created for customer update", customer_id=str(customer_id))
-    except Exception as e:
-        logger.error("Failed to create audit log", error=str(e), customer_id=str(customer_id))
+    # Аудит через outbox - один commit вместе с клиентом
+    audit_service = AuditService(db)
+    after_data = {
+        "id": str(customer.id),
+        "object_id": str(customer.object_id),
+    }
+    await audit_service.log_update(
+        entity_type="customer",
+        entity_id=customer.id,
+        actor_id=current_user.id,
+        before=before_data,
+        after=after_data,
+    )
+    await db.commit()
     
     logger.info(
         "Customer updated successfully",
@@ -274,13 +265,8 @@ async def update_customer(
         user_id=str(current_user.id),
     )
     
-    # Проверка доступа к PII
-    from app.core.security import get_scopes_from_role
-    user_scopes = get_scopes_from_role(current_user.role.value)
-    has_pii_access = "admin:*" in user_scopes or current_user.role.value == "ADMIN"
-    
     customer_out = CustomerOut.model_validate(customer)
-    if not has_pii_access:
+    if not has_pii_access(current_user.role.value):
         customer_out = customer_out.mask_pii(has_access=False)
     
     return customer_out
@@ -8,7 +8,7 @@ from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.infrastructure.db.base import get_db
+from app.infrastructure.db.base import get_read_db
 from app.infrastructure.db.models import City, District
 
 router = APIRouter()
@@ -35,7 +35,7 @@ class DistrictOut(BaseModel):
 
 @router.get("/cities", response_model=List[CityOut])
 async def list_cities(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Список городов"""
     result = await db.execute(select(City).order_by(City.name))
@@ -46,7 +46,7 @@ async def list_cities(
 @router.get("/districts", response_model=List[DistrictOut])
 async def list_districts(
     city_id: Optional[UUID] = Query(None, description="Фильтр по городу"),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Список районов (опционально по городу)"""
     stmt = select(District).order_by(District.name)
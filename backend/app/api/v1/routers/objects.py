@@ -2,34 +2,53 @@
 Роутер объектов
 """
 from uuid import UUID
-from typing import Optional
+from typing import Optional, Union
 from fastapi import APIRouter, Depends, Query
 
-from app.api.v1.schemas.objects import ObjectCreate, ObjectUpdate, ObjectOut
-from app.api.v1.schemas.pagination import PageParams, PageResponse
+from app.api.v1.schemas.objects import ObjectCreate, ObjectUpdate, ObjectOut, ObjectBulkItem
+from app.api.v1.schemas.bulk import BulkRequest, BulkResponse
+from app.api.v1.schemas.pagination import PageParams, PageResponse, CursorParams, CursorResponse
 from app.api.v1.deps.security import get_current_user, require_scopes, require_roles
-from app.infrastructure.db.base import get_db
-from app.infrastructure.db.models import User, Object, ObjectStatus, UserRole
+from app.infrastructure.db.base import get_db, get_read_db
+from app.infrastructure.db.models import User, Object, ObjectStatus, UserRole, City, District
+from app.infrastructure.db.repositories.base import LoadProfile
 from app.infrastructure.db.repositories.object_repository import ObjectRepository
+from app.infrastructure.db.filtering import ObjectFilterParams
 from app.core.pagination import get_pagination_offset
 from app.core.logging_config import get_logger
 from app.domain.services.audit_service import AuditService
+from app.domain.services.bulk_service import BulkService, BulkSpec
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 
 router = APIRouter()
 logger = get_logger(__name__)
 
+# Списки читаются Core-проекцией: dict'ы валидирует только сериализатор response_model
+_OUT_COLUMNS = tuple(ObjectOut.model_fields)
 
-@router.get("/", response_model=PageResponse[ObjectOut])
+_BULK_SPEC = BulkSpec(
+    model=Object,
+    schema=ObjectBulkItem,
+    entity_type="object",
+    references={"city_id": City, "district_id": District, "responsible_user_id": User},
+    phone_fields=("contact_phone",),
+    insert_values=lambda actor_id: {"created_by": actor_id},
+    update_values=lambda actor_id: {"updated_by": actor_id},
+)
+
+
+@router.get("/", response_model=Union[PageResponse[ObjectOut], CursorResponse[ObjectOut]])
 async def list_objects(
     city_id: Optional[UUID] = Query(None),
     district_id: Optional[UUID] = Query(None),
     status: Optional[ObjectStatus] = Query(None),
     search: Optional[str] = Query(None),
+    sort: Optional[str] = Query(None, description="Сортировка: -updated_at, status, -last_visit_at (только по индексам)"),
     params: PageParams = Depends(),
+    cursor_params: CursorParams = Depends(),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Список объектов с фильтрацией и пагинацией"""
     logger.info(
@@ -41,40 +60,47 @@ async def list_objects(
             "district_id": str(district_id) if district_id else None,
             "status": status.value if status else None,
             "search": search,
+            "sort": sort,
             "page": params.page,
             "limit": params.limit,
+            "count": params.count.value,
+            "cursor_mode": cursor_params.enabled,
         }
     )
     
     repo = ObjectRepository(db)
+    filters = ObjectFilterParams(city_id=city_id, district_id=district_id, status=status, q=search, sort=sort)
+    
+    if cursor_params.enabled:
+        items, next_cursor = await repo.find_by_filters_cursor(
+            filters,
+            cursor=cursor_params.cursor,
+            size=cursor_params.page_size,
+            columns=_OUT_COLUMNS,
+        )
+        return CursorResponse.payload(items, next_cursor)
+    
     offset = get_pagination_offset(params.page, params.limit)
     
     items, total = await repo.find_by_filters(
-        city_id=city_id,
-        district_id=district_id,
-        status=status,
-        search_query=search,
-        limit=params.limit,
+        filters,
+        limit=params.fetch_limit,
         offset=offset,
+        count=params.count,
+        columns=_OUT_COLUMNS,
     )
     
-    pages = (total + params.limit - 1) // params.limit
+    response = PageResponse.payload(items, params, total)
     
     logger.debug(
         "List objects completed",
         user_id=str(current_user.id),
         total=total,
-        returned=len(items),
-        pages=pages,
+        returned=len(response["items"]),
+        pages=response.get("pages"),
     )
     
-    return PageResponse(
-        items=[ObjectOut.model_validate(item) for item in items],
-        page=params.page,
-        limit=params.limit,
-        total=total,
-        pages=pages,
-    )
+    return response
 
 
 @router.post("/", response_model=ObjectOut, status_code=201)
@@ -111,27 +137,22 @@ async def create_object(
     )
     
     obj = await repo.add(new_object)
-    await db.commit()
     
-    # Логируем в аудит
-    try:
-        audit_service = AuditService(db)
-        after_data = {
-            "id": str(obj.id),
-            "type": obj.type.value,
-            "address": obj.address,
-            "status": obj.status.value,
-        }
-        await audit_service.log_create(
-            entity_type="object",
-            entity_id=obj.id,
-            actor_id=current_user.id,
-            after=after_data,
-        )
-        await db.commit()
-        logger.debug("Audit log created for object creation", object_id=str(obj.id))
-    except Exception as e:
-        logger.error("Failed to create audit log", error=str(e), object_id=str(obj.id))
+    # Аудит через outbox - один commit вместе с объектом
+    audit_service = AuditService(db)
+    after_data = {
+        "id": str(obj.id),
+        "type": obj.type.value,
+        "address": obj.address,
+        "status": obj.status.value,
+    }
+    await audit_service.log_create(
+        entity_type="object",
+        entity_id=obj.id,
+        actor_id=current_user.id,
+        after=after_data,
+    )
+    await db.commit()
     
     logger.info(
         "Object created successfully",
@@ -142,11 +163,26 @@ async def create_object(
     return ObjectOut.model_validate(obj)
 
 
+@router.post("/bulk", response_model=BulkResponse)
+async def bulk_upsert_objects(
+    data: BulkRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Bulk create/upsert объектов (импорт): результат по каждой строке"""
+    logger.info(
+        "Bulk objects import requested",
+        user_id=str(current_user.id),
+        items=len(data.items),
+    )
+    return await BulkService(db).upsert(_BULK_SPEC, data.items, current_user)
+
+
 @router.get("/{object_id}", response_model=ObjectOut)
 async def get_object(
     object_id: UUID,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Получить объект по ID"""
     logger.debug(
@@ -156,7 +192,7 @@ async def get_object(
     )
     
     repo = ObjectRepository(db)
-    obj = await repo.get(object_id)
+    obj = await repo.get(object_id, profile=LoadProfile.LEAN)
     
     if not obj:
         logger.warning(
@@ -194,7 +230,7 @@ async def update_object(
     )
     
     repo = ObjectRepository(db)
-    obj = await repo.get(object_id)
+    obj = await repo.get(object_id, profile=LoadProfile.LEAN)
     
     if not obj:
         logger.warning(
@@ -254,29 +290,24 @@ async def update_object(
     obj.version += 1
     
     obj = await repo.update(obj)
-    await db.commit()
     
-    # Логируем в аудит
-    try:
-        audit_service = AuditService(db)
-        after_data = {
-            "id": str(obj.id),
-            "status": obj.status.value,
-            "type": obj.type.value,
-            "address": obj.address,
-            "responsible_user_id": str(obj.responsible_user_id) if obj.responsible_user_id else None,
-        }
-        await audit_service.log_update(
-            entity_type="object",
-            entity_id=obj.id,
-            actor_id=current_user.id,
-            before=before_data,
-            after=after_data,
-        )
-        await db.commit()
-        logger.debug("Audit log created for object update", object_id=str(obj.id))
-    except Exception as e:
-        logger.error("Failed to create audit log", error=str(e), object_id=str(obj.id))
+    # Аудит через outbox - один commit вместе с объектом
+    audit_service = AuditService(db)
+    after_data = {
+        "id": str(obj.id),
+        "status": obj.status.value,
+        "type": obj.type.value,
+        "address": obj.address,
+        "responsible_user_id": str(obj.responsible_user_id) if obj.responsible_user_id else None,
+    }
+    await audit_service.log_update(
+        entity_type="object",
+        entity_id=obj.id,
+        actor_id=current_user.id,
+        before=before_data,
+        after=after_data,
+    )
+    await db.commit()
     
     logger.info(
         "Object updated successfully",
@@ -288,13 +319,15 @@ async def update_object(
     return ObjectOut.model_validate(obj)
 
 
-@router.get("/my-tasks", response_model=PageResponse[ObjectOut])
+@router.get("/my-tasks", response_model=Union[PageResponse[ObjectOut], CursorResponse[ObjectOut]])
 async def get_my_tasks(
     status: Optional[ObjectStatus] = Query(None),
     search: Optional[str] = Query(None),
+    sort: Optional[str] = Query(None, description="Сортировка: -updated_at, status, -last_visit_at (только по индексам)"),
     params: PageParams = Depends(),
+    cursor_params: CursorParams = Depends(),
     current_user: User = Depends(require_roles(UserRole.SUPERVISOR)),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Получить задачи супервайзера (объекты, назначенные ему)"""
     logger.info(
@@ -304,40 +337,48 @@ async def get_my_tasks(
         filters={
             "status": status.value if status else None,
             "search": search,
+            "sort": sort,
             "page": params.page,
             "limit": params.limit,
+            "count": params.count.value,
+            "cursor_mode": cursor_params.enabled,
         }
     )
     
     repo = ObjectRepository(db)
+    # Объекты, где текущий пользователь - ответственный
+    filters = ObjectFilterParams(responsible_user_id=current_user.id, status=status, q=search, sort=sort)
+    
+    if cursor_params.enabled:
+        items, next_cursor = await repo.find_by_filters_cursor(
+            filters,
+            cursor=cursor_params.cursor,
+            size=cursor_params.page_size,
+            columns=_OUT_COLUMNS,
+        )
+        return CursorResponse.payload(items, next_cursor)
+    
     offset = get_pagination_offset(params.page, params.limit)
     
-    # Получаем объекты, где текущий пользователь - ответственный
     items, total = await repo.find_by_filters(
-        responsible_user_id=current_user.id,
-        status=status,
-        search_query=search,
-        limit=params.limit,
+        filters,
+        limit=params.fetch_limit,
         offset=offset,
+        count=params.count,
+        columns=_OUT_COLUMNS,
     )
     
-    pages = (total + params.limit - 1) // params.limit if total > 0 else 0
+    response = PageResponse.payload(items, params, total)
     
     logger.debug(
         "Supervisor tasks retrieved",
         user_id=str(current_user.id),
         total=total,
-        returned=len(items),
-        pages=pages,
+        returned=len(response["items"]),
+        pages=response.get("pages"),
     )
     
-    return PageResponse(
-        items=[ObjectOut.model_validate(item) for item in items],
-        page=params.page,
-        limit=params.limit,
-        total=total,
-        pages=pages,
-    )
+    return response
 
 
 @router.post("/{object_id}/delegate", response_model=ObjectOut)
@@ -357,7 +398,7 @@ async def delegate_object(
     )
     
     repo = ObjectRepository(db)
-    obj = await repo.get(object_id)
+    obj = await repo.get(object_id, profile=LoadProfile.LEAN)
     
     if not obj:
         logger.warning(
@@ -397,26 +438,21 @@ async def delegate_object(
     obj.version += 1
     
     obj = await repo.update(obj)
-    await db.commit()
     
-    # Логируем в аудит
-    try:
-        audit_service = AuditService(db)
-        after_data = {
-            "id": str(obj.id),
-            "responsible_user_id": str(obj.responsible_user_id),
-        }
-        await audit_service.log_update(
-            entity_type="object",
-            entity_id=obj.id,
-            actor_id=current_user.id,
-            before=before_data,
-            after=after_data,
-        )
-        await db.commit()
-        logger.debug("Audit log created for object delegation", object_id=str(obj.id))
-    except Exception as e:
-        logger.error("Failed to create audit log", error=str(e), object_id=str(obj.id))
+    # Аудит через outbox - один commit вместе с объектом
+    audit_service = AuditService(db)
+    after_data = {
+        "id": str(obj.id),
+        "responsible_user_id": str(obj.responsible_user_id),
+    }
+    await audit_service.log_update(
+        entity_type="object",
+        entity_id=obj.id,
+        actor_id=current_user.id,
+        before=before_data,
+        after=after_data,
+    )
+    await db.commit()
     
     logger.info(
         "Object delegated successfully",
@@ -2,9 +2,9 @@
 Роутер отчётов
 """
 from uuid import UUID
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import FileResponse
+from typing import Any, AsyncIterator, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import FileResponse, StreamingResponse
 from datetime import datetime
 
 from app.api.v1.schemas.reports import (
@@ -12,18 +12,28 @@ from app.api.v1.schemas.reports import (
     ReportJobOut,
     ReportPreviewRequest,
     ReportPreviewResponse,
+    ReportStreamRequest,
 )
 from app.api.v1.deps.security import get_current_user
-from app.infrastructure.db.base import get_db
+from app.api.v1.schemas.common import mask_row_phones
+from app.infrastructure.db.base import get_db, get_read_db, read_session_factory
 from app.infrastructure.db.models import User, ReportJob
-from app.domain.services.report_service import ReportService
+from app.domain.services.report_cache import reuse_cached_report
+from app.domain.services.report_service import ReportService, report_columns, report_filters
+from app.core.compression import accepts_gzip, gzip_stream
 from app.core.errors import NotFoundError, RateLimitError
+from app.core.logging_config import get_logger
+from app.core.security import has_pii_access
+from app.infrastructure.queues.report_queue import get_report_queue
+from app.services.stream_exporter import CSV_MEDIA_TYPE, NDJSON_MEDIA_TYPE, csv_stream, ndjson_stream
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 import os
 
 from app.core.config import settings
 
+logger = get_logger(__name__)
+
 router = APIRouter()
 
 
@@ -53,26 +63,20 @@ async def create_export(
         sort=data.sort,
     )
     
+    # Тот же отчёт по неизменившимся данным уже собран - задача готова без воркера
+    mask = not has_pii_access(current_user.role.value)
+    cached = settings.REPORT_CACHE_ENABLED and await reuse_cached_report(db, job, mask)
+    
     await db.commit()
     
-    # Запускаем задачу в фоне через RQ
-    try:
-        from app.infrastructure.queues.rq_tasks import export_objects_task
-        from rq import Queue
-        import redis.asyncio as redis
-        
-        redis_client = await redis.from_url(settings.REDIS_URL)
-        queue = Queue("reports", connection=redis_client)
-        
-        # Запускаем задачу (синхронный вызов, для async нужен адаптер)
-        # rq_job = queue.enqueue(export_objects_task, [], str(job.id))
-        # job.rq_job_id = rq_job.id
-        # await db.commit()
-    except Exception as e:
-        # Если очередь недоступна, помечаем как failed
-        job.status = "failed"
-        job.error_message = f"Queue error: {str(e)}"
-        await db.commit()
+    # Сигнал воркеру отчётов; если очередь недоступна, задача остаётся pending
+    # и воркер подберёт её из БД
+    if not cached:
+        try:
+            queue = await get_report_queue()
+            await queue.push(job.id)
+        except Exception as e:
+            logger.warning("Report job enqueue failed", job_id=str(job.id), error=str(e))
     
     return ReportJobOut.model_validate(job)
 
@@ -80,7 +84,7 @@ async def create_export(
 @router.get("/jobs", response_model=list[ReportJobOut])
 async def list_jobs(
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Список задач экспорта текущего пользователя"""
     result = await db.execute(
@@ -98,7 +102,7 @@ async def list_jobs(
 async def get_job(
     job_id: UUID,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Получить задачу экспорта по ID"""
     result = await db.execute(
@@ -116,7 +120,7 @@ async def get_job(
 async def download_report(
     job_id: UUID,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Скачать готовый отчёт"""
     result = await db.execute(
@@ -139,10 +143,18 @@ async def download_report(
             detail="Report file not found",
         )
     
+    # Обращение к файлу продлевает его жизнь в кэше отчётов (вытеснение по mtime)
+    try:
+        os.utime(job.file_path)
+    except OSError:
+        pass
+    
+    # Имя файла в кэше - fingerprint; пользователю - сущность и время готовности
+    completed_at = job.completed_at or job.created_at
     return FileResponse(
         job.file_path,
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        filename=os.path.basename(job.file_path),
+        filename=f"report_{job.entity}_{completed_at.strftime('%Y%m%d_%H%M%S')}.xlsx",
     )
 
 
@@ -150,9 +162,9 @@ async def download_report(
 async def preview_report(
     data: ReportPreviewRequest,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """Предпросмотр отчёта (до 100 строк)"""
+    """Предпросмотр отчёта (до 100 строк); телефоны маскируются, как в /stream"""
     service = ReportService(db)
     
     preview = await service.preview_report(
@@ -162,6 +174,52 @@ async def preview_report(
         sort=data.sort,
         limit=data.limit,
     )
+    if not has_pii_access(current_user.role.value):
+        mask_row_phones(preview["rows"])
     
     return ReportPreviewResponse(**preview)
 
+
+@router.post(
+    "/stream",
+    responses={200: {"content": {CSV_MEDIA_TYPE: {}, NDJSON_MEDIA_TYPE: {}}}},
+)
+async def stream_report(
+    data: ReportStreamRequest,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Потоковый экспорт в CSV или NDJSON
+
+    Строки идут из серверного курсора БД прямо в ответ - без задачи, очереди
+    и временного файла; первые байты приходят до конца выборки. Колонки -
+    как у /export, телефоны маскируются для пользователей без доступа к PII.
+    """
+    columns = report_columns(data.entity, data.columns)
+    report_filters(data.entity, data.filters, data.sort)  # 422 до начала ответа
+    mask = not has_pii_access(current_user.role.value)
+
+    async def rows() -> AsyncIterator[list[dict[str, Any]]]:
+        # Сессия dependency закрывается до отправки тела - открываем свою
+        session_factory = await read_session_factory(request)
+        async with session_factory() as session:
+            async for batch in ReportService(session).stream_report(
+                entity=data.entity,
+                filters=data.filters,
+                columns=columns,
+                sort=data.sort,
+                batch_size=settings.REPORT_EXPORT_BATCH_SIZE,
+            ):
+                yield mask_row_phones(batch) if mask else batch
+
+    if data.format == "csv":
+        body, media_type = csv_stream(rows(), columns), CSV_MEDIA_TYPE
+    else:
+        body, media_type = ndjson_stream(rows(), columns), NDJSON_MEDIA_TYPE
+    filename = f"{data.entity}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{data.format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if accepts_gzip(request.headers.get("accept-encoding", "")):
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type=media_type, headers=headers)
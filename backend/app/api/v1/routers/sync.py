@@ -1,9 +1,11 @@
 """
 Роутер офлайн-синхронизации
 """
-from uuid import UUID
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+import json
+from typing import AsyncIterator, BinaryIO, Literal, Optional
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from datetime import datetime
 
 from app.api.v1.schemas.sync import (
@@ -13,12 +15,18 @@ from app.api.v1.schemas.sync import (
     SyncChangesRequest,
     SyncChangesResponse,
     SyncChangeItem,
+    SyncTokenStats,
+    SyncSnapshotInfo,
 )
-from app.api.v1.deps.security import get_current_user
-from app.infrastructure.db.base import get_db
-from app.infrastructure.db.models import User
-from app.domain.services.sync_service import SyncService
-from app.core.errors import ConflictError
+from app.api.v1.deps.security import get_current_user, require_roles
+from app.core.compression import accepts_gzip, gzip_stream
+from app.core.errors import NotFoundError, ValidationError
+from app.core.http_range import RangeNotSatisfiable, parse_byte_range
+from app.infrastructure.db.base import get_db, get_read_db, read_session_factory
+from app.infrastructure.db.models import User, UserRole
+from app.domain.services.sync_service import SyncService, resolve_changes_cursor, sync_scope
+from app.domain.services.sync_snapshot_service import find_snapshot
+from app.infrastructure.db.repositories.sync_repository import SyncScope
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
@@ -38,63 +46,14 @@ async def sync_batch(
     """
     service = SyncService(db)
     
-    results = []
-    conflicts_count = 0
-    errors_count = 0
-    
-    for item in request.items:
-        try:
-            server_id, status, diff = await service.upsert_item(
-                client_id=item.client_generated_id,
-                table_name=item.table_name,
-                payload=item.payload,
-                version=item.version,
-                force=request.force,
-            )
-            
-            result = SyncItemResult(
-                client_generated_id=item.client_generated_id,
-                server_id=server_id,
-                status=status,
-                server_version=item.version,
-            )
-            results.append(result)
-            
-            if status == "conflict":
-                conflicts_count += 1
-                result.diff = diff
-            
-        except ConflictError as e:
-            conflicts_count += 1
-            error_details = e.details.get("diff", {})
-            
-            # Получаем server_id из существующего токена
-            from app.infrastructure.db.repositories.sync_repository import SyncRepository
-            sync_repo = SyncRepository(db)
-            existing_token = await sync_repo.get_by_client_id(item.client_generated_id)
-            server_id = existing_token.server_id if existing_token else UUID("00000000-0000-0000-0000-000000000000")
-            
-            result = SyncItemResult(
-                client_generated_id=item.client_generated_id,
-                server_id=server_id,
-                status="conflict",
-                diff=error_details,
-                server_version=error_details.get("current_version"),
-                resolution_hints=error_details.get("resolution_hints"),
-            )
-            results.append(result)
-            
-        except Exception as e:
-            errors_count += 1
-            result = SyncItemResult(
-                client_generated_id=item.client_generated_id,
-                server_id=UUID("00000000-0000-0000-0000-000000000000"),
-                status="error",
-                error_message=str(e),
-            )
-            results.append(result)
-    
-    await db.commit()
+    # Чанки по SYNC_BATCH_CHUNK_SIZE: чтение одним запросом на таблицу, flush в SAVEPOINT, commit;
+    # ошибка БД помечает только свой элемент - клиент повторяет лишь ошибочные
+    results = [
+        SyncItemResult(**result)
+        for result in await service.upsert_batch(request.items, force=request.force)
+    ]
+    conflicts_count = sum(1 for result in results if result.status == "conflict")
+    errors_count = sum(1 for result in results if result.status == "error")
     
     return SyncBatchResponse(
         results=results,
@@ -103,80 +62,216 @@ async def sync_batch(
     )
 
 
-@router.get("/changes", response_model=SyncChangesResponse)
+def _changes_response(changes: list[dict], next_cursor: Optional[str], has_more: bool) -> SyncChangesResponse:
+    items = [
+        SyncChangeItem(
+            id=change["id"],
+            table_name=change["table_name"],
+            action=change["action"],
+            data=change["data"],
+            columns=change["columns"],
+            updated_at=change["updated_at"],
+            version=change["version"],
+        )
+        for change in changes
+    ]
+    return SyncChangesResponse(items=items, has_more=has_more, next_cursor=next_cursor)
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _changes_stream(
+    request: Request,
+    tables: list[str],
+    since: Optional[datetime],
+    after_seq: Optional[int],
+    limit: int,
+    delta: bool,
+    scope: Optional[SyncScope],
+) -> StreamingResponse:
+    """
+    NDJSON-выдача изменений: строка на изменение, последней - {"next_cursor", "has_more"}
+
+    Пачка журнала сериализуется и отправляется сразу после чтения из курсора БД.
+    """
+    async def lines() -> AsyncIterator[bytes]:
+        # Сессия dependency к этому моменту уже закрыта - открываем свою
+        session_factory = await read_session_factory(request)
+        async with session_factory() as session:
+            async for chunk in SyncService(session).stream_changes(
+                tables, since, after_seq, limit, delta, scope,
+            ):
+                if "items" in chunk:
+                    yield "".join(
+                        SyncChangeItem(**change).model_dump_json() + "\n" for change in chunk["items"]
+                    ).encode()
+                else:
+                    yield (json.dumps(chunk) + "\n").encode()
+
+    headers = {}
+    body = lines()
+    if accepts_gzip(request.headers.get("accept-encoding", "")):
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type=NDJSON_MEDIA_TYPE, headers=headers)
+
+
+@router.get(
+    "/changes",
+    response_model=SyncChangesResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
 async def sync_changes(
-    since: datetime = Query(..., description="ISO дата последней синхронизации"),
+    request: Request,
+    since: Optional[datetime] = Query(None, description="ISO дата (первая синхронизация, без cursor)"),
+    cursor: Optional[str] = Query(None, description="next_cursor предыдущего ответа"),
     tables: str = Query(..., description="Список таблиц через запятую"),
-    limit: int = Query(default=1000, ge=1, le=10000),
+    limit: int = Query(default=1000, ge=1, le=100000),
+    format: Optional[Literal["json", "ndjson"]] = Query(None, description="ndjson - потоковая выдача"),
+    delta: bool = Query(False, description="С cursor: для update только изменённые колонки"),
+    owned: bool = Query(False, description="Только свои записи (дочитка после снимка территории)"),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """
     Получить изменения с сервера
     
-    Возвращает дельту изменений с указанной даты.
+    Читает журнал изменений после cursor (или с даты since). next_cursor
+    возвращается всегда - с него продолжается и следующая синхронизация.
+    format=ndjson (или Accept: application/x-ndjson) - потоковый NDJSON
+    без ограничения JSON-ответа в 10000 записей.
+    Инженер с городом получает ленту своей территории (sync_scope);
+    owned=true - только свои записи (их нет в снимке территории).
     """
     table_list = [t.strip() for t in tables.split(",")]
     
+    if format == "ndjson" or (format is None and NDJSON_MEDIA_TYPE in request.headers.get("accept", "")):
+        # Курсор проверяется до начала ответа: 410 нельзя отдать посреди потока
+        after_seq = resolve_changes_cursor(cursor)
+        return _changes_stream(request, table_list, since, after_seq, limit, delta, sync_scope(current_user, owned))
+    
+    if limit > 10000:
+        raise ValidationError("limit > 10000 is only supported with format=ndjson")
+    
     service = SyncService(db)
-    changes = await service.get_changes(
+    changes, next_cursor, has_more = await service.get_changes(
         tables=table_list,
         since=since,
+        cursor=cursor,
         limit=limit,
+        delta=delta,
+        scope=sync_scope(current_user, owned),
     )
-    
-    items = [
-        SyncChangeItem(
-            id=change["id"],
-            table_name=change["table_name"],
-            action=change["action"],
-            data=change["data"],
-            updated_at=change["updated_at"],
-            version=change["version"],
-        )
-        for change in changes
-    ]
-    
-    has_more = len(changes) >= limit
-    
-    return SyncChangesResponse(
-        items=items,
-        has_more=has_more,
-        next_cursor=str(changes[-1]["updated_at"]) if has_more else None,
-    )
+    return _changes_response(changes, next_cursor, has_more)
 
 
 @router.post("/changes", response_model=SyncChangesResponse)
 async def sync_changes_post(
     request: SyncChangesRequest,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Получить изменения (POST метод с телом запроса)"""
     service = SyncService(db)
-    changes = await service.get_changes(
+    changes, next_cursor, has_more = await service.get_changes(
         tables=request.tables,
         since=request.since,
+        cursor=request.cursor,
         limit=request.limit,
+        delta=request.delta,
+        scope=sync_scope(current_user, request.owned),
     )
-    
-    items = [
-        SyncChangeItem(
-            id=change["id"],
-            table_name=change["table_name"],
-            action=change["action"],
-            data=change["data"],
-            updated_at=change["updated_at"],
-            version=change["version"],
-        )
-        for change in changes
-    ]
-    
-    has_more = len(changes) >= request.limit
-    
-    return SyncChangesResponse(
-        items=items,
-        has_more=has_more,
-        next_cursor=str(changes[-1]["updated_at"]) if has_more else None,
-    )
+    return _changes_response(changes, next_cursor, has_more)
 
+
+@router.get("/tokens/stats", response_model=SyncTokenStats)
+async def sync_token_stats(
+    current_user: User = Depends(require_roles(UserRole.ADMIN, UserRole.SUPERVISOR)),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Размер, темп роста и задержка поиска sync_tokens (для контроля компакции)"""
+    return SyncTokenStats(**await SyncService(db).sync_token_stats())
+
+
+SNAPSHOT_MEDIA_TYPE = "application/gzip"
+SNAPSHOT_CHUNK_SIZE = 64 * 1024
+
+
+def _user_snapshot(user: User) -> dict:
+    snapshot = find_snapshot(sync_scope(user))
+    if snapshot is None:
+        raise NotFoundError("SyncSnapshot", user.district_id or user.city_id)
+    return snapshot
+
+
+async def _file_chunks(file: BinaryIO, start: int, length: int) -> AsyncIterator[bytes]:
+    try:
+        await anyio.to_thread.run_sync(file.seek, start)
+        while length > 0:
+            chunk = await anyio.to_thread.run_sync(file.read, min(SNAPSHOT_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+@router.get("/snapshot/info", response_model=SyncSnapshotInfo)
+async def sync_snapshot_info(current_user: User = Depends(get_current_user)):
+    """Метаданные снимка территории текущего инженера (404 - снимка нет, полная синхронизация по /changes)"""
+    return SyncSnapshotInfo(**_user_snapshot(current_user))
+
+
+@router.get(
+    "/snapshot",
+    responses={
+        200: {"content": {SNAPSHOT_MEDIA_TYPE: {}}},
+        206: {"content": {SNAPSHOT_MEDIA_TYPE: {}}},
+        416: {"description": "Range за пределами файла"},
+    },
+)
+async def sync_snapshot(request: Request, current_user: User = Depends(get_current_user)):
+    """
+    Скачать снимок территории (gzip NDJSON в формате потоковой /changes)
+
+    Начальная синхронизация: снимок, затем /changes?owned=true&since=... (свои
+    записи) и /changes?cursor=<курсор снимка>. Поддерживает Range и If-Range
+    (ETag) для докачки: если снимок пересобран, If-Range не совпадёт и файл
+    придёт целиком.
+    """
+    snapshot = _user_snapshot(current_user)
+    etag = f'"{snapshot["sha256"]}"'
+    try:
+        # Открытый файл переживает удаление старых снимков при пересборке
+        file = open(snapshot["path"], "rb")
+    except FileNotFoundError:
+        raise NotFoundError("SyncSnapshot", snapshot["file"])
+    size = snapshot["size"]
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "X-Sync-Cursor": snapshot["cursor"],
+        "Content-Disposition": f'attachment; filename="{snapshot["file"]}"',
+    }
+
+    if_range = request.headers.get("if-range")
+    try:
+        byte_range = parse_byte_range(request.headers.get("range"), size) if if_range in (None, etag) else None
+    except RangeNotSatisfiable:
+        file.close()
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(_file_chunks(file, 0, size), media_type=SNAPSHOT_MEDIA_TYPE, headers=headers)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        _file_chunks(file, start, end - start + 1),
+        status_code=206,
+        media_type=SNAPSHOT_MEDIA_TYPE,
+        headers=headers,
+    )
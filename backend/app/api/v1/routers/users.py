@@ -7,9 +7,10 @@ from fastapi import APIRouter, Depends, Query, status
 
 from app.api.v1.schemas.users import UserCreate, UserUpdate, UserOut, UserMe
 from app.api.v1.deps.security import get_current_user, require_roles
-from app.infrastructure.db.base import get_db
+from app.infrastructure.db.base import get_db, get_read_db
 from app.infrastructure.db.models import User, UserRole
 from app.infrastructure.db.repositories.user_repository import UserRepository
+from app.infrastructure.cache.user_cache import invalidate_user
 from app.core.security import get_password_hash
 from app.core.logging_config import get_logger
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -28,7 +29,7 @@ async def get_me(current_user: User = Depends(get_current_user)):
 @router.get("/", response_model=List[UserOut])
 async def list_users(
     current_user: User = Depends(require_roles(UserRole.ADMIN)),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Список пользователей (только для админов)"""
     repo = UserRepository(db)
@@ -40,7 +41,7 @@ async def list_users(
 async def search_supervisors(
     q: Optional[str] = Query(None, description="Поиск по имени или email"),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Поиск супервайзеров для делегирования"""
     logger.info(
@@ -109,7 +110,7 @@ async def create_user(
 async def get_user(
     user_id: UUID,
     current_user: User = Depends(require_roles(UserRole.ADMIN)),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Получить пользователя по ID"""
     repo = UserRepository(db)
@@ -145,5 +146,8 @@ async def update_user(
     user = await repo.update(user)
     await db.commit()
     
+    # Роль/активность должны примениться к следующему же запросу пользователя
+    await invalidate_user(user.id)
+    
     return UserOut.model_validate(user)
 
@@ -2,27 +2,44 @@
 Роутер визитов
 """
 from uuid import UUID
-from typing import Optional
+from typing import Optional, Union
 from datetime import datetime
 from fastapi import APIRouter, Depends, Query
 
-from app.api.v1.schemas.visits import VisitCreate, VisitUpdate, VisitComplete, VisitOut
-from app.api.v1.schemas.pagination import PageParams, PageResponse
+from app.api.v1.schemas.visits import VisitCreate, VisitUpdate, VisitComplete, VisitOut, VisitBulkItem
+from app.api.v1.schemas.bulk import BulkRequest, BulkResponse
+from app.api.v1.schemas.pagination import PageParams, PageResponse, CursorParams, CursorResponse
 from app.api.v1.deps.security import get_current_user
-from app.infrastructure.db.base import get_db
-from app.infrastructure.db.models import User, Visit, VisitStatus
+from app.infrastructure.db.base import get_db, get_read_db
+from app.infrastructure.db.models import User, Visit, VisitStatus, Object, Unit, Customer
+from app.infrastructure.db.repositories.base import LoadProfile
 from app.infrastructure.db.repositories.visit_repository import VisitRepository
+from app.infrastructure.db.filtering import VisitFilterParams
 from app.core.pagination import get_pagination_offset
 from app.core.errors import NotFoundError, ConflictError
 from app.core.logging_config import get_logger
 from app.domain.services.audit_service import AuditService
+from app.domain.services.bulk_service import BulkService, BulkSpec
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
 logger = get_logger(__name__)
 
+# Списки читаются Core-проекцией: dict'ы валидирует только сериализатор response_model
+_OUT_COLUMNS = tuple(VisitOut.model_fields)
 
-@router.get("/", response_model=PageResponse[VisitOut])
+# Как и в create_visit, инженер визита - текущий пользователь
+_BULK_SPEC = BulkSpec(
+    model=Visit,
+    schema=VisitBulkItem,
+    entity_type="visit",
+    references={"object_id": Object, "unit_id": Unit, "customer_id": Customer},
+    owner_field="engineer_id",
+    insert_values=lambda actor_id: {"engineer_id": actor_id, "status": VisitStatus.PLANNED},
+)
+
+
+@router.get("/", response_model=Union[PageResponse[VisitOut], CursorResponse[VisitOut]])
 async def list_visits(
     object_id: Optional[UUID] = Query(None),
     engineer_id: Optional[UUID] = Query(None),
@@ -30,39 +47,50 @@ async def list_visits(
     status: Optional[VisitStatus] = Query(None),
     date_from: Optional[datetime] = Query(None),
     date_to: Optional[datetime] = Query(None),
+    sort: Optional[str] = Query(None, description="Сортировка: -scheduled_at, -finished_at, status (только по индексам)"),
     params: PageParams = Depends(),
+    cursor_params: CursorParams = Depends(),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Список визитов с фильтрацией и пагинацией"""
     
     repo = VisitRepository(db)
-    offset = get_pagination_offset(params.page, params.limit)
     
     # Если ENGINEER, показываем только его визиты
     if current_user.role.value == "ENGINEER":
         engineer_id = current_user.id
     
-    items, total = await repo.find_by_filters(
+    filters = VisitFilterParams(
         object_id=object_id,
         engineer_id=engineer_id,
         customer_id=customer_id,
         status=status,
         date_from=date_from,
         date_to=date_to,
-        limit=params.limit,
-        offset=offset,
+        sort=sort,
     )
     
-    pages = (total + params.limit - 1) // params.limit if total > 0 else 0
+    if cursor_params.enabled:
+        items, next_cursor = await repo.find_by_filters_cursor(
+            filters,
+            cursor=cursor_params.cursor,
+            size=cursor_params.page_size,
+            columns=_OUT_COLUMNS,
+        )
+        return CursorResponse.payload(items, next_cursor)
     
-    return PageResponse(
-        items=[VisitOut.model_validate(item) for item in items],
-        page=params.page,
-        limit=params.limit,
-        total=total,
-        pages=pages,
+    offset = get_pagination_offset(params.page, params.limit)
+    
+    items, total = await repo.find_by_filters(
+        filters,
+        limit=params.fetch_limit,
+        offset=offset,
+        count=params.count,
+        columns=_OUT_COLUMNS,
     )
+    
+    return PageResponse.payload(items, params, total)
 
 
 @router.post("/", response_model=VisitOut, status_code=201)
@@ -97,28 +125,23 @@ async def create_visit(
     )
     
     db.add(new_visit)
+    await db.flush()
+    
+    # Аудит через outbox - один commit вместе с визитом
+    audit_service = AuditService(db)
+    after_data = {
+        "id": str(new_visit.id),
+        "object_id": str(new_visit.object_id),
+        "status": new_visit.status.value,
+        "engineer_id": str(new_visit.engineer_id),
+    }
+    await audit_service.log_create(
+        entity_type="visit",
+        entity_id=new_visit.id,
+        actor_id=current_user.id,
+        after=after_data,
+    )
     await db.commit()
-    await db.refresh(new_visit)
-    
-    # Логируем в аудит
-    try:
-        audit_service = AuditService(db)
-        after_data = {
-            "id": str(new_visit.id),
-            "object_id": str(new_visit.object_id),
-            "status": new_visit.status.value,
-            "engineer_id": str(new_visit.engineer_id),
-        }
-        await audit_service.log_create(
-            entity_type="visit",
-            entity_id=new_visit.id,
-            actor_id=current_user.id,
-            after=after_data,
-        )
-        await db.commit()
-        logger.debug("Audit log created for visit creation", visit_id=str(new_visit.id))
-    except Exception as e:
-        logger.error("Failed to create audit log", error=str(e), visit_id=str(new_visit.id))
     
     logger.info(
         "Visit created successfully",
@@ -129,16 +152,31 @@ async def create_visit(
     return VisitOut.model_validate(new_visit)
 
 
+@router.post("/bulk", response_model=BulkResponse)
+async def bulk_upsert_visits(
+    data: BulkRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Bulk create/upsert визитов (импорт): результат по каждой строке"""
+    logger.info(
+        "Bulk visits import requested",
+        user_id=str(current_user.id),
+        items=len(data.items),
+    )
+    return await BulkService(db).upsert(_BULK_SPEC, data.items, current_user)
+
+
 @router.get("/{visit_id}", response_model=VisitOut)
 async def get_visit(
     visit_id: UUID,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Получить визит по ID"""
     
     repo = VisitRepository(db)
-    visit = await repo.get(visit_id)
+    visit = await repo.get(visit_id, profile=LoadProfile.LEAN)
     
     if not visit:
         raise NotFoundError("Visit", visit_id)
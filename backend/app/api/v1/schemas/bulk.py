@@ -0,0 +1,34 @@
+"""
+Pydantic схемы для bulk-импорта
+"""
+from uuid import UUID
+from typing import Optional, Literal, Any
+from pydantic import BaseModel, Field
+
+from app.core.config import settings
+
+
+class BulkRequest(BaseModel):
+    """Запрос bulk-импорта (строки валидируются по одной, ошибки - в результатах)"""
+    items: list[dict[str, Any]] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.BULK_MAX_ITEMS,
+        description="Строки в формате схемы создания сущности; поле id - upsert",
+    )
+
+
+class BulkItemResult(BaseModel):
+    """Результат одной строки"""
+    index: int = Field(..., description="Позиция строки в запросе")
+    status: Literal["created", "updated", "error"]
+    id: Optional[UUID] = None
+    error: Optional[str] = None
+
+
+class BulkResponse(BaseModel):
+    """Ответ bulk-импорта"""
+    results: list[BulkItemResult]
+    created_count: int = 0
+    updated_count: int = 0
+    errors_count: int = 0
@@ -18,6 +18,14 @@ def mask_phone(phone: Optional[str], should_mask: bool = True) -> Optional[str]:
     return phone[:5] + "***-**" + phone[-2:]
 
 
+def mask_row_phones(rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Маскирование колонки phone в строках отчёта (на месте)"""
+    for row in rows:
+        if row.get("phone"):
+            row["phone"] = mask_phone(row["phone"])
+    return rows
+
+
 def mask_email(email: Optional[str], should_mask: bool = True) -> Optional[str]:
     """Маскирование email для PII"""
     if not email or not should_mask:
@@ -31,6 +31,11 @@ class CustomerCreate(CustomerBase):
     pass
 
 
+class CustomerBulkItem(CustomerCreate):
+    """Строка bulk-импорта: с id - upsert существующей записи"""
+    id: Optional[UUID] = None
+
+
 class CustomerUpdate(BaseModel):
     """Обновление клиента"""
     full_name: Optional[str] = Field(None, max_length=255)
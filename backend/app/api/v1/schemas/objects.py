@@ -29,6 +29,11 @@ class ObjectCreate(ObjectBase):
     pass
 
 
+class ObjectBulkItem(ObjectCreate):
+    """Строка bulk-импорта: с id - upsert существующей записи"""
+    id: Optional[UUID] = None
+
+
 class ObjectUpdate(BaseModel):
     """Обновление объекта"""
     type: Optional[ObjectType] = None
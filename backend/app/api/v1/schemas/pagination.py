@@ -1,7 +1,7 @@
 """
 Схемы пагинации (переопределение из core)
 """
-from app.core.pagination import PageParams, PageResponse, CursorParams, CursorResponse
+from app.core.pagination import PageParams, PageResponse, CursorParams, CursorResponse, CountStrategy
 
-__all__ = ["PageParams", "PageResponse", "CursorParams", "CursorResponse"]
+__all__ = ["PageParams", "PageResponse", "CursorParams", "CursorResponse", "CountStrategy"]
 
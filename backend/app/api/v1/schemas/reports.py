@@ -31,6 +31,11 @@ class ReportCreate(BaseModel):
     )
 
 
+class ReportStreamRequest(ReportCreate):
+    """Синхронный потоковый экспорт (без задачи и файла)"""
+    format: Literal["csv", "ndjson"] = Field("csv", description="csv - text/csv, ndjson - application/x-ndjson")
+
+
 class ReportJobOut(BaseModel):
     """Вывод задачи экспорта"""
     id: UUID
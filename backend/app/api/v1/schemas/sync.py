@@ -46,7 +46,7 @@ class SyncItemResult(BaseModel):
     """Результат синхронизации одного элемента"""
     client_generated_id: UUID
     server_id: UUID
-    status: Literal["created", "updated", "conflict", "error"]
+    status: Literal["created", "updated", "unchanged", "conflict", "error"]  # unchanged - повтор без записи
     error_message: Optional[str] = None
     diff: Optional[dict[str, Any]] = None  # Для конфликтов
     server_version: Optional[int] = None
@@ -62,9 +62,12 @@ class SyncBatchResponse(BaseModel):
 
 class SyncChangesRequest(BaseModel):
     """Запрос изменений с сервера"""
-    since: datetime = Field(..., description="ISO дата последней синхронизации")
+    since: Optional[datetime] = Field(None, description="ISO дата (первая синхронизация, без cursor)")
+    cursor: Optional[str] = Field(None, description="next_cursor предыдущего ответа")
     tables: list[str] = Field(..., description="Список таблиц для получения изменений")
     limit: int = Field(default=1000, ge=1, le=10000)
+    delta: bool = Field(default=False, description="С cursor: для update только изменённые колонки")
+    owned: bool = Field(default=False, description="Только свои записи (дочитка после снимка территории)")
 
 
 class SyncChangeItem(BaseModel):
@@ -73,6 +76,7 @@ class SyncChangeItem(BaseModel):
     table_name: str
     action: Literal["create", "update", "delete"]
     data: Optional[dict[str, Any]] = None
+    columns: Optional[list[str]] = Field(None, description="Дельта: колонки в data (остальные не менялись); null - строка целиком")
     updated_at: datetime
     version: int
 
@@ -83,3 +87,25 @@ class SyncChangesResponse(BaseModel):
     has_more: bool
     next_cursor: Optional[str] = None
 
+
+
+class SyncTokenStats(BaseModel):
+    """Метрики таблицы sync_tokens"""
+    total: int
+    by_table: dict[str, int]
+    growth_per_hour: Optional[float] = Field(None, description="Прирост токенов в час с последней компакции")
+    lookup_p50_ms: float = Field(..., description="Медиана поиска по client_generated_id")
+    lookup_max_ms: float
+    table_bytes: Optional[int] = Field(None, description="Таблица с индексами (Postgres)")
+    index_bytes: Optional[int] = Field(None, description="Индекс client_generated_id (Postgres)")
+
+
+class SyncSnapshotInfo(BaseModel):
+    """Снимок территории для начальной синхронизации"""
+    city_id: UUID
+    district_id: Optional[UUID] = None
+    size: int = Field(..., description="Размер файла (gzip) в байтах")
+    sha256: str = Field(..., description="Хэш файла, он же ETag")
+    items: int = Field(..., description="Сущностей в снимке")
+    cursor: str = Field(..., description="Курсор /sync/changes, с которого дочитывается лента")
+    built_at: datetime
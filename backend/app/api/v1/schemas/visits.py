@@ -23,6 +23,11 @@ class VisitCreate(VisitBase):
     pass
 
 
+class VisitBulkItem(VisitCreate):
+    """Строка bulk-импорта: с id - upsert существующей записи"""
+    id: Optional[UUID] = None
+
+
 class VisitUpdate(BaseModel):
     """Обновление визита"""
     object_id: Optional[UUID] = None
@@ -0,0 +1,103 @@
+"""
+Сжатие транспорта: распаковка тел запросов и gzip потоковых ответов
+
+zstd поддерживается при установленном пакете zstandard.
+"""
+import zlib
+from typing import Any, AsyncIterable, AsyncIterator, Optional
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstd опционален
+    zstandard = None
+
+# Блок zstd распаковывается не больше чем в 128 КБ и занимает во входе не меньше
+# 4 байт (заголовок 3 байта + 1 байт RLE): k байт входа дают не больше k / 4 блоков
+ZSTD_MAX_BLOCK_SIZE = 128 * 1024
+ZSTD_MIN_BLOCK_INPUT = 4
+
+
+class Decompressor:
+    """Потоковая распаковка тела с ограничением итогового размера"""
+    
+    def __init__(self, encoding: str, max_size: int):
+        self.max_size = max_size
+        self.size = 0
+        if encoding in ("gzip", "x-gzip"):
+            self._zlib: Optional[Any] = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            self._zstd = None
+        elif encoding == "deflate":
+            self._zlib = zlib.decompressobj()
+            self._zstd = None
+        else:  # zstd
+            self._zlib = None
+            self._zstd = zstandard.ZstdDecompressor().decompressobj()
+    
+    def decompress(self, chunk: bytes) -> bytes:
+        """Распаковать очередной кусок; ValueError - битые данные, OverflowError - превышен max_size"""
+        try:
+            if self._zlib is None:
+                return self._decompress_zstd(chunk)
+            # max_length ограничивает распаковку одного куска (zip-бомбы)
+            data = self._zlib.decompress(chunk, self.max_size - self.size + 1)
+        except zlib.error as e:
+            raise ValueError(str(e)) from e
+        except Exception as e:
+            if zstandard is not None and isinstance(e, zstandard.ZstdError):
+                raise ValueError(str(e)) from e
+            raise
+        return self._count(data)
+    
+    def _decompress_zstd(self, chunk: bytes) -> bytes:
+        """
+        zstd по частям входа: у decompressobj нет предела выхода, поэтому вход
+        режется так, чтобы распакованное превысило остаток max_size не больше
+        чем на два блока (начатый и новый) - бомба обрывается, не раздувшись в памяти
+        """
+        parts = []
+        view = memoryview(chunk)
+        while view:
+            blocks = max(1, (self.max_size - self.size) // ZSTD_MAX_BLOCK_SIZE)
+            step = blocks * ZSTD_MIN_BLOCK_INPUT
+            parts.append(self._count(self._zstd.decompress(view[:step].tobytes())))
+            view = view[step:]
+        return b"".join(parts)
+    
+    def flush(self) -> bytes:
+        """Остаток после последнего куска"""
+        if self._zlib is None:
+            return b""
+        if not self._zlib.eof:
+            raise ValueError("Truncated compressed body")
+        return self._count(self._zlib.flush())
+    
+    def _count(self, data: bytes) -> bytes:
+        self.size += len(data)
+        if self.size > self.max_size:
+            raise OverflowError("Decompressed body too large")
+        return data
+
+
+def supported_encodings() -> tuple[str, ...]:
+    """Content-Encoding, которые умеет распаковывать сервер"""
+    encodings = ("gzip", "x-gzip", "deflate")
+    return encodings + ("zstd",) if zstandard is not None else encodings
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Принимает ли клиент gzip (по заголовку Accept-Encoding)"""
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip() in ("gzip", "*"):
+            return params.replace(" ", "") != "q=0"
+    return False
+
+
+async def gzip_stream(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """gzip потока: каждый кусок сбрасывается (Z_SYNC_FLUSH), клиент распаковывает сразу"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -29,6 +29,8 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite+aiosqlite:///./data/crm.db"
+    DATABASE_REPLICA_URLS: List[str] = Field(default_factory=list)  # Реплики для чтения (JSON-список)
+    READ_YOUR_WRITES_SECONDS: int = 5  # Сколько после записи пользователь читает с primary
     
     # JWT
     JWT_SECRET: str = Field(..., min_length=32)
@@ -39,12 +41,53 @@ class Settings(BaseSettings):
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
     REDIS_CACHE_TTL_SECONDS: int = 300
+    USER_CACHE_TTL_SECONDS: int = 60  # Кэш пользователей в Redis
+    USER_CACHE_LOCAL_TTL_SECONDS: int = 5  # LRU в памяти процесса
+    USER_CACHE_SIZE: int = 1024
+    
+    # Audit outbox
+    AUDIT_OUTBOX_DRAINER_ENABLED: bool = False  # Перенос outbox -> audit_logs в процессе API (dev; иначе scripts/run_background_jobs.py)
+    AUDIT_OUTBOX_DRAIN_INTERVAL_SECONDS: float = 1.0
+    AUDIT_OUTBOX_BATCH_SIZE: int = 500
+    
+    # Offline sync
+    SYNC_MAX_OFFLINE_DAYS: int = 30  # Окно хранения tombstone'ов; более старый курсор -> полная синхронизация
+    SYNC_COMPACTION_ENABLED: bool = False  # Компакция журнала изменений в процессе API (dev; иначе scripts/run_background_jobs.py)
+    SYNC_COMPACTION_INTERVAL_SECONDS: int = 3600
+    SYNC_STREAM_BATCH_SIZE: int = 500  # Строк журнала на fetch серверного курсора (NDJSON-выдача)
+    SYNC_BATCH_CHUNK_SIZE: int = 100  # Элементов /sync/batch на flush (SAVEPOINT) и commit
+    SYNC_TOKEN_TTL_DAYS: int = 90  # Токены без активности дольше удаляются (не меньше SYNC_MAX_OFFLINE_DAYS)
+    SYNC_TOKEN_COMPACTION_ENABLED: bool = False  # Компакция sync_tokens в процессе API (dev; иначе scripts/run_background_jobs.py)
+    SYNC_TOKEN_COMPACTION_INTERVAL_SECONDS: int = 3600
+    SYNC_TOKEN_COMPACTION_BATCH_SIZE: int = 5000  # Токенов на DELETE (и commit)
+    SYNC_SNAPSHOT_ENABLED: bool = False  # Сборка снимков территорий в процессе API (dev; иначе scripts/run_background_jobs.py)
+    SYNC_SNAPSHOT_INTERVAL_SECONDS: int = 3600
+    SYNC_SNAPSHOT_PATH: str = "./data/sync_snapshots"
+    
+    # Bulk import
+    BULK_MAX_ITEMS: int = 50000  # Строк в одном запросе /bulk
+    BULK_CHUNK_SIZE: int = 1000  # Строк в одной транзакции (и одной записи аудита)
     
     # Files
     FILE_STORAGE: str = "local"  # local | s3
     FILES_PATH: str = "./data/files"
     REPORTS_PATH: str = "./data/reports"
+    REPORT_EXPORT_BATCH_SIZE: int = 2000  # Строк отчёта на fetch серверного курсора (экспорт XLSX)
     MAX_FILE_SIZE_MB: int = 10
+    MAX_DECOMPRESSED_BODY_MB: int = 64  # Предел распакованного тела (Content-Encoding: gzip/zstd)
+    
+    # Report worker
+    REPORT_QUEUE_BACKEND: str = "redis"  # redis | local (asyncio.Queue в процессе - dev и тесты)
+    REPORT_WORKER_IN_PROCESS: bool = False  # Воркер отчётов в процессе API (вместо scripts/run_report_worker.py)
+    REPORT_WORKER_CONCURRENCY: int = 4  # Задач экспорта одновременно на процесс воркера
+    REPORT_WORKER_POLL_SECONDS: float = 2.0  # Ожидание очереди; по истечении - поиск pending-задач в БД
+    REPORT_WORKER_HEARTBEAT_SECONDS: float = 10.0
+    REPORT_JOB_STALE_SECONDS: int = 60  # Задача без heartbeat дольше считается брошенной и возвращается в очередь
+    REPORT_JOB_MAX_ATTEMPTS: int = 3  # Попыток взять задачу (после падений воркера), дальше - failed
+    REPORT_CACHE_ENABLED: bool = True  # Повторный экспорт по неизменившимся данным отдаёт готовый файл
+    REPORT_CACHE_MAX_MB: int = 2048  # Бюджет REPORTS_PATH; сверх него удаляются давно не запрошенные файлы
+    REPORT_CACHE_TTL_DAYS: int = 7  # Файлы без обращений дольше удаляются (не больше SYNC_MAX_OFFLINE_DAYS)
+    REPORT_CACHE_EVICTION_INTERVAL_SECONDS: int = 600
     
     # Security
     CORS_ORIGINS: List[str] = Field(default_factory=lambda: ["http://localhost:3000", "http://localhost:8080"])
@@ -55,10 +98,10 @@ class Settings(BaseSettings):
     LOG_LEVEL: str = "INFO"
     LOG_FORMAT: str = "json"
     
-    @field_validator("CORS_ORIGINS", mode="before")
+    @field_validator("CORS_ORIGINS", "DATABASE_REPLICA_URLS", mode="before")
     @classmethod
-    def parse_cors_origins(cls, v):
-        """Парсинг CORS_ORIGINS из строки или списка"""
+    def parse_json_list(cls, v):
+        """Парсинг списков (CORS_ORIGINS, DATABASE_REPLICA_URLS) из строки или списка"""
         if isinstance(v, str):
             import json
             return json.loads(v)
@@ -68,6 +111,11 @@ class Settings(BaseSettings):
     def max_file_size_bytes(self) -> int:
         """Максимальный размер файла в байтах"""
         return self.MAX_FILE_SIZE_MB * 1024 * 1024
+    
+    @property
+    def max_decompressed_body_bytes(self) -> int:
+        """Максимальный размер распакованного тела запроса в байтах"""
+        return self.MAX_DECOMPRESSED_BODY_MB * 1024 * 1024
 
 
 settings = Settings()
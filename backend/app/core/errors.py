@@ -80,6 +80,17 @@ class ConflictError(AppError):
         )
 
 
+class CursorExpiredError(AppError):
+    """Курсор синхронизации старше окна хранения журнала - нужна полная синхронизация"""
+    
+    def __init__(self, message: str = "Sync cursor expired, full resync required"):
+        super().__init__(
+            message=message,
+            status_code=status.HTTP_410_GONE,
+            error_code="CURSOR_EXPIRED",
+        )
+
+
 class RateLimitError(AppError):
     """Превышен лимит запросов"""
     
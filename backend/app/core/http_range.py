@@ -0,0 +1,36 @@
+"""
+Заголовок Range для докачки файлов (RFC 9110, один диапазон байтов)
+"""
+from typing import Optional
+
+
+class RangeNotSatisfiable(Exception):
+    """Диапазон за пределами файла - ответ 416"""
+
+
+def parse_byte_range(header: Optional[str], size: int) -> Optional[tuple[int, int]]:
+    """
+    Диапазон из заголовка Range: (start, end) включительно
+
+    None - отдать файл целиком (заголовка нет, он не разобран или в нём
+    несколько диапазонов: сервер вправе их игнорировать).
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_text, _, end_text = header[len("bytes="):].strip().partition("-")
+    try:
+        if not start_text:
+            # bytes=-N - последние N байт
+            suffix = int(end_text)
+            if suffix <= 0:
+                raise RangeNotSatisfiable(header)
+            return max(size - suffix, 0), size - 1
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    if start > end:
+        return None
+    return start, min(end, size - 1)
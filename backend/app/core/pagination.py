@@ -1,34 +1,108 @@
 """
 Утилиты для пагинации (page-based и cursor-based)
 """
-from typing import Generic, TypeVar, Optional
+import base64
+import enum
+import json
+from datetime import datetime
+from typing import Generic, TypeVar, Optional, Any
+from uuid import UUID
 from pydantic import BaseModel, Field
 
+from app.core.errors import ValidationError
+
 T = TypeVar("T")
 
+DEFAULT_CURSOR_SIZE = 20
+
+
+class CountStrategy(str, enum.Enum):
+    """Стратегия подсчёта total для page-based пагинации"""
+    EXACT = "exact"          # SELECT count(*) на каждый запрос
+    ESTIMATED = "estimated"  # Оценка планировщика (Postgres), иначе exact
+    CACHED = "cached"        # Точное значение из Redis, сбрасывается при записи в таблицу
+    NONE = "none"            # Без подсчёта, только has_more
+
 
 class PageParams(BaseModel):
     """Параметры page-based пагинации"""
     page: int = Field(default=1, ge=1, description="Номер страницы (начиная с 1)")
     limit: int = Field(default=20, ge=1, le=100, description="Количество элементов на странице")
+    count: CountStrategy = Field(default=CountStrategy.EXACT, description="Подсчёт total: exact, estimated, cached, none")
+    
+    @property
+    def fetch_limit(self) -> int:
+        """Сколько строк запрашивать: без подсчёта берём +1, чтобы узнать has_more"""
+        if self.count == CountStrategy.NONE:
+            return self.limit + 1
+        return self.limit
 
 
 class CursorParams(BaseModel):
-    """Параметры cursor-based пагинации"""
+    """Параметры cursor-based пагинации
+    
+    Режим включается, если передан `cursor` (пустое значение — первая страница)
+    или `size`. Иначе эндпойнт работает в page-режиме.
+    """
     cursor: Optional[str] = Field(default=None, description="Курсор для следующей страницы")
-    size: int = Field(default=20, ge=1, le=100, description="Размер страницы")
+    size: Optional[int] = Field(default=None, ge=1, le=100, description="Размер страницы")
+    
+    @property
+    def enabled(self) -> bool:
+        return self.cursor is not None or self.size is not None
+    
+    @property
+    def page_size(self) -> int:
+        return self.size or DEFAULT_CURSOR_SIZE
 
 
 class PageResponse(BaseModel, Generic[T]):
-    """Ответ page-based пагинации"""
+    """Ответ page-based пагинации
+    
+    При count=none поля total и pages не заполняются, признак следующей
+    страницы передаётся в has_more.
+    """
     items: list[T]
     page: int
     limit: int
-    total: int
-    pages: int
+    total: Optional[int] = None
+    pages: Optional[int] = None
+    has_more: Optional[bool] = None
+    
+    @classmethod
+    def build(cls, items: list[Any], params: PageParams, total: Optional[int]) -> "PageResponse":
+        """Собрать ответ с учётом стратегии подсчёта"""
+        return cls(**cls.payload(items, params, total))
+    
+    @staticmethod
+    def payload(items: list[Any], params: PageParams, total: Optional[int]) -> dict[str, Any]:
+        """
+        Тело ответа как dict (без валидации)
+        
+        Для проекций: строки-dict'ы проверяет только сериализатор response_model.
+        """
+        if total is None:
+            return {
+                "items": items[:params.limit],
+                "page": params.page,
+                "limit": params.limit,
+                "has_more": len(items) > params.limit,
+            }
+        
+        pages = (total + params.limit - 1) // params.limit if total > 0 else 0
+        return {
+            "items": items,
+            "page": params.page,
+            "limit": params.limit,
+            "total": total,
+            "pages": pages,
+            "has_more": params.page < pages,
+        }
     
     @property
     def has_next(self) -> bool:
+        if self.pages is None:
+            return bool(self.has_more)
         return self.page < self.pages
     
     @property
@@ -41,9 +115,65 @@ class CursorResponse(BaseModel, Generic[T]):
     items: list[T]
     next_cursor: Optional[str] = None
     has_more: bool
+    
+    @staticmethod
+    def payload(items: list[Any], next_cursor: Optional[str]) -> dict[str, Any]:
+        """Тело ответа как dict (без валидации)"""
+        return {"items": items, "next_cursor": next_cursor, "has_more": next_cursor is not None}
 
 
 def get_pagination_offset(page: int, limit: int) -> int:
     """Получить offset для SQL запроса"""
     return (page - 1) * limit
 
+
+def encode_cursor(sort_value: Optional[datetime], id: UUID) -> str:
+    """Упаковать позицию (sort_key, id) в непрозрачный курсор"""
+    raw = json.dumps([sort_value.isoformat() if sort_value else None, str(id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[tuple[Optional[datetime], UUID]]:
+    """
+    Распаковать курсор в (sort_key, id)
+    
+    Пустой курсор означает первую страницу и возвращает None.
+    """
+    if not cursor:
+        return None
+    
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_raw, id_raw = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        sort_value = datetime.fromisoformat(sort_raw) if sort_raw is not None else None
+        return sort_value, UUID(id_raw)
+    except (ValueError, TypeError, json.JSONDecodeError):
+        raise ValidationError("Invalid cursor", fields={"cursor": ["malformed"]})
+
+
+def encode_sequence_cursor(seq: int, at: datetime) -> str:
+    """
+    Упаковать позицию в журнале изменений в непрозрачный курсор
+    
+    at - время, до которого клиент гарантированно прочитал журнал
+    (по нему определяется, не устарел ли курсор после компакции).
+    """
+    raw = json.dumps({"seq": seq, "at": at.isoformat()})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_sequence_cursor(cursor: Optional[str]) -> Optional[tuple[int, Optional[datetime]]]:
+    """Распаковать курсор журнала изменений в (seq, at); None - курсор не передан"""
+    if not cursor:
+        return None
+    
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        seq = raw["seq"]
+        if not isinstance(seq, int) or seq < 0:
+            raise ValueError(seq)
+        at = datetime.fromisoformat(raw["at"]) if raw.get("at") else None
+        return seq, at
+    except (ValueError, TypeError, KeyError, AttributeError, json.JSONDecodeError):
+        raise ValidationError("Invalid cursor", fields={"cursor": ["malformed"]})
@@ -2,7 +2,9 @@
 Нормализация телефонов в формате E.164
 """
 import re
-from typing import Optional
+from typing import Iterable, Optional
+
+_NON_PHONE_CHARS = re.compile(r"[^\d+]")
 
 
 def normalize_phone(phone: Optional[str]) -> Optional[str]:
@@ -20,7 +22,7 @@ def normalize_phone(phone: Optional[str]) -> Optional[str]:
         return None
     
     # Убираем все символы кроме цифр и +
-    cleaned = re.sub(r"[^\d+]", "", phone)
+    cleaned = _NON_PHONE_CHARS.sub("", phone)
     
     # Если начинается с 8, заменяем на +7
     if cleaned.startswith("8"):
@@ -47,6 +49,24 @@ def normalize_phone(phone: Optional[str]) -> Optional[str]:
     return f"+7{digits}"
 
 
+def normalize_phones(phones: Iterable[Optional[str]]) -> list[Optional[str]]:
+    """
+    Нормализовать пачку телефонов (для bulk-импорта)
+    
+    Повторяющиеся значения нормализуются один раз.
+    """
+    normalized: dict[str, Optional[str]] = {}
+    result = []
+    for phone in phones:
+        if not phone:
+            result.append(None)
+            continue
+        if phone not in normalized:
+            normalized[phone] = normalize_phone(phone)
+        result.append(normalized[phone])
+    return result
+
+
 def validate_phone(phone: Optional[str]) -> bool:
     """Проверить, что телефон валиден после нормализации"""
     normalized = normalize_phone(phone)
@@ -129,6 +129,11 @@ def get_scopes_from_role(role: str) -> List[str]:
     return role_scopes.get(role, [])
 
 
+def has_pii_access(role: str) -> bool:
+    """Доступ к PII без маскирования (как в списке клиентов)"""
+    return "admin:*" in get_scopes_from_role(role) or role == "ADMIN"
+
+
 def require_scopes(*required_scopes: str):
     """Декоратор для проверки scopes"""
     def _check_scopes(payload: dict = Depends(get_token_payload)) -> dict:
@@ -1,17 +1,42 @@
 """
 Сервис аудита для записи всех изменений
+
+Записи аудита не пишутся в audit_logs напрямую: log_* кладут строку в
+audit_outbox той же сессией, и она коммитится одной транзакцией с изменением
+сущности. Дренер (drain_outbox / run_outbox_drainer) пачками переносит
+outbox в audit_logs.
 """
-from uuid import UUID
-from typing import Optional, Any, Optional
+import asyncio
+from uuid import UUID, uuid4
+from typing import Optional, Any
 from datetime import datetime
+from sqlalchemy import select, insert, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.infrastructure.db.models import AuditLog, ActionType, User
+from app.infrastructure.db.models import AuditLog, AuditOutbox, ActionType
+from app.infrastructure.cache.count_cache import mark_tables_written
+from app.core.config import settings
 from app.core.logging_config import get_logger
 
 logger = get_logger(__name__)
 
 
+def _audit_values(payload: dict[str, Any]) -> dict[str, Any]:
+    """Значения колонок audit_logs из payload outbox"""
+    return {
+        "id": UUID(payload["id"]),
+        "actor_id": UUID(payload["actor_id"]) if payload.get("actor_id") else None,
+        "action": ActionType(payload["action"]),
+        "entity_type": payload.get("entity_type"),
+        "entity_id": UUID(payload["entity_id"]) if payload.get("entity_id") else None,
+        "before_json": payload.get("before"),
+        "after_json": payload.get("after"),
+        "ip_address": payload.get("ip_address"),
+        "user_agent": payload.get("user_agent"),
+        "occurred_at": datetime.fromisoformat(payload["occurred_at"]),
+    }
+
+
 class AuditService:
     """Сервис аудита"""
     
@@ -22,47 +47,65 @@ class AuditService:
         self,
         action: ActionType,
         entity_type: str,
-        entity_id: UUID,
+        entity_id: Optional[UUID],
         actor_id: Optional[UUID],
         before: Optional[dict[str, Any]] = None,
         after: Optional[dict[str, Any]] = None,
         ip_address: Optional[str] = None,
         user_agent: Optional[str] = None,
-    ) -> AuditLog:
-        """Записать действие в аудит"""
+    ) -> UUID:
+        """
+        Записать действие в аудит (через outbox)
+        
+        Без flush и commit: запись уходит в БД вместе с изменением сущности
+        при commit вызывающего кода. Возвращает id будущей записи audit_logs.
+        """
+        audit_log_id = uuid4()
+        self.session.add(AuditOutbox(payload={
+            "id": str(audit_log_id),
+            "actor_id": str(actor_id) if actor_id else None,
+            "action": action.value,
+            "entity_type": entity_type,
+            "entity_id": str(entity_id) if entity_id else None,
+            "before": before,
+            "after": after,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "occurred_at": datetime.utcnow().isoformat(),
+        }))
+        
         logger.debug(
-            "Logging audit action",
+            "Audit action queued",
+            audit_log_id=str(audit_log_id),
             action=action.value,
             entity_type=entity_type,
             entity_id=str(entity_id),
             actor_id=str(actor_id) if actor_id else None,
         )
         
-        audit_log = AuditLog(
-            actor_id=actor_id,
-            action=action,
-            entity_type=entity_type,
-            entity_id=entity_id,
-            before_json=before,
-            after_json=after,
-            ip_address=ip_address,
-            user_agent=user_agent,
-            occurred_at=datetime.utcnow(),
+        return audit_log_id
+    
+    async def drain_outbox(self, batch_size: int = 500) -> int:
+        """Перенести пачку outbox в audit_logs одной транзакцией; возвращает число записей"""
+        result = await self.session.execute(
+            select(AuditOutbox.id, AuditOutbox.payload)
+            .order_by(AuditOutbox.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)  # Postgres: параллельные дренеры не пересекаются
         )
+        rows = result.all()
+        if not rows:
+            return 0
         
-        self.session.add(audit_log)
-        await self.session.flush()
-        
-        logger.info(
-            "Audit action logged",
-            audit_log_id=str(audit_log.id),
-            action=action.value,
-            entity_type=entity_type,
-            entity_id=str(entity_id),
-            actor_id=str(actor_id) if actor_id else None,
+        await self.session.execute(insert(AuditLog), [_audit_values(row.payload) for row in rows])
+        await self.session.execute(
+            delete(AuditOutbox).where(AuditOutbox.id.in_([row.id for row in rows]))
         )
+        mark_tables_written(self.session, AuditLog.__tablename__)
+        await self.session.commit()
         
-        return audit_log
+        logger.debug("Audit outbox drained", count=len(rows))
+        return len(rows)
     
     async def log_create(
         self,
@@ -72,7 +115,7 @@ class AuditService:
         after: dict[str, Any],
         ip_address: Optional[str] = None,
         user_agent: Optional[str] = None,
-    ) -> AuditLog:
+    ) -> UUID:
         """Записать создание"""
         return await self.log_action(
             action=ActionType.CREATE,
@@ -94,7 +137,7 @@ class AuditService:
         after: dict[str, Any],
         ip_address: Optional[str] = None,
         user_agent: Optional[str] = None,
-    ) -> AuditLog:
+    ) -> UUID:
         """Записать обновление"""
         return await self.log_action(
             action=ActionType.UPDATE,
@@ -115,7 +158,7 @@ class AuditService:
         before: dict[str, Any],
         ip_address: Optional[str] = None,
         user_agent: Optional[str] = None,
-    ) -> AuditLog:
+    ) -> UUID:
         """Записать удаление"""
         return await self.log_action(
             action=ActionType.DELETE,
@@ -135,7 +178,7 @@ class AuditService:
         filters: Optional[dict[str, Any]] = None,
         ip_address: Optional[str] = None,
         user_agent: Optional[str] = None,
-    ) -> AuditLog:
+    ) -> UUID:
         """Записать экспорт"""
         return await self.log_action(
             action=ActionType.EXPORT,
@@ -148,3 +191,28 @@ class AuditService:
             user_agent=user_agent,
         )
 
+
+
+async def run_outbox_drainer(
+    interval: Optional[float] = None,
+    batch_size: Optional[int] = None,
+) -> None:
+    """Фоновый цикл дренера outbox (scripts/run_background_jobs.py; в dev - lifespan приложения)"""
+    from app.infrastructure.db.base import AsyncSessionLocal
+    
+    interval = interval if interval is not None else settings.AUDIT_OUTBOX_DRAIN_INTERVAL_SECONDS
+    batch_size = batch_size or settings.AUDIT_OUTBOX_BATCH_SIZE
+    
+    while True:
+        try:
+            async with AsyncSessionLocal() as session:
+                drained = await AuditService(session).drain_outbox(batch_size)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Audit outbox drain failed", error=str(e))
+            drained = 0
+        
+        # Полная пачка - вероятно, есть ещё; не ждём
+        if drained < batch_size:
+            await asyncio.sleep(interval)
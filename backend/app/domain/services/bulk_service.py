@@ -0,0 +1,302 @@
+"""
+Сервис bulk-импорта (create/upsert пачками)
+
+Строки валидируются по одной: ошибка строки попадает в её результат и не
+прерывает импорт. Импорт идёт чанками по BULK_CHUNK_SIZE: на чанк - один
+SELECT по каждому внешнему ключу и ключу upsert, multi-row INSERT
+(executemany) новых строк, executemany UPDATE существующих, записи журнала
+изменений, запись аудита на каждое действие (CREATE, UPDATE) и commit.
+Нарушение ограничения БД откатывает только SAVEPOINT чанка: чанк
+переписывается по строке, и ошибку получают лишь отклонённые строки.
+"""
+from dataclasses import dataclass, field
+from itertools import groupby
+from typing import Any, Callable, Optional, Sequence
+from uuid import UUID, uuid4
+
+from pydantic import BaseModel, ValidationError as PydanticValidationError
+from sqlalchemy import select, insert, update, bindparam
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.core.phone_normalization import normalize_phones
+from app.domain.services.audit_service import AuditService
+from app.infrastructure.cache.count_cache import mark_tables_written
+from app.infrastructure.db.change_log import record_changes
+from app.infrastructure.db.models import ActionType, User, UserRole
+
+logger = get_logger(__name__)
+
+
+def _no_values(actor_id: UUID) -> dict[str, Any]:
+    return {}
+
+
+@dataclass(frozen=True)
+class BulkSpec:
+    """Описание импортируемой сущности"""
+    model: Any
+    schema: type[BaseModel]  # Схема строки (с необязательным id)
+    entity_type: str  # Для аудита
+    references: dict[str, Any] = field(default_factory=dict)  # Поле -> модель, на которую ссылается
+    phone_fields: tuple[str, ...] = ()  # Нормализуются в E.164
+    unique_phone: Optional[str] = None  # UNIQUE-телефон: ещё и ключ upsert
+    owner_field: Optional[str] = None  # ENGINEER обновляет только свои записи
+    insert_values: Callable[[UUID], dict[str, Any]] = _no_values  # Серверные поля при создании (по id автора)
+    update_values: Callable[[UUID], dict[str, Any]] = _no_values  # Серверные поля при обновлении
+
+    @property
+    def table(self) -> Any:
+        return self.model.__table__
+
+
+def _validation_message(error: PydanticValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors()
+    )
+
+
+class BulkService:
+    """Сервис bulk-импорта"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def upsert(self, spec: BulkSpec, items: Sequence[dict[str, Any]], actor: User) -> dict[str, Any]:
+        """
+        Импортировать строки; возвращает payload BulkResponse
+
+        Строка с id существующей записи (или, для unique_phone, с телефоном
+        существующей записи) обновляет её переданными полями, остальные создаются.
+        Каждый чанк коммитится отдельно: ошибка БД откатывает только свой чанк.
+        """
+        # Откат чанка expire'ит объекты сессии - берём поля автора заранее
+        actor_id = actor.id
+        restricted = actor.role == UserRole.ENGINEER and spec.owner_field is not None
+        results: list[dict[str, Any]] = []
+        seen: set[Any] = set()  # id и unique-телефоны, уже встреченные в запросе
+        chunk_size = settings.BULK_CHUNK_SIZE
+
+        for start in range(0, len(items), chunk_size):
+            chunk = items[start:start + chunk_size]
+            results.extend(await self._upsert_chunk(spec, start, chunk, actor_id, restricted, seen))
+
+        counts = {"created": 0, "updated": 0, "error": 0}
+        for result in results:
+            counts[result["status"]] += 1
+
+        logger.info(
+            "Bulk import finished",
+            entity_type=spec.entity_type,
+            actor_id=str(actor_id),
+            total=len(items),
+            created=counts["created"],
+            updated=counts["updated"],
+            errors=counts["error"],
+        )
+
+        return {
+            "results": results,
+            "created_count": counts["created"],
+            "updated_count": counts["updated"],
+            "errors_count": counts["error"],
+        }
+
+    async def _upsert_chunk(
+        self,
+        spec: BulkSpec,
+        offset: int,
+        chunk: Sequence[dict[str, Any]],
+        actor_id: UUID,
+        restricted: bool,
+        seen: set[Any],
+    ) -> list[dict[str, Any]]:
+        results: dict[int, dict[str, Any]] = {}
+
+        def fail(index: int, message: str, entity_id: Optional[UUID] = None) -> None:
+            results[index] = {"index": index, "status": "error", "id": entity_id, "error": message}
+
+        # 1. Валидация строк
+        rows: list[tuple[int, BaseModel]] = []
+        for position, raw in enumerate(chunk):
+            index = offset + position
+            try:
+                rows.append((index, spec.schema.model_validate(raw)))
+            except PydanticValidationError as e:
+                fail(index, _validation_message(e))
+
+        # 2. Нормализация телефонов пачкой
+        phones: dict[int, dict[str, Optional[str]]] = {index: {} for index, _ in rows}
+        for name in spec.phone_fields:
+            raw_phones = [getattr(item, name) for _, item in rows]
+            for (index, _), raw_phone, phone in zip(rows, raw_phones, normalize_phones(raw_phones)):
+                if raw_phone and not phone:
+                    fail(index, f"{name}: invalid phone number")
+                phones[index][name] = phone
+        rows = [(index, item) for index, item in rows if index not in results]
+
+        # 3. Существующие записи: по id и по уникальному телефону
+        ids = [item.id for _, item in rows if item.id]
+        existing_owners: dict[UUID, Any] = {}
+        if ids:
+            owner_column = getattr(spec.model, spec.owner_field) if spec.owner_field else spec.model.id
+            result = await self.session.execute(
+                select(spec.model.id, owner_column).where(spec.model.id.in_(ids))
+            )
+            existing_owners = {row[0]: row[1] for row in result.all()}
+
+        phone_owners: dict[str, UUID] = {}
+        if spec.unique_phone:
+            unique_phones = [phones[index][spec.unique_phone] for index, _ in rows]
+            unique_phones = [phone for phone in unique_phones if phone]
+            if unique_phones:
+                phone_column = getattr(spec.model, spec.unique_phone)
+                result = await self.session.execute(
+                    select(phone_column, spec.model.id).where(phone_column.in_(unique_phones))
+                )
+                phone_owners = {row[0]: row[1] for row in result.all()}
+
+        # 4. Внешние ключи: один SELECT на поле
+        missing: dict[str, set[Any]] = {}
+        for name, target in spec.references.items():
+            values = {getattr(item, name) for _, item in rows if getattr(item, name) is not None}
+            if values:
+                result = await self.session.execute(select(target.id).where(target.id.in_(values)))
+                missing[name] = values - set(result.scalars().all())
+
+        # 5. Раскладка строк на INSERT и UPDATE
+        inserts: list[tuple[int, UUID, dict[str, Any]]] = []
+        updates: list[tuple[int, UUID, dict[str, Any]]] = []
+        for index, item in rows:
+            broken = next(
+                (name for name, values in missing.items() if getattr(item, name) in values), None
+            )
+            if broken:
+                fail(index, f"{broken}: referenced record not found")
+                continue
+
+            phone = phones[index].get(spec.unique_phone) if spec.unique_phone else None
+            entity_id = item.id
+            if phone and phone in phone_owners:
+                if entity_id and entity_id != phone_owners[phone]:
+                    fail(index, f"{spec.unique_phone}: already used by {phone_owners[phone]}", entity_id)
+                    continue
+                entity_id = phone_owners[phone]
+
+            keys = [key for key in (entity_id, phone and ("phone", phone)) if key]
+            if any(key in seen for key in keys):
+                fail(index, "duplicate row in request", entity_id)
+                continue
+            seen.update(keys)
+
+            if entity_id is not None and (entity_id in existing_owners or phone_owners.get(phone) == entity_id):
+                if restricted and existing_owners.get(entity_id) != actor_id:
+                    fail(index, "record not found", entity_id)
+                    continue
+                values = item.model_dump(exclude_unset=True, exclude={"id"})
+                values.update({name: value for name, value in phones[index].items() if name in values})
+                values.update(spec.update_values(actor_id))
+                updates.append((index, entity_id, values))
+            else:
+                entity_id = entity_id or uuid4()
+                values = item.model_dump(exclude={"id"})
+                values.update(phones[index])
+                values.update(spec.insert_values(actor_id))
+                values["id"] = entity_id
+                inserts.append((index, entity_id, values))
+
+        # 6. Запись чанка: multi-row INSERT + executemany UPDATE в SAVEPOINT
+        if inserts or updates:
+            try:
+                async with self.session.begin_nested():
+                    await self._write(spec, inserts, updates)
+            except IntegrityError as e:
+                # Нарушение ограничения (например, телефон, вставленный параллельно) -
+                # откатывается только SAVEPOINT чанка, строки пишутся по одной
+                logger.warning(
+                    "Bulk import chunk failed, retrying rows one by one",
+                    entity_type=spec.entity_type,
+                    offset=offset,
+                    error=str(e.orig),
+                )
+                inserts = [row for row in inserts if await self._write_row(spec, [row], [], fail)]
+                updates = [row for row in updates if await self._write_row(spec, [], [row], fail)]
+
+        for index, entity_id, _ in inserts:
+            results[index] = {"index": index, "status": "created", "id": entity_id, "error": None}
+        for index, entity_id, _ in updates:
+            results[index] = {"index": index, "status": "updated", "id": entity_id, "error": None}
+
+        # 7. Запись аудита на каждое действие чанка и commit
+        audit = AuditService(self.session)
+        for action, rows, key in ((ActionType.CREATE, inserts, "created"), (ActionType.UPDATE, updates, "updated")):
+            if rows:
+                await audit.log_action(
+                    action=action,
+                    entity_type=spec.entity_type,
+                    entity_id=None,
+                    actor_id=actor_id,
+                    after={"bulk": True, key: [str(entity_id) for _, entity_id, _ in rows]},
+                )
+        if inserts or updates:
+            mark_tables_written(self.session, spec.table.name)
+        await self.session.commit()
+
+        return [results[index] for index in sorted(results)]
+
+    async def _write(
+        self,
+        spec: BulkSpec,
+        inserts: list[tuple[int, UUID, dict[str, Any]]],
+        updates: list[tuple[int, UUID, dict[str, Any]]],
+    ) -> None:
+        """Записать строки чанка и журнал изменений"""
+        if inserts:
+            await self.session.execute(insert(spec.model), [values for _, _, values in inserts])
+        await self._update_many(spec, updates)
+        # Core-запись минует before_flush - журнал изменений для /sync/changes пишем явно
+        await record_changes(self.session, spec.table.name, "create", [entity_id for _, entity_id, _ in inserts])
+        await record_changes(
+            self.session,
+            spec.table.name,
+            "update",
+            [entity_id for _, entity_id, _ in updates],
+            {entity_id: sorted(values) for _, entity_id, values in updates},
+        )
+
+    async def _write_row(
+        self,
+        spec: BulkSpec,
+        inserts: list[tuple[int, UUID, dict[str, Any]]],
+        updates: list[tuple[int, UUID, dict[str, Any]]],
+        fail: Callable[[int, str, Optional[UUID]], None],
+    ) -> bool:
+        """Записать одну строку в своём SAVEPOINT; False - строка отклонена"""
+        try:
+            async with self.session.begin_nested():
+                await self._write(spec, inserts, updates)
+        except IntegrityError as e:
+            for index, entity_id, _ in inserts + updates:
+                fail(index, f"integrity error: {e.orig}", entity_id)
+            return False
+        return True
+
+    async def _update_many(self, spec: BulkSpec, updates: list[tuple[int, UUID, dict[str, Any]]]) -> None:
+        """executemany UPDATE, сгруппированный по набору обновляемых полей"""
+        table = spec.table
+        by_fields = sorted(updates, key=lambda update_row: sorted(update_row[2]))
+        for fields, group in groupby(by_fields, key=lambda update_row: sorted(update_row[2])):
+            stmt = (
+                update(table)
+                .where(table.c.id == bindparam("b_id"))
+                .values({name: bindparam(f"b_{name}") for name in fields})
+            )
+            if "version" in table.c:
+                stmt = stmt.values(version=table.c.version + 1)
+            params = [
+                {"b_id": entity_id, **{f"b_{name}": value for name, value in values.items()}}
+                for _, entity_id, values in group
+            ]
+            await self.session.execute(stmt, params)
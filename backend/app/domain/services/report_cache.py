@@ -0,0 +1,203 @@
+"""
+Кэш готовых файлов отчётов
+
+Повторный экспорт того же отчёта (entity, фильтры, колонки, сортировка) по
+неизменившимся данным не собирает XLSX заново, а отдаёт готовый файл.
+Ключ (fingerprint) - sha256 нормализованной спецификации и водяного знака
+данных: max(seq) журнала изменений таблицы сущности (журнал получает и
+удаления - tombstone'ы), для колонок города и района отчёта объектов -
+отпечаток справочника. Маска телефонов (владелец без доступа к PII) входит
+в спецификацию: маскированный и полный файлы не смешиваются. Файл лежит в REPORTS_PATH под именем
+report_{entity}_{fingerprint}.xlsx, поэтому поиск в кэше - проверка
+существования файла; новый файл пишется во временный и переименовывается.
+
+Вытеснение (evict_reports): файлы без обращений дольше REPORT_CACHE_TTL_DAYS
+удаляются, затем самые давние - пока каталог больше REPORT_CACHE_MAX_MB.
+Попадание в кэш обновляет mtime файла - это и есть время обращения (LRU).
+"""
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.domain.services.report_service import REPORT_QUERIES, report_columns, report_filters
+from app.infrastructure.db.filtering import filter_values
+from app.infrastructure.db.models import ChangeLog, City, District, ReportJob
+
+logger = get_logger(__name__)
+
+# Меняется вместе с форматом файла (колонки, оформление) - старые файлы перестают совпадать
+REPORT_FORMAT_VERSION = 1
+
+ORPHAN_TMP_SECONDS = 24 * 3600  # Временные файлы упавших экспортов
+
+# Справочники, чьи имена попадают в колонки отчёта объектов
+_DICTIONARY_COLUMNS = {"objects": {"city": City, "district": District}}
+
+
+def report_spec(
+    entity: str,
+    filters: Optional[dict[str, Any]] = None,
+    columns: Optional[list[str]] = None,
+    sort: Optional[dict[str, Any]] = None,
+    mask: bool = False,
+) -> Optional[dict[str, Any]]:
+    """
+    Нормализованная спецификация отчёта (ключ кэша без данных)
+
+    mask - телефоны маскируются (владелец без доступа к PII).
+    None - отчёт не кэшируется: фильтр next_action_due зависит от текущего времени.
+    """
+    query = REPORT_QUERIES[entity]
+    params, order = report_filters(entity, filters, sort)
+    values = filter_values(query, params)
+    if any(query.filters[name].op == "due" for name in values if name != "q"):
+        return None
+    # Порядок элементов contains_all не влияет на результат
+    values = {name: sorted(set(value)) if isinstance(value, list) else value for name, value in values.items()}
+    names = report_columns(entity, columns)
+    return {
+        "version": REPORT_FORMAT_VERSION,
+        "entity": entity,
+        "columns": names,
+        # Без колонки телефона маска не меняет файл - он общий для всех ролей
+        "mask": mask and "phone" in names,
+        "filters": values,
+        "sort": order,
+    }
+
+
+async def data_watermark(session: AsyncSession, entity: str, columns: list[str]) -> dict[str, Any]:
+    """
+    Водяной знак данных отчёта: меняется при любой записи в таблицы отчёта
+
+    max(seq) - одно чтение индекса ix_change_log_table_seq. Справочники
+    (города, районы) журнала не имеют и малы - берётся хэш их строк.
+    """
+    mark: dict[str, Any] = {
+        entity: await session.scalar(
+            select(func.max(ChangeLog.seq)).where(ChangeLog.table_name == entity)
+        ),
+    }
+    for name, model in _DICTIONARY_COLUMNS.get(entity, {}).items():
+        if name in columns:
+            rows = (await session.execute(select(model.id, model.name).order_by(model.id))).all()
+            digest = hashlib.sha1()
+            for row_id, row_name in rows:
+                digest.update(f"{row_id}:{row_name}\n".encode())
+            mark[model.__tablename__] = digest.hexdigest()
+    return mark
+
+
+async def report_fingerprint(session: AsyncSession, job: ReportJob, mask: bool) -> Optional[str]:
+    """Ключ кэша задачи (None - отчёт не кэшируется)"""
+    spec = report_spec(job.entity, job.filters_json, job.columns, job.sort, mask)
+    if spec is None:
+        return None
+    # От владельца задачи файл зависит только маской телефонов - она в spec
+    payload = {"spec": spec, "watermark": await data_watermark(session, job.entity, spec["columns"])}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def cached_report_path(entity: str, fingerprint: str) -> Path:
+    return Path(settings.REPORTS_PATH) / f"report_{entity}_{fingerprint}.xlsx"
+
+
+def find_cached_report(entity: str, fingerprint: str) -> Optional[str]:
+    """Путь к готовому файлу (и отметка обращения) или None"""
+    path = cached_report_path(entity, fingerprint)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return str(path)
+
+
+def store_cached_report(tmp_path: str, entity: str, fingerprint: str) -> str:
+    """Переименовать собранный файл в файл кэша (атомарно: читатель не видит недописанный)"""
+    path = cached_report_path(entity, fingerprint)
+    os.replace(tmp_path, path)
+    return str(path)
+
+
+async def reuse_cached_report(session: AsyncSession, job: ReportJob, mask: bool) -> bool:
+    """Готовый файл того же отчёта - задача сразу done, без воркера"""
+    fingerprint = await report_fingerprint(session, job, mask)
+    if fingerprint is None:
+        return False
+    filepath = find_cached_report(job.entity, fingerprint)
+    if filepath is None:
+        return False
+
+    job.fingerprint = fingerprint
+    job.file_path = filepath
+    job.status = "done"
+    job.completed_at = datetime.utcnow()
+    logger.info("Report cache hit", job_id=str(job.id), entity=job.entity)
+    return True
+
+
+def evict_reports(
+    max_bytes: Optional[int] = None,
+    ttl_days: Optional[int] = None,
+    keep: Optional[str] = None,
+) -> dict[str, int]:
+    """
+    Удалить файлы отчётов старше TTL, затем давно не запрошенные - до бюджета
+
+    keep - только что собранный файл: его задача ещё не отдана пользователю.
+    Возвращает {"removed", "freed_bytes", "total_bytes"} после очистки.
+    Задача, чей файл удалён, при скачивании получает 404.
+    """
+    max_bytes = max_bytes if max_bytes is not None else settings.REPORT_CACHE_MAX_MB * 1024 * 1024
+    ttl_days = ttl_days if ttl_days is not None else settings.REPORT_CACHE_TTL_DAYS
+    directory = Path(settings.REPORTS_PATH)
+    if not directory.is_dir():
+        return {"removed": 0, "freed_bytes": 0, "total_bytes": 0}
+
+    now = time.time()
+    files: list[tuple[float, int, Path]] = []
+    expired: list[tuple[int, Path]] = []
+    for entry in os.scandir(directory):
+        if not entry.is_file():
+            continue
+        stat = entry.stat()
+        age = now - stat.st_mtime
+        if entry.name.startswith("."):
+            # Временный файл идущего экспорта; старый - остаток упавшего
+            if age > ORPHAN_TMP_SECONDS:
+                expired.append((stat.st_size, Path(entry.path)))
+        elif age > ttl_days * 86400:
+            expired.append((stat.st_size, Path(entry.path)))
+        else:
+            files.append((stat.st_mtime, stat.st_size, Path(entry.path)))
+
+    total = sum(size for _, size, _ in files)
+    files.sort()  # Самые давние обращения - первыми
+    for _, size, path in files:
+        if total <= max_bytes:
+            break
+        if keep is not None and str(path) == keep:
+            continue
+        expired.append((size, path))
+        total -= size
+
+    removed = freed = 0
+    for size, path in expired:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            continue  # Удалил другой воркер
+        removed += 1
+        freed += size
+    if removed:
+        logger.info("Report files evicted", removed=removed, freed_bytes=freed, total_bytes=total)
+    return {"removed": removed, "freed_bytes": freed, "total_bytes": total}
@@ -1,22 +1,112 @@
 """
 Сервис для генерации отчётов
+
+Строки отчёта читаются Core-проекцией (REPORT_COLUMNS): превью - одним
+запросом с LIMIT, экспорт - серверным курсором пачками (stream_report),
+поэтому память на экспорт не зависит от числа строк. Фильтры и сортировка
+компилируются в SQL тем же белым списком, что и у списков (filtering.py).
 """
+import enum
 from uuid import UUID, uuid4
-from typing import Optional, Any
+from typing import Optional, Any, AsyncIterator
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.infrastructure.db.models import ReportJob, Object, Visit, Customer
-from app.infrastructure.db.repositories.object_repository import ObjectRepository
+from app.core.filters import FilterParams
+from app.infrastructure.db.filtering import (
+    OBJECTS_QUERY,
+    VISITS_QUERY,
+    CUSTOMERS_QUERY,
+    SortOrder,
+    apply_filters,
+    order_by_clauses,
+    parse_filters,
+    resolve_sort,
+)
+from app.infrastructure.db.models import ReportJob, Object, Visit, Customer, City, District
 from sqlalchemy import select
 
 
+# Колонки отчётов: имя -> (заголовок, выражение); порядок - порядок колонок файла
+REPORT_COLUMNS: dict[str, dict[str, tuple[str, Any]]] = {
+    "objects": {
+        "id": ("ID", Object.id),
+        "type": ("Тип", Object.type),
+        "address": ("Адрес", Object.address),
+        "city": ("Город", City.name),
+        "district": ("Район", District.name),
+        "status": ("Статус", Object.status),
+        "visits_count": ("Визитов", Object.visits_count),
+        "last_visit_at": ("Последний визит", Object.last_visit_at),
+    },
+    "visits": {
+        "id": ("ID", Visit.id),
+        "object_id": ("Объект", Visit.object_id),
+        "engineer_id": ("Инженер", Visit.engineer_id),
+        "status": ("Статус", Visit.status),
+        "scheduled_at": ("Запланирован", Visit.scheduled_at),
+        "finished_at": ("Завершён", Visit.finished_at),
+    },
+    "customers": {
+        "id": ("ID", Customer.id),
+        "object_id": ("Объект", Customer.object_id),
+        "full_name": ("ФИО", Customer.full_name),
+        "phone": ("Телефон", Customer.phone),
+        "interests": ("Интересы", Customer.interests),
+    },
+}
+
+
+REPORT_TITLES = {"objects": "Объекты", "visits": "Визиты", "customers": "Клиенты"}
+
+REPORT_QUERIES = {"objects": OBJECTS_QUERY, "visits": VISITS_QUERY, "customers": CUSTOMERS_QUERY}
+
+
+def report_columns(entity: str, columns: Optional[list[str]] = None) -> list[str]:
+    """Колонки отчёта: запрошенные (неизвестные отбрасываются) или все"""
+    available = REPORT_COLUMNS.get(entity, {})
+    selected = [name for name in columns or [] if name in available]
+    return selected or list(available)
+
+
+def report_filters(
+    entity: str,
+    filters: Optional[dict[str, Any]] = None,
+    sort: Optional[dict[str, Any]] = None,
+) -> tuple[FilterParams, Optional[SortOrder]]:
+    """
+    Проверить фильтры и сортировку отчёта (ValidationError - до создания задачи или потока)
+
+    Без sort строки идут в порядке чтения таблицы - без ORDER BY на весь экспорт.
+    """
+    spec = REPORT_QUERIES[entity]
+    params = parse_filters(spec, filters)
+    order = resolve_sort(spec, sort, params) if sort else None
+    return params, order
+
+
+def report_headers(entity: str, columns: list[str]) -> list[str]:
+    """Заголовки колонок для файла отчёта"""
+    return [REPORT_COLUMNS[entity][name][0] for name in columns]
+
+
+def _preview_value(value: Any) -> Any:
+    """Значение строки превью в JSON-виде (как раньше отдавало превью)"""
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
 class ReportService:
     """Сервис отчётов"""
-    
+
     def __init__(self, session: AsyncSession):
         self.session = session
-    
+
     async def create_export_job(
         self,
         owner_id: UUID,
@@ -26,6 +116,8 @@ class ReportService:
         sort: Optional[dict[str, Any]] = None,
     ) -> ReportJob:
         """Создать задачу экспорта"""
+        report_filters(entity, filters, sort)
+
         job = ReportJob(
             id=uuid4(),
             owner_id=owner_id,
@@ -35,12 +127,33 @@ class ReportService:
             sort=sort,
             status="pending",
         )
-        
+
         self.session.add(job)
         await self.session.flush()
-        
+
         return job
-    
+
+    def _report_select(
+        self,
+        entity: str,
+        columns: list[str],
+        filters: Optional[dict[str, Any]] = None,
+        sort: Optional[dict[str, Any]] = None,
+    ) -> Any:
+        """Core-проекция строк отчёта с фильтрами и сортировкой (справочники - LEFT JOIN)"""
+        spec = REPORT_COLUMNS[entity]
+        params, order = report_filters(entity, filters, sort)
+        stmt = select(*(spec[name][1].label(name) for name in columns))
+        if entity == "objects":
+            stmt = stmt.select_from(Object).outerjoin(City, City.id == Object.city_id)
+            stmt = stmt.outerjoin(District, District.id == Object.district_id)
+
+        query = REPORT_QUERIES[entity]
+        stmt = apply_filters(stmt, query, params, self.session.get_bind().dialect.name)
+        if order:
+            stmt = stmt.order_by(*order_by_clauses(query, order))
+        return stmt
+
     async def preview_report(
         self,
         entity: str,
@@ -50,116 +163,42 @@ class ReportService:
         limit: int = 100,
     ) -> dict[str, Any]:
         """Предпросмотр отчёта"""
-        # Получаем данные
-        if entity == "objects":
-            data = await self._get_objects_preview(filters, sort, limit)
-        elif entity == "visits":
-            data = await self._get_visits_preview(filters, sort, limit)
-        elif entity == "customers":
-            data = await self._get_customers_preview(filters, sort, limit)
-        else:
-            data = {"rows": [], "total": 0, "columns": []}
-        
-        # Фильтруем колонки, если указаны
-        if columns and data["rows"]:
-            filtered_rows = []
-            for row in data["rows"]:
-                filtered_row = {k: v for k, v in row.items() if k in columns}
-                filtered_rows.append(filtered_row)
-            data["rows"] = filtered_rows
-            data["columns"] = columns
-        
-        return data
-    
-    async def _get_objects_preview(
-        self,
-        filters: Optional[dict[str, Any]],
-        sort: Optional[dict[str, Any]],
-        limit: int,
-    ) -> dict[str, Any]:
-        """Получить превью объектов"""
-        stmt = select(Object).limit(limit)
-        
-        if filters:
-            # Применяем фильтры (упрощённо)
-            pass
-        
-        result = await self.session.execute(stmt)
-        objects = list(result.scalars().all())
-        
-        rows = []
-        for obj in objects:
-            rows.append({
-                "id": str(obj.id),
-                "type": obj.type.value if hasattr(obj.type, "value") else str(obj.type),
-                "address": obj.address,
-                "city": obj.city.name if obj.city else "",
-                "district": obj.district.name if obj.district else "",
-                "status": obj.status.value if hasattr(obj.status, "value") else str(obj.status),
-                "visits_count": obj.visits_count,
-                "last_visit_at": obj.last_visit_at.isoformat() if obj.last_visit_at else None,
-            })
-        
-        return {
-            "rows": rows,
-            "total": len(rows),
-            "columns": list(rows[0].keys()) if rows else [],
-        }
-    
-    async def _get_visits_preview(
-        self,
-        filters: Optional[dict[str, Any]],
-        sort: Optional[dict[str, Any]],
-        limit: int,
-    ) -> dict[str, Any]:
-        """Получить превью визитов"""
-        stmt = select(Visit).limit(limit)
-        
+        if entity not in REPORT_COLUMNS:
+            return {"rows": [], "total": 0, "columns": []}
+
+        names = report_columns(entity, columns)
+        stmt = self._report_select(entity, names, filters, sort).limit(limit)
         result = await self.session.execute(stmt)
-        visits = list(result.scalars().all())
-        
-        rows = []
-        for visit in visits:
-            rows.append({
-                "id": str(visit.id),
-                "object_id": str(visit.object_id),
-                "engineer_id": str(visit.engineer_id),
-                "status": visit.status.value if hasattr(visit.status, "value") else str(visit.status),
-                "scheduled_at": visit.scheduled_at.isoformat() if visit.scheduled_at else None,
-                "finished_at": visit.finished_at.isoformat() if visit.finished_at else None,
-            })
-        
+        rows = [
+            {name: _preview_value(value) for name, value in row.items()}
+            for row in result.mappings()
+        ]
+
         return {
             "rows": rows,
             "total": len(rows),
-            "columns": list(rows[0].keys()) if rows else [],
+            "columns": names if rows else [],
         }
-    
-    async def _get_customers_preview(
+
+    async def stream_report(
         self,
-        filters: Optional[dict[str, Any]],
-        sort: Optional[dict[str, Any]],
-        limit: int,
-    ) -> dict[str, Any]:
-        """Получить превью клиентов"""
-        stmt = select(Customer).limit(limit)
-        
-        result = await self.session.execute(stmt)
-        customers = list(result.scalars().all())
-        
-        rows = []
-        for customer in customers:
-            rows.append({
-                "id": str(customer.id),
-                "object_id": str(customer.object_id),
-                "full_name": customer.full_name,
-                "phone": customer.phone,
-                "interests": customer.interests or [],
-            })
-        
-        return {
-            "rows": rows,
-            "total": len(rows),
-            "columns": list(rows[0].keys()) if rows else [],
-        }
+        entity: str,
+        filters: Optional[dict[str, Any]] = None,
+        columns: Optional[list[str]] = None,
+        sort: Optional[dict[str, Any]] = None,
+        batch_size: int = 2000,
+    ) -> AsyncIterator[list[dict[str, Any]]]:
+        """
+        Строки отчёта серверным курсором, пачками по batch_size
+
+        Значения - как в БД (UUID, enum, datetime): форматирует экспортёр.
+        """
+        names = report_columns(entity, columns)
+        stmt = self._report_select(entity, names, filters, sort).execution_options(yield_per=batch_size)
 
+        result = await self.session.stream(stmt)
+        try:
+            async for partition in result.mappings().partitions():
+                yield [dict(row) for row in partition]
+        finally:
+            await result.close()  # Потребитель мог остановиться раньше конца курсора
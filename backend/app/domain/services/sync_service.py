@@ -1,14 +1,103 @@
 """
 Сервис офлайн-синхронизации
 """
+import asyncio
+import contextlib
+import enum
+import hashlib
+import json
+import statistics
+import time
 from uuid import UUID, uuid4
-from datetime import datetime
-from typing import Any, Optional
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Optional, Sequence
+from sqlalchemy import inspect
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.errors import ConflictError, ValidationError
-from app.infrastructure.db.models import Object, Visit, Customer
-from app.infrastructure.db.repositories.sync_repository import SyncRepository
+from app.core.config import settings
+from app.core.errors import ValidationError, CursorExpiredError
+from app.core.logging_config import get_logger
+from app.core.pagination import encode_sequence_cursor, decode_sequence_cursor
+from app.infrastructure.db.models import SyncToken, ChangeLog, User, UserRole
+from app.infrastructure.db.repositories.sync_repository import SyncRepository, SyncScope, SYNC_TABLES
+
+logger = get_logger(__name__)
+
+EMPTY_SERVER_ID = UUID("00000000-0000-0000-0000-000000000000")
+
+
+def _retention_cutoff() -> datetime:
+    """Граница окна офлайна: старше неё tombstone'ы удаляются компакцией"""
+    return datetime.utcnow() - timedelta(days=settings.SYNC_MAX_OFFLINE_DAYS)
+
+
+# Последний замер размера sync_tokens (monotonic, число токенов) - для темпа роста
+_token_sample: Optional[tuple[float, int]] = None
+
+TOKEN_LOOKUP_PROBES = 5
+
+
+def _token_expiry_cutoff() -> datetime:
+    """Граница жизни токенов: не раньше окна офлайна, иначе повтор пачки создаст дубль"""
+    days = max(settings.SYNC_TOKEN_TTL_DAYS, settings.SYNC_MAX_OFFLINE_DAYS)
+    return datetime.utcnow() - timedelta(days=days)
+
+
+def payload_checksum(table_name: str, payload: dict[str, Any]) -> str:
+    """SHA-256 канонического JSON payload: повтор того же элемента даёт тот же хэш"""
+    canonical = json.dumps(
+        {"table_name": table_name, "payload": payload},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _entity_version(entity: Any) -> Optional[int]:
+    """Версия сущности после записи (до flush - default колонки); None - сущность без версии"""
+    if not hasattr(entity, "version"):
+        return None
+    return entity.version or 1
+
+
+def _is_replay(token: SyncToken, entity: Any, checksum: str) -> bool:
+    """
+    Повтор уже применённого payload: тот же checksum и сущность не менялась
+    после записи токена (иначе чужую правку перезатёр бы обычный update/conflict)
+    """
+    return (
+        token.checksum == checksum
+        and token.entity_version is not None
+        and _entity_version(entity) == token.entity_version
+    )
+
+
+def sync_scope(user: User, owned: bool = False) -> Optional[SyncScope]:
+    """
+    Территория ленты пользователя: инженер с городом получает свой город/район,
+    свои визиты и объекты; остальные роли - всю ленту.
+    owned=True - только свои записи (дочитка после снимка территории)
+    """
+    if owned:
+        return SyncScope(user_id=user.id)
+    if user.role != UserRole.ENGINEER or user.city_id is None:
+        return None
+    return SyncScope(user_id=user.id, city_id=user.city_id, district_id=user.district_id)
+
+
+def resolve_changes_cursor(cursor: Optional[str]) -> Optional[int]:
+    """seq из курсора /sync/changes; курсор старше окна офлайна -> CursorExpiredError"""
+    position = decode_sequence_cursor(cursor)
+    if position is None:
+        return None
+    seq, read_at = position
+    # Tombstone'ы старше окна удалены компакцией: такой клиент мог их пропустить
+    if read_at is not None and read_at < _retention_cutoff():
+        raise CursorExpiredError()
+    return seq
 
 
 class SyncService:
@@ -18,90 +107,235 @@ class SyncService:
         self.session = session
         self.sync_repo = SyncRepository(session)
     
-    async def upsert_item(
-        self,
-        client_id: UUID,
-        table_name: str,
-        payload: dict[str, Any],
-        version: Optional[int] = None,
-        force: bool = False,
-    ) -> tuple[UUID, str, Optional[dict]]:
+    async def upsert_batch(self, items: Sequence[Any], force: bool = False) -> list[dict[str, Any]]:
         """
-        Upsert элемента синхронизации
+        Upsert пачки элементов синхронизации (items - SyncItem)
         
+        Элементы применяются по порядку. Пачка
+        обрабатывается чанками по SYNC_BATCH_CHUNK_SIZE: токены и целевые
+        сущности чанка загружаются одним запросом на таблицу, изменения уходят
+        одним flush в SAVEPOINT, после чанка - commit. Если flush чанка падает
+        (например, UNIQUE телефона), чанк повторяется поэлементно, каждый
+        элемент в своём SAVEPOINT: ошибкой помечается только виновный.
         Returns:
-            (server_id, status, diff) - server_id, статус операции, diff при конфликте
+            Результаты по элементам (поля SyncItemResult)
         """
-        # Проверяем существующий токен
-        existing_token = await self.sync_repo.get_by_client_id(client_id)
+        tokens: dict[UUID, SyncToken] = {}
+        entities: dict[tuple[str, UUID], Any] = {}
+        results: list[dict[str, Any]] = []
+        chunk_size = settings.SYNC_BATCH_CHUNK_SIZE
+        
+        for start in range(0, len(items), chunk_size):
+            chunk = items[start:start + chunk_size]
+            results.extend(await self._upsert_chunk(chunk, force, tokens, entities))
+            await self.session.commit()
+        return results
+    
+    async def _upsert_chunk(
+        self,
+        chunk: Sequence[Any],
+        force: bool,
+        tokens: dict[UUID, SyncToken],
+        entities: dict[tuple[str, UUID], Any],
+    ) -> list[dict[str, Any]]:
+        await self._prefetch(chunk, tokens, entities)
+        try:
+            async with self.session.begin_nested():
+                return [await self._apply_item(item, force, tokens, entities) for item in chunk]
+        except SQLAlchemyError as e:
+            logger.warning("Sync batch chunk failed, retrying items one by one", size=len(chunk), error=str(e))
+        
+        results = []
+        for item in chunk:
+            # Откат SAVEPOINT expire'ит затронутые объекты - перечитываем их
+            self._forget_stale(tokens, entities)
+            await self._prefetch([item], tokens, entities)
+            try:
+                async with self.session.begin_nested():
+                    result = await self._apply_item(item, force, tokens, entities)
+            except SQLAlchemyError as e:
+                error = e.orig if isinstance(e, DBAPIError) else e
+                result = {
+                    "client_generated_id": item.client_generated_id,
+                    "server_id": EMPTY_SERVER_ID,
+                    "status": "error",
+                    "error_message": str(error),
+                    "server_version": item.version,
+                }
+            results.append(result)
+        self._forget_stale(tokens, entities)
+        return results
+    
+    async def _prefetch(
+        self,
+        items: Sequence[Any],
+        tokens: dict[UUID, SyncToken],
+        entities: dict[tuple[str, UUID], Any],
+    ) -> None:
+        """Догрузить токены и целевые сущности элементов (один запрос на таблицу)"""
+        tokens.update(await self.sync_repo.get_by_client_ids(
+            item.client_generated_id for item in items if item.client_generated_id not in tokens
+        ))
         
-        if existing_token:
-            # Обновление существующей записи
-            server_id = existing_token.server_id
-            entity = await self.sync_repo.get_entity_by_table(table_name, server_id)
+        wanted: dict[str, set[UUID]] = {}
+        for item in items:
+            token = tokens.get(item.client_generated_id)
+            if token and (item.table_name, token.server_id) not in entities:
+                wanted.setdefault(item.table_name, set()).add(token.server_id)
+        for table_name, ids in wanted.items():
+            found = await self.sync_repo.get_entities_by_ids(table_name, ids)
+            entities.update({(table_name, entity_id): entity for entity_id, entity in found.items()})
+    
+    def _forget_stale(self, tokens: dict[UUID, SyncToken], entities: dict[tuple[str, UUID], Any]) -> None:
+        """Убрать из кэшей пачки объекты, откатившиеся вместе с SAVEPOINT"""
+        for cache in (tokens, entities):
+            for key, instance in list(cache.items()):
+                state = inspect(instance)
+                if not state.persistent or state.expired_attributes:
+                    del cache[key]
+    
+    async def _apply_item(
+        self,
+        item: Any,
+        force: bool,
+        tokens: dict[UUID, SyncToken],
+        entities: dict[tuple[str, UUID], Any],
+    ) -> dict[str, Any]:
+        """Применить элемент в памяти сессии; ошибки валидации - в результат"""
+        client_id = item.client_generated_id
+        token = tokens.get(client_id)
+        result = {"client_generated_id": client_id, "server_version": item.version}
+        try:
+            model = SYNC_TABLES.get(item.table_name)
+            if model is None:
+                raise ValidationError(f"Unknown table: {item.table_name}")
+            payload = self._coerce_payload(model, item.payload)
+            checksum = payload_checksum(item.table_name, item.payload)
+            entity = entities.get((item.table_name, token.server_id)) if token else None
             
-            if not entity:
-                # Запись была удалена, создаём новую
-                return await self._create_entity(table_name, payload, client_id)
+            if entity is not None and _is_replay(token, entity, checksum):
+                # Повтор уже применённого элемента (переотправка после обрыва связи)
+                result.update(
+                    server_id=token.server_id,
+                    status="unchanged",
+                    server_version=getattr(entity, "version", None),
+                )
             
-            # Проверяем версию для optimistic locking
-            if hasattr(entity, "version") and version is not None:
-                if entity.version != version and not force:
-                    # Конфликт версий
-                    diff = await self._calculate_diff(entity, payload)
-                    server_data = await self._entity_to_dict(entity)
-                    
-                    raise ConflictError(
-                        f"Version conflict for {table_name}",
-                        diff={
-                            "expected_version": version,
-                            "current_version": entity.version,
-                            "server_data": server_data,
-                            "client_data": payload,
-                            "diff": diff,
-                            "resolution_hints": {
-                                "code": "STALE_VERSION",
-                                "strategy": "merge|force|reject",
-                                "message": "Server version is newer. Use force=true to overwrite or apply merge on client.",
-                            },
-                        }
+            elif entity is None:
+                # Новая запись (или пересоздание удалённой)
+                server_id = uuid4()
+                entity = model(id=server_id, **payload)
+                self._check_required(model, entity)
+                self.session.add(entity)
+                entities[(item.table_name, server_id)] = entity
+                
+                if token:
+                    token.server_id = server_id
+                    token.checksum = checksum
+                    token.entity_version = _entity_version(entity)
+                    token.last_seen_at = datetime.utcnow()
+                    token.status = "synced"
+                else:
+                    token = SyncToken(
+                        client_generated_id=client_id,
+                        table_name=item.table_name,
+                        server_id=server_id,
+                        checksum=checksum,
+                        entity_version=_entity_version(entity),
+                        status="synced",
                     )
+                    self.session.add(token)
+                    tokens[client_id] = token
+                result.update(server_id=server_id, status="created")
             
-            # Обновляем сущность
-            await self._update_entity(entity, payload)
-            entity.version = (entity.version if hasattr(entity, "version") else 1) + 1
-            await self.session.flush()
+            elif (
+                hasattr(entity, "version") and item.version is not None
+                and entity.version != item.version and not force
+            ):
+                diff = await self._conflict_diff(entity, item.payload, item.version)
+                result.update(
+                    server_id=token.server_id,
+                    status="conflict",
+                    diff=diff,
+                    server_version=diff["current_version"],
+                    resolution_hints=diff["resolution_hints"],
+                )
             
-            return server_id, "updated", None
-        else:
-            # Создание новой записи
-            return await self._create_entity(table_name, payload, client_id)
-    
-    async def _create_entity(
-        self,
-        table_name: str,
-        payload: dict[str, Any],
-        client_id: UUID,
-    ) -> tuple[UUID, str, None]:
-        """Создать новую сущность"""
-        server_id = uuid4()
-        
-        if table_name == "objects":
-            entity = Object(id=server_id, **payload)
-        elif table_name == "visits":
-            entity = Visit(id=server_id, **payload)
-        elif table_name == "customers":
-            entity = Customer(id=server_id, **payload)
-        else:
-            raise ValidationError(f"Unknown table: {table_name}")
-        
-        self.session.add(entity)
-        await self.session.flush()
-        
-        # Создаём токен синхронизации
-        await self.sync_repo.upsert_token(client_id, table_name, server_id)
+            else:
+                await self._update_entity(entity, payload)
+                token.checksum = checksum
+                token.last_seen_at = datetime.utcnow()
+                if self.session.is_modified(entity):
+                    entity.version = (entity.version if hasattr(entity, "version") else 1) + 1
+                    token.entity_version = _entity_version(entity)
+                    result.update(
+                        server_id=token.server_id,
+                        status="updated",
+                        server_version=getattr(entity, "version", None),
+                    )
+                else:
+                    # Значения совпали с текущими: без UPDATE, версии и записи в журнал
+                    token.entity_version = _entity_version(entity)
+                    result.update(
+                        server_id=token.server_id,
+                        status="unchanged",
+                        server_version=getattr(entity, "version", None),
+                    )
         
-        return server_id, "created", None
+        except Exception as e:
+            result.update(server_id=EMPTY_SERVER_ID, status="error", error_message=str(e))
+        return result
+    
+    def _coerce_payload(self, model: Any, payload: dict[str, Any]) -> dict[str, Any]:
+        """Привести JSON-значения payload к типам колонок (UUID, datetime, enum)"""
+        columns = model.__table__.columns
+        coerced = dict(payload)
+        for key, value in payload.items():
+            if key not in columns or not isinstance(value, str):
+                continue
+            try:
+                python_type = columns[key].type.python_type
+            except NotImplementedError:
+                continue
+            try:
+                if python_type is UUID:
+                    coerced[key] = UUID(value)
+                elif python_type is datetime:
+                    coerced[key] = datetime.fromisoformat(value)
+                elif isinstance(python_type, type) and issubclass(python_type, enum.Enum):
+                    coerced[key] = python_type(value)
+            except ValueError:
+                raise ValidationError(f"Invalid value for {key}", fields={key: [str(value)]})
+        return coerced
+    
+    def _check_required(self, model: Any, entity: Any) -> None:
+        """Обязательные колонки без default заполнены (иначе упадёт весь flush пачки)"""
+        missing = [
+            column.name
+            for column in model.__table__.columns
+            if not column.nullable and column.default is None and column.server_default is None
+            and getattr(entity, column.key) is None
+        ]
+        if missing:
+            raise ValidationError(
+                f"Missing required fields: {', '.join(missing)}",
+                fields={name: ["required"] for name in missing},
+            )
+    
+    async def _conflict_diff(self, entity: Any, payload: dict[str, Any], version: Optional[int]) -> dict[str, Any]:
+        """Описание конфликта версий для клиента"""
+        return {
+            "expected_version": version,
+            "current_version": entity.version,
+            "server_data": await self._entity_to_dict(entity),
+            "client_data": payload,
+            "diff": await self._calculate_diff(entity, payload),
+            "resolution_hints": {
+                "code": "STALE_VERSION",
+                "strategy": "merge|force|reject",
+                "message": "Server version is newer. Use force=true to overwrite or apply merge on client.",
+            },
+        }
     
     async def _update_entity(self, entity: Any, payload: dict[str, Any]) -> None:
         """Обновить сущность из payload"""
@@ -148,28 +382,260 @@ class SyncService:
     async def get_changes(
         self,
         tables: list[str],
-        since: datetime,
+        since: Optional[datetime] = None,
+        cursor: Optional[str] = None,
         limit: int = 1000,
-    ) -> list[dict[str, Any]]:
-        """Получить изменения с указанной даты"""
-        all_changes = []
+        delta: bool = False,
+        scope: Optional[SyncScope] = None,
+    ) -> tuple[list[dict[str, Any]], Optional[str], bool]:
+        """
+        Получить изменения из журнала после курсора (или с даты since)
         
-        for table_name in tables:
-            entities = await self.sync_repo.find_changes_since(table_name, since, limit)
-            
-            for entity in entities:
-                change_item = {
-                    "id": entity.id,
-                    "table_name": table_name,
-                    "action": "update",  # Упрощённо, можно добавить логику для delete
-                    "data": await self._entity_to_dict(entity),
-                    "updated_at": entity.updated_at if hasattr(entity, "updated_at") else datetime.utcnow(),
-                    "version": entity.version if hasattr(entity, "version") else 1,
-                }
-                all_changes.append(change_item)
+        delta=True при cursor: для update отдаются только колонки, изменённые
+        после курсора (клиент уже применил ленту до него).
+        scope - территория ленты (sync_scope); None - вся лента.
+        
+        Returns:
+            (changes, next_cursor, has_more) - next_cursor возвращается всегда:
+            с него клиент продолжает и следующую синхронизацию
+        """
+        tables = [table_name for table_name in tables if table_name in SYNC_TABLES]
+        after_seq = resolve_changes_cursor(cursor)
+        
+        read_at = datetime.utcnow()
+        entries = await self.sync_repo.find_change_log(tables, after_seq, since, limit + 1, scope) if tables else []
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+        
+        next_cursor = await self._next_cursor(entries[-1] if entries else None, after_seq, has_more, read_at)
+        return await self._build_changes(entries, delta and after_seq is not None), next_cursor, has_more
+    
+    async def stream_changes(
+        self,
+        tables: list[str],
+        since: Optional[datetime] = None,
+        after_seq: Optional[int] = None,
+        limit: Optional[int] = 1000,
+        delta: bool = False,
+        scope: Optional[SyncScope] = None,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Потоковое чтение изменений (для NDJSON)
+        
+        Журнал читается серверным курсором пачками по SYNC_STREAM_BATCH_SIZE; на
+        каждую пачку отдаётся {"items": [...]}, в конце - {"next_cursor", "has_more"}.
+        after_seq - результат resolve_changes_cursor (проверяется до начала ответа).
+        limit=None - весь журнал (снимок территории).
+        """
+        tables = [table_name for table_name in tables if table_name in SYNC_TABLES]
+        read_at = datetime.utcnow()
+        sent = 0
+        last_entry = None
+        has_more = False
+        
+        if tables:
+            batches = self.sync_repo.stream_change_log(
+                tables, after_seq, since, None if limit is None else limit + 1,
+                batch_size=settings.SYNC_STREAM_BATCH_SIZE, scope=scope,
+            )
+            async with contextlib.aclosing(batches):
+                async for entries in batches:
+                    if limit is not None and sent + len(entries) > limit:
+                        entries = entries[:limit - sent]
+                        has_more = True
+                    if entries:
+                        sent += len(entries)
+                        last_entry = entries[-1]
+                        items = await self._build_changes(entries, delta and after_seq is not None)
+                        # Identity map не копит пачки: память на запрос не растёт с limit
+                        for instance in list(self.session):
+                            self.session.expunge(instance)
+                        yield {"items": items}
+                    if has_more:
+                        break
+        
+        yield {
+            "next_cursor": await self._next_cursor(last_entry, after_seq, has_more, read_at),
+            "has_more": has_more,
+        }
+    
+    async def _next_cursor(
+        self,
+        last_entry: Optional[ChangeLog],
+        after_seq: Optional[int],
+        has_more: bool,
+        read_at: datetime,
+    ) -> str:
+        """Курсор продолжения после прочитанной страницы"""
+        if last_entry is not None:
+            next_seq = last_entry.seq
+        elif after_seq is not None:
+            next_seq = after_seq
+        else:
+            next_seq = await self.sync_repo.last_change_seq()
+        # Дочитали журнал - курсор актуален на момент чтения, иначе - на время последней записи
+        next_at = last_entry.changed_at if has_more else read_at
+        return encode_sequence_cursor(next_seq, next_at)
+    
+    async def _build_changes(self, entries: list[ChangeLog], delta: bool = False) -> list[dict[str, Any]]:
+        """
+        Элементы ленты по записям журнала (сущности - одним запросом на таблицу)
+        
+        delta=True: сущность, у которой в пачке только update с известными
+        колонками, отдаётся частично - объединение этих колонок.
+        """
+        # Сущность отдаётся один раз - на позиции последнего изменения в пачке
+        latest: dict[tuple[str, UUID], Any] = {}
+        created: set[tuple[str, UUID]] = set()
+        changed: dict[tuple[str, UUID], Optional[set[str]]] = {}  # None - нужна вся строка
+        for entry in entries:
+            key = (entry.table_name, entry.entity_id)
+            latest.pop(key, None)
+            latest[key] = entry
+            if entry.action == "create":
+                created.add(key)
+            if entry.action != "update" or entry.changed_columns is None:
+                changed[key] = None
+            elif changed.setdefault(key, set()) is not None:
+                changed[key].update(entry.changed_columns)
         
-        # Сортируем по updated_at
-        all_changes.sort(key=lambda x: x["updated_at"])
+        wanted: dict[str, set[UUID]] = {}
+        for table_name, entity_id in latest:
+            wanted.setdefault(table_name, set()).add(entity_id)
+        entities: dict[tuple[str, UUID], Any] = {}
+        for table_name, ids in wanted.items():
+            found = await self.sync_repo.get_entities_by_ids(table_name, ids)
+            entities.update({(table_name, entity_id): entity for entity_id, entity in found.items()})
         
-        return all_changes[:limit]
+        changes = []
+        for key, entry in latest.items():
+            entity = entities.get(key)
+            if entity is None or entry.action == "delete":
+                changes.append({
+                    "id": entry.entity_id,
+                    "table_name": entry.table_name,
+                    "action": "delete",
+                    "data": None,
+                    "columns": None,
+                    "updated_at": entry.changed_at,
+                    "version": entry.version or 1,
+                })
+                continue
+            data = await self._entity_to_dict(entity)
+            columns = changed[key] if delta else None
+            if columns is not None:
+                # id, version и updated_at (onupdate) - всегда: по ним клиент сверяет строку
+                columns = sorted(columns | ({"id", "version", "updated_at"} & data.keys()))
+                data = {name: data[name] for name in columns if name in data}
+            changes.append({
+                "id": entity.id,
+                "table_name": entry.table_name,
+                "action": "create" if key in created else "update",
+                "data": data,
+                "columns": columns,
+                "updated_at": entity.updated_at if hasattr(entity, "updated_at") else entry.changed_at,
+                "version": entity.version if hasattr(entity, "version") else 1,
+            })
+        return changes
+    
+    async def compact_change_log(self) -> int:
+        """Компакция журнала изменений за пределами окна офлайна; возвращает число удалённых записей"""
+        removed = await self.sync_repo.compact_change_log(_retention_cutoff())
+        await self.session.commit()
+        if removed:
+            logger.info("Change log compacted", removed=removed)
+        return removed
+
+    
+    async def sync_token_stats(self) -> dict[str, Any]:
+        """
+        Метрики sync_tokens: размер (строки, байты), темп роста с прошлой
+        компакции и задержка поиска по client_generated_id (промах индекса)
+        """
+        by_table = await self.sync_repo.count_tokens_by_table()
+        total = sum(by_table.values())
+        
+        growth_per_hour = None
+        if _token_sample is not None:
+            sampled_at, sampled_total = _token_sample
+            hours = (time.monotonic() - sampled_at) / 3600
+            if hours > 0:
+                growth_per_hour = round((total - sampled_total) / hours, 2)
+        
+        timings = []
+        for _ in range(TOKEN_LOOKUP_PROBES):
+            started = time.perf_counter()
+            await self.sync_repo.get_by_client_id(uuid4())
+            timings.append((time.perf_counter() - started) * 1000)
+        
+        table_bytes, index_bytes = await self.sync_repo.token_storage_bytes()
+        return {
+            "total": total,
+            "by_table": by_table,
+            "growth_per_hour": growth_per_hour,
+            "lookup_p50_ms": round(statistics.median(timings), 3),
+            "lookup_max_ms": round(max(timings), 3),
+            "table_bytes": table_bytes,
+            "index_bytes": index_bytes,
+        }
+    
+    async def compact_sync_tokens(self, batch_size: Optional[int] = None) -> dict[str, Any]:
+        """
+        Удалить токены, не использовавшиеся дольше SYNC_TOKEN_TTL_DAYS
+
+        Удаление идёт пачками по batch_size с commit после каждой, чтобы не
+        держать длинную транзакцию. Returns: метрики до компакции и removed.
+        """
+        global _token_sample
+        
+        batch_size = batch_size or settings.SYNC_TOKEN_COMPACTION_BATCH_SIZE
+        stats = await self.sync_token_stats()
+        await self.session.commit()
+        
+        before = _token_expiry_cutoff()
+        removed = 0
+        for table_name in SYNC_TABLES:
+            while True:
+                expired = await self.sync_repo.expire_tokens(table_name, before, batch_size)
+                await self.session.commit()
+                removed += expired
+                if expired < batch_size:
+                    break
+        
+        _token_sample = (time.monotonic(), stats["total"] - removed)
+        logger.info("Sync tokens compacted", removed=removed, **stats)
+        return {**stats, "removed": removed}
+
 
+async def run_change_log_compaction(interval: Optional[int] = None) -> None:
+    """Фоновый цикл компакции журнала изменений (scripts/run_background_jobs.py; в dev - lifespan приложения)"""
+    from app.infrastructure.db.base import AsyncSessionLocal
+    
+    interval = interval or settings.SYNC_COMPACTION_INTERVAL_SECONDS
+    
+    while True:
+        try:
+            async with AsyncSessionLocal() as session:
+                await SyncService(session).compact_change_log()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Change log compaction failed", error=str(e))
+        await asyncio.sleep(interval)
+
+
+async def run_sync_token_compaction(interval: Optional[int] = None) -> None:
+    """Фоновый цикл компакции sync_tokens (scripts/run_background_jobs.py; в dev - lifespan приложения)"""
+    from app.infrastructure.db.base import AsyncSessionLocal
+    
+    interval = interval or settings.SYNC_TOKEN_COMPACTION_INTERVAL_SECONDS
+    
+    while True:
+        try:
+            async with AsyncSessionLocal() as session:
+                await SyncService(session).compact_sync_tokens()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Sync token compaction failed", error=str(e))
+        await asyncio.sleep(interval)
@@ -0,0 +1,189 @@
+"""
+Снимки территорий для начальной синхронизации
+
+Новое (или сброшенное) устройство вместо постраничного чтения журнала с
+начала скачивает один файл своей территории и дочитывает ленту с курсора
+снимка. Снимок - gzip NDJSON в формате потоковой выдачи /sync/changes:
+строка на сущность, последней - {"next_cursor", "has_more": false}.
+
+Файлы лежат в SYNC_SNAPSHOT_PATH: данные - под именем с хэшем содержимого
+({territory}.{sha256[:16]}.ndjson.gz, неизменяемые), рядом - {territory}.json
+с метаданными текущего снимка. Метаданные заменяются атомарно после записи
+данных, предыдущий файл данных остаётся для незавершённых докачек.
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Optional
+from uuid import UUID
+
+import pydantic_core
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.core.pagination import decode_sequence_cursor
+from app.domain.services.sync_service import SyncService
+from app.infrastructure.db.repositories.sync_repository import SyncScope, SYNC_TABLES
+
+logger = get_logger(__name__)
+
+KEPT_SNAPSHOT_FILES = 2  # Текущий и предыдущий (докачка по Range)
+
+
+def _snapshot_dir() -> Path:
+    return Path(settings.SYNC_SNAPSHOT_PATH)
+
+
+def _snapshot_age(built_at: str) -> timedelta:
+    return datetime.utcnow() - datetime.fromisoformat(built_at)
+
+
+def snapshot_key(city_id: UUID, district_id: Optional[UUID]) -> str:
+    """Имя территории в файлах снимка"""
+    return f"{city_id}_{district_id}" if district_id else str(city_id)
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_json(path: Path, payload: dict[str, Any]) -> None:
+    """Атомарная запись JSON (tmp + rename)"""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    with os.fdopen(fd, "w") as file:
+        json.dump(payload, file)
+    os.replace(tmp, path)
+
+
+def find_snapshot(scope: Optional[SyncScope]) -> Optional[dict[str, Any]]:
+    """
+    Метаданные текущего снимка территории (scope - sync_scope пользователя)
+
+    None - у пользователя нет территории, снимок ещё не собран или его курсор
+    старше окна офлайна (дочитка с него получила бы 410).
+    """
+    if scope is None or scope.city_id is None:
+        return None
+    try:
+        with open(_snapshot_dir() / f"{snapshot_key(scope.city_id, scope.district_id)}.json") as file:
+            snapshot = json.load(file)
+    except FileNotFoundError:
+        return None
+    if _snapshot_age(snapshot["built_at"]) > timedelta(days=settings.SYNC_MAX_OFFLINE_DAYS):
+        return None
+    snapshot["path"] = _snapshot_dir() / snapshot["file"]
+    return snapshot
+
+
+class SyncSnapshotService:
+    """Сборка снимков территорий"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.sync_service = SyncService(session)
+
+    async def build(self, city_id: UUID, district_id: Optional[UUID] = None) -> dict[str, Any]:
+        """
+        Собрать снимок территории; возвращает его метаданные
+
+        Если с прошлого снимка журнал территории не менялся и снимок не
+        старше половины окна офлайна, пересборки нет.
+        """
+        scope = SyncScope(city_id=city_id, district_id=district_id)
+        tables = list(SYNC_TABLES)
+        key = snapshot_key(city_id, district_id)
+        directory = _snapshot_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+
+        current = find_snapshot(scope)
+        if current is not None:
+            unchanged = not await self.sync_service.sync_repo.find_change_log(tables, current["seq"], limit=1, scope=scope)
+            if unchanged and _snapshot_age(current["built_at"]) < timedelta(days=settings.SYNC_MAX_OFFLINE_DAYS / 2):
+                current.pop("path")
+                return current
+
+        built_at = datetime.utcnow()
+        items = 0
+        cursor = None
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=f".{key}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as out:
+                # Полная лента территории (без своих записей инженера) - как первая синхронизация
+                async for chunk in self.sync_service.stream_changes(tables, limit=None, scope=scope):
+                    if "items" in chunk:
+                        items += len(chunk["items"])
+                        data = b"".join(pydantic_core.to_json(change) + b"\n" for change in chunk["items"])
+                    else:
+                        cursor = chunk["next_cursor"]
+                        data = json.dumps(chunk).encode() + b"\n"
+                    # Сжатие и запись - вне event loop
+                    await asyncio.to_thread(out.write, data)
+            sha256 = await asyncio.to_thread(_file_sha256, Path(tmp))
+            name = f"{key}.{sha256[:16]}.ndjson.gz"
+            os.replace(tmp, directory / name)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+        seq, _ = decode_sequence_cursor(cursor)
+        snapshot = {
+            "city_id": str(city_id),
+            "district_id": str(district_id) if district_id else None,
+            "file": name,
+            "size": (directory / name).stat().st_size,
+            "sha256": sha256,
+            "items": items,
+            "seq": seq,
+            "cursor": cursor,
+            "built_at": built_at.isoformat(),
+        }
+        _write_json(directory / f"{key}.json", snapshot)
+
+        # Старые файлы территории (кроме предыдущего - его могут докачивать)
+        files = sorted(directory.glob(f"{key}.*.ndjson.gz"), key=lambda path: path.stat().st_mtime, reverse=True)
+        for path in files[KEPT_SNAPSHOT_FILES:]:
+            path.unlink(missing_ok=True)
+
+        logger.info("Sync snapshot built", territory=key, items=items, size=snapshot["size"], seq=seq)
+        return snapshot
+
+    async def build_all(self) -> int:
+        """Собрать снимки территорий всех активных инженеров; возвращает число территорий"""
+        territories = await self.sync_service.sync_repo.engineer_territories()
+        await self.session.commit()
+        for city_id, district_id in territories:
+            try:
+                await self.build(city_id, district_id)
+            except Exception as e:
+                logger.error("Sync snapshot build failed", territory=snapshot_key(city_id, district_id), error=str(e))
+            # Прочитанные сущности не копятся в сессии между территориями
+            await self.session.rollback()
+            self.session.expunge_all()
+        return len(territories)
+
+
+async def run_snapshot_builder(interval: Optional[int] = None) -> None:
+    """Фоновый цикл сборки снимков территорий (scripts/run_background_jobs.py; в dev - lifespan приложения)"""
+    from app.infrastructure.db.base import AsyncSessionLocal
+
+    interval = interval or settings.SYNC_SNAPSHOT_INTERVAL_SECONDS
+
+    while True:
+        try:
+            async with AsyncSessionLocal() as session:
+                await SyncSnapshotService(session).build_all()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Sync snapshot builder failed", error=str(e))
+        await asyncio.sleep(interval)
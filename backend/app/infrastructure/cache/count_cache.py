@@ -0,0 +1,113 @@
+"""
+Кэш total-счётчиков списков в Redis
+
+Ключ строится из имени таблицы, поколения таблицы и хэша нормализованных
+фильтров. Любая запись в таблицу (flush + commit сессии) увеличивает
+поколение, поэтому все закэшированные счётчики этой таблицы устаревают разом.
+"""
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Iterable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.infrastructure.cache.redis_client import get_redis_client
+
+logger = get_logger(__name__)
+
+_WRITTEN_TABLES_KEY = "count_cache_written_tables"
+_pending_invalidations: set[asyncio.Task] = set()
+
+
+def _generation_key(table_name: str) -> str:
+    return f"count:gen:{table_name}"
+
+
+def filters_hash(filters: dict[str, Any]) -> str:
+    """Хэш нормализованных фильтров (пустые значения отбрасываются, порядок ключей не важен)"""
+    normalized = {
+        key: value.value if hasattr(value, "value") else value
+        for key, value in filters.items()
+        if value is not None and value != ""
+    }
+    raw = json.dumps(normalized, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+async def get_cached_count(
+    table_name: str,
+    filters: dict[str, Any],
+    compute: Callable[[], Awaitable[int]],
+) -> int:
+    """Получить точный count из кэша или посчитать и сохранить"""
+    try:
+        redis_client = await get_redis_client()
+        generation = await redis_client.get(_generation_key(table_name)) or "0"
+        key = f"count:{table_name}:{generation}:{filters_hash(filters)}"
+        cached = await redis_client.get(key)
+    except Exception as e:
+        logger.debug("Count cache unavailable", table=table_name, error=str(e))
+        return await compute()
+
+    if cached is not None:
+        return int(cached)
+
+    total = await compute()
+    try:
+        await redis_client.set(key, total, ex=settings.REDIS_CACHE_TTL_SECONDS)
+    except Exception:
+        pass
+    return total
+
+
+async def invalidate_counts(table_names: Iterable[str]) -> None:
+    """Сбросить закэшированные счётчики таблиц (увеличить поколение)"""
+    try:
+        redis_client = await get_redis_client()
+        pipe = redis_client.pipeline()
+        for table_name in table_names:
+            pipe.incr(_generation_key(table_name))
+        await pipe.execute()
+    except Exception as e:
+        logger.debug("Count cache invalidation skipped", error=str(e))
+
+
+def mark_tables_written(session: Session, *table_names: str) -> None:
+    """Отметить запись в таблицы, выполненную мимо ORM flush (Core INSERT/UPDATE)"""
+    session.info.setdefault(_WRITTEN_TABLES_KEY, set()).update(table_names)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_written_tables(session: Session, flush_context: Any) -> None:
+    tables = {
+        obj.__table__.name
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if hasattr(obj, "__table__")
+    }
+    if tables:
+        mark_tables_written(session, *tables)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    tables = session.info.pop(_WRITTEN_TABLES_KEY, None)
+    if not tables:
+        return
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return  # Синхронный контекст (скрипты) - кэш истечёт по TTL
+
+    task = loop.create_task(invalidate_counts(tables))
+    _pending_invalidations.add(task)
+    task.add_done_callback(_pending_invalidations.discard)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(_WRITTEN_TABLES_KEY, None)
@@ -0,0 +1,132 @@
+"""
+Двухуровневый кэш аутентифицированных пользователей
+
+Уровень 1 - LRU в памяти процесса (короткий TTL), уровень 2 - Redis.
+Кэшируются колонки users без hashed_password; из кэша восстанавливается
+отсоединённый (detached) экземпляр User без связей.
+invalidate_user() сбрасывает оба уровня текущего процесса и Redis;
+локальные LRU других воркеров устаревают не позже USER_CACHE_LOCAL_TTL_SECONDS.
+"""
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+from enum import Enum
+from typing import Any, Optional
+from uuid import UUID
+
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.infrastructure.cache.redis_client import get_redis_client
+from app.infrastructure.db.models import User
+
+logger = get_logger(__name__)
+
+_EXCLUDED_COLUMNS = {"hashed_password"}
+_COLUMNS = [
+    attr.columns[0]
+    for attr in User.__mapper__.column_attrs
+    if attr.key not in _EXCLUDED_COLUMNS
+]
+
+_local: "OrderedDict[str, tuple[float, dict[str, Any]]]" = OrderedDict()
+
+
+def _cache_key(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+def _encode(user: User) -> dict[str, Any]:
+    data = {}
+    for column in _COLUMNS:
+        value = getattr(user, column.key)
+        if isinstance(value, (UUID, datetime)):
+            value = value.isoformat() if isinstance(value, datetime) else str(value)
+        elif isinstance(value, Enum):
+            value = value.value
+        data[column.key] = value
+    return data
+
+
+def _decode_value(column: Any, value: Any) -> Any:
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is UUID:
+        return UUID(value)
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if isinstance(python_type, type) and issubclass(python_type, Enum):
+        return python_type(value)
+    return value
+
+
+def _build_user(data: dict[str, Any]) -> User:
+    """Отсоединённый User из закэшированных колонок"""
+    user = User(**{column.key: _decode_value(column, data.get(column.key)) for column in _COLUMNS})
+    make_transient_to_detached(user)
+    return user
+
+
+def _local_get(key: str) -> Optional[dict[str, Any]]:
+    entry = _local.get(key)
+    if entry is None:
+        return None
+    expires_at, data = entry
+    if expires_at <= time.monotonic():
+        _local.pop(key, None)
+        return None
+    _local.move_to_end(key)
+    return data
+
+
+def _local_set(key: str, data: dict[str, Any]) -> None:
+    _local[key] = (time.monotonic() + settings.USER_CACHE_LOCAL_TTL_SECONDS, data)
+    _local.move_to_end(key)
+    while len(_local) > settings.USER_CACHE_SIZE:
+        _local.popitem(last=False)
+
+
+async def get_cached_user(user_id: UUID) -> Optional[User]:
+    """Пользователь из кэша (None - промах)"""
+    key = _cache_key(str(user_id))
+
+    data = _local_get(key)
+    if data is None:
+        try:
+            redis_client = await get_redis_client()
+            raw = await redis_client.get(key)
+        except Exception as e:
+            logger.debug("User cache unavailable", error=str(e))
+            return None
+        if raw is None:
+            return None
+        data = json.loads(raw)
+        _local_set(key, data)
+
+    return _build_user(data)
+
+
+async def cache_user(user: User) -> None:
+    """Положить пользователя в оба уровня кэша"""
+    key = _cache_key(str(user.id))
+    data = _encode(user)
+    _local_set(key, data)
+    try:
+        redis_client = await get_redis_client()
+        await redis_client.set(key, json.dumps(data), ex=settings.USER_CACHE_TTL_SECONDS)
+    except Exception:
+        pass
+
+
+async def invalidate_user(user_id: UUID) -> None:
+    """Сбросить пользователя из кэша (после изменения роли, деактивации и т.п.)"""
+    key = _cache_key(str(user_id))
+    _local.pop(key, None)
+    try:
+        redis_client = await get_redis_client()
+        await redis_client.delete(key)
+    except Exception as e:
+        logger.debug("User cache invalidation skipped", user_id=str(user_id), error=str(e))
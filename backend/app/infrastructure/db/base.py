@@ -1,10 +1,19 @@
 """
 База данных: engine, session, metadata
 """
+import itertools
+
+from fastapi import Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 
 from app.core.config import settings
+from app.infrastructure.db.routing import (
+    request_subject,
+    session_wrote,
+    pin_to_primary,
+    is_pinned_to_primary,
+)
 
 
 # Создаём async engine
@@ -23,14 +32,31 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False,
 )
 
+# Реплики для чтения (необязательны)
+replica_engines = [
+    create_async_engine(url, echo=settings.DEBUG, future=True)
+    for url in settings.DATABASE_REPLICA_URLS
+]
+ReplicaSessionLocals = [
+    async_sessionmaker(
+        replica_engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autocommit=False,
+        autoflush=False,
+    )
+    for replica_engine in replica_engines
+]
+_replica_cycle = itertools.cycle(ReplicaSessionLocals)
+
 
 class Base(DeclarativeBase):
     """Базовый класс для всех ORM моделей"""
     pass
 
 
-async def get_db() -> AsyncSession:
-    """Dependency для получения DB сессии"""
+async def get_db(request: Request) -> AsyncSession:
+    """Dependency для получения DB сессии (primary)"""
     async with AsyncSessionLocal() as session:
         try:
             yield session
@@ -41,3 +67,39 @@ async def get_db() -> AsyncSession:
         finally:
             await session.close()
 
+        # Автор записи какое-то время читает с primary
+        if ReplicaSessionLocals and session_wrote(session):
+            await pin_to_primary(request_subject(request))
+
+
+async def get_read_db(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+) -> AsyncSession:
+    """
+    Dependency для сессии только на чтение
+
+    Реплика, если они настроены и пользователь не закреплён за primary
+    после недавней записи; иначе - та же сессия primary, что и у get_db.
+    """
+    if not ReplicaSessionLocals or await is_pinned_to_primary(request_subject(request)):
+        yield db
+        return
+
+    async with next(_replica_cycle)() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+async def read_session_factory(request: Request) -> async_sessionmaker:
+    """
+    Фабрика сессий для чтения вне dependency (потоковые ответы)
+
+    Сессия dependency закрывается до отправки тела StreamingResponse,
+    поэтому генератор ответа открывает свою - по тем же правилам, что get_read_db.
+    """
+    if not ReplicaSessionLocals or await is_pinned_to_primary(request_subject(request)):
+        return AsyncSessionLocal
+    return next(_replica_cycle)
@@ -0,0 +1,326 @@
+"""
+Журнал изменений для /sync/changes
+
+Каждая запись objects/visits/customers добавляет строку change_log в той же
+транзакции: ORM-изменения - слушателем before_flush, Core-запись (bulk) -
+через record_changes(). Удаления (tombstone'ы) пишут триггеры БД AFTER DELETE,
+поэтому в журнал попадает и удаление в обход приложения.
+seq монотонно растёт, поэтому клиент читает журнал одним range scan `seq > cursor`.
+Запись update хранит изменённые колонки (changed_columns) - по ним клиенту
+с курсором отдаётся дельта вместо всей строки.
+Каждая запись хранит территорию сущности (city_id, district_id) и владельца
+(owner_id: ответственный объекта, инженер визита); клиенты получают территорию
+объекта. По ним строится лента инженера; при переносе сущности на другую
+территорию (или владельца) журнал получает и запись delete со старой
+территорией - прежние устройства удаляют строку. Она пишется раньше записи
+новой территории: компакция оставляет последнюю запись сущности.
+
+В Postgres seq выделяется при INSERT, а видимым становится при commit:
+без упорядочивания читатель мог бы увидеть seq=11 раньше seq=10 и пропустить
+его. Поэтому транзакции, пишущие журнал, берут pg_advisory_xact_lock и
+коммитятся в порядке seq. В SQLite запись и так сериализована.
+
+Блокировка глобальная и держится до commit, поэтому берётся как можно позже -
+непосредственно перед INSERT в change_log: ORM-запись журнала идёт в
+after_flush, после UPDATE/INSERT самих сущностей (ожидание их строковых
+блокировок происходит без неё), Core-запись - после SELECT территорий.
+Цена: пишущие транзакции сериализуются на отрезке «INSERT журнала - commit»,
+поэтому после записи в журнал транзакция должна коммититься сразу, без
+внешних вызовов. Чтение по водяному знаку без блокировки (xid < xmin
+снимка) не подходит: seq выделяется при INSERT, и незавершённая транзакция
+может держать seq меньше уже видимых - курсор по seq её бы пропустил.
+"""
+import uuid
+from itertools import chain
+from typing import Any, Iterable, Mapping, Optional
+
+from sqlalchemy import event, func, insert, inspect, null, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.infrastructure.db.models import ChangeLog, Object, Visit, Customer
+
+TRACKED_MODELS = (Object, Visit, Customer)
+
+_LOCK_KEY = 0x63686C67  # Ключ advisory-блокировки журнала
+
+SCOPE_COLUMNS = ("city_id", "district_id", "owner_id")
+
+# Атрибуты сущности -> колонки территории журнала (Customer - через объект)
+_SCOPE_ATTRS = {
+    Object: ("city_id", "district_id", "responsible_user_id"),
+    Visit: (None, None, "engineer_id"),
+}
+
+
+def _lock_statement(dialect_name: str) -> Any:
+    if dialect_name == "postgresql":
+        return select(func.pg_advisory_xact_lock(_LOCK_KEY))
+    return None
+
+
+async def record_changes(
+    session: AsyncSession,
+    table_name: str,
+    action: str,
+    entity_ids: Iterable[uuid.UUID],
+    changed_columns: Optional[Mapping[uuid.UUID, list[str]]] = None,
+) -> None:
+    """
+    Записать изменения Core-запроса (минуя ORM) в журнал одним INSERT
+
+    changed_columns - изменённые колонки по id (для update); без них
+    клиент получит строку целиком.
+    """
+    entity_ids = list(entity_ids)
+    if not entity_ids:
+        return
+    changed_columns = changed_columns or {}
+    # Территория - по уже записанным строкам, одним SELECT
+    result = await session.execute(_scope_select(table_name, entity_ids))
+    scopes = {row[0]: dict(zip(SCOPE_COLUMNS, row[1:])) for row in result.all()}
+    rows = [
+        {
+            "table_name": table_name,
+            "entity_id": entity_id,
+            "action": action,
+            "changed_columns": changed_columns.get(entity_id),
+            **scopes.get(entity_id, dict.fromkeys(SCOPE_COLUMNS)),
+        }
+        for entity_id in entity_ids
+    ]
+    # Блокировка - непосредственно перед INSERT (держится до commit)
+    lock = _lock_statement(session.get_bind().dialect.name)
+    if lock is not None:
+        await session.execute(lock)
+    await session.execute(insert(ChangeLog), rows)
+
+
+def _scope_select(table_name: str, entity_ids: list[uuid.UUID]) -> Any:
+    """SELECT id, city_id, district_id, owner_id строк таблицы"""
+    if table_name == Customer.__tablename__:
+        return (
+            select(Customer.id, Object.city_id, Object.district_id, null())
+            .outerjoin(Object, Object.id == Customer.object_id)
+            .where(Customer.id.in_(entity_ids))
+        )
+    model = Object if table_name == Object.__tablename__ else Visit
+    columns = [getattr(model, name) if name else null() for name in _SCOPE_ATTRS[model]]
+    return select(model.id, *columns).where(model.id.in_(entity_ids))
+
+
+_PENDING_KEY = "change_log_rows"  # session.info: строки журнала текущего flush
+
+
+@event.listens_for(Session, "before_flush")
+def _record_orm_changes(session: Session, flush_context: Any, instances: Any) -> None:
+    """Собрать строки журнала по изменениям flush (пока доступна история атрибутов)"""
+    rows: list[dict[str, Any]] = []
+    session.info[_PENDING_KEY] = rows
+    changes = [("create", entity) for entity in session.new if isinstance(entity, TRACKED_MODELS)]
+    changes += [
+        ("update", entity)
+        for entity in session.dirty
+        if isinstance(entity, TRACKED_MODELS) and session.is_modified(entity, include_collections=False)
+    ]
+    # Удаления записывают триггеры (install_change_log_triggers)
+    if not changes:
+        return
+
+    # Территории объектов клиентов: из сессии, недостающие - одним SELECT
+    object_ids = set()
+    for _, entity in changes:
+        if isinstance(entity, Customer):
+            object_ids.update((entity.object_id, _previous_value(entity, "object_id")))
+    object_scopes = _object_scopes(session, object_ids)
+
+    changed_ids = set()
+    moved_objects = []
+    for action, entity in changes:
+        if entity.id is None:
+            entity.id = uuid.uuid4()  # default колонки применился бы только при INSERT
+        changed_ids.add(entity.id)
+        scope = _entity_scope(entity, object_scopes)
+        if action == "update":
+            previous = _entity_scope(entity, object_scopes, previous=True)
+            if previous != scope:
+                # Сущность ушла с территории: прежним устройствам - удаление.
+                # Пишется до текущей записи - последней по сущности (её
+                # оставляет компакция) остаётся запись новой территории
+                rows.append(_log_row(
+                    entity.__tablename__,
+                    entity.id,
+                    "delete",
+                    version=getattr(entity, "version", None),
+                    **previous,
+                ))
+                if isinstance(entity, Object):
+                    moved_objects.append((entity, scope, previous))
+        rows.append(_log_row(
+            entity.__tablename__,
+            entity.id,
+            action,
+            version=getattr(entity, "version", None),
+            changed_columns=_changed_columns(entity) if action == "update" else None,
+            **scope,
+        ))
+
+    # Клиенты перенесённого объекта переезжают вместе с ним
+    for entity, scope, previous in moved_objects:
+        result = session.execute(select(Customer.id).where(Customer.object_id == entity.id))
+        for customer_id in result.scalars():
+            if customer_id in changed_ids:
+                continue
+            for customer_action, customer_scope in (("delete", previous), ("update", scope)):
+                rows.append(_log_row(
+                    Customer.__tablename__,
+                    customer_id,
+                    customer_action,
+                    **dict(customer_scope, owner_id=None),
+                ))
+
+
+@event.listens_for(Session, "after_flush")
+def _write_orm_changes(session: Session, flush_context: Any) -> None:
+    """Записать журнал после сущностей: блокировка - непосредственно перед INSERT"""
+    rows = session.info.pop(_PENDING_KEY, None)
+    if not rows:
+        return
+    connection = session.connection()
+    lock = _lock_statement(connection.dialect.name)
+    if lock is not None:
+        connection.execute(lock)
+    connection.execute(insert(ChangeLog.__table__), rows)
+
+
+def _log_row(
+    table_name: str,
+    entity_id: Any,
+    action: str,
+    version: Optional[int] = None,
+    changed_columns: Optional[list[str]] = None,
+    **scope: Any,
+) -> dict[str, Any]:
+    """Строка change_log (одинаковый набор ключей - один executemany)"""
+    return {
+        "table_name": table_name,
+        "entity_id": entity_id,
+        "action": action,
+        "version": version,
+        "changed_columns": changed_columns,
+        **dict.fromkeys(SCOPE_COLUMNS),
+        **scope,
+    }
+
+
+def _previous_value(entity: Any, name: str) -> Any:
+    """Значение атрибута до изменений этого flush"""
+    history = inspect(entity).attrs[name].history
+    return history.deleted[0] if history.deleted else getattr(entity, name)
+
+
+def _object_scopes(session: Session, object_ids: set[Any]) -> dict[Any, dict[str, Any]]:
+    """Территории объектов: изменённые в сессии - по текущим значениям"""
+    object_ids.discard(None)
+    scopes = {
+        entity.id: _entity_scope(entity, {})
+        for entity in chain(session.new, session.identity_map.values())
+        if isinstance(entity, Object) and entity.id in object_ids
+    }
+    missing = object_ids - scopes.keys()
+    if missing:
+        result = session.execute(_scope_select(Object.__tablename__, list(missing)))
+        scopes.update({row[0]: dict(zip(SCOPE_COLUMNS, row[1:])) for row in result.all()})
+    return scopes
+
+
+def _entity_scope(entity: Any, object_scopes: dict[Any, dict[str, Any]], previous: bool = False) -> dict[str, Any]:
+    """Колонки территории записи журнала для сущности (previous - до изменений flush)"""
+    def value(name: str) -> Any:
+        return _previous_value(entity, name) if previous else getattr(entity, name)
+
+    if isinstance(entity, Customer):
+        scope = object_scopes.get(value("object_id"), {})
+        return {"city_id": scope.get("city_id"), "district_id": scope.get("district_id"), "owner_id": None}
+    names = _SCOPE_ATTRS[type(entity)]
+    return {column: value(name) if name else None for column, name in zip(SCOPE_COLUMNS, names)}
+
+
+def _changed_columns(entity: Any) -> list[str]:
+    """Колонки сущности, изменённые в этом flush (onupdate-колонки сюда не попадают)"""
+    state = inspect(entity)
+    return [
+        attr.columns[0].name
+        for attr in state.mapper.column_attrs
+        if state.attrs[attr.key].history.has_changes()
+    ]
+
+
+def _versioned(model: Any) -> bool:
+    return "version" in model.__table__.columns
+
+
+def install_change_log_triggers(connection: Connection) -> None:
+    """Создать триггеры tombstone'ов (AFTER DELETE -> change_log) для текущей СУБД"""
+    dialect_name = connection.dialect.name
+
+    if dialect_name == "sqlite":
+        for model in TRACKED_MODELS:
+            table_name = model.__tablename__
+            version = "OLD.version" if _versioned(model) else "NULL"
+            if model is Customer:
+                scope = (
+                    "(SELECT city_id FROM objects WHERE id = OLD.object_id), "
+                    "(SELECT district_id FROM objects WHERE id = OLD.object_id), NULL"
+                )
+            else:
+                scope = ", ".join(f"OLD.{name}" if name else "NULL" for name in _SCOPE_ATTRS[model])
+            connection.execute(text(f"DROP TRIGGER IF EXISTS change_log_{table_name}_ad"))
+            connection.execute(text(
+                f"CREATE TRIGGER change_log_{table_name}_ad AFTER DELETE ON {table_name} BEGIN "
+                f"INSERT INTO change_log (table_name, entity_id, action, version, city_id, district_id, owner_id, changed_at) "
+                f"VALUES ('{table_name}', OLD.id, 'delete', {version}, {scope}, CURRENT_TIMESTAMP); END"
+            ))
+
+    elif dialect_name == "postgresql":
+        connection.execute(text(
+            "CREATE OR REPLACE FUNCTION change_log_tombstone() RETURNS trigger AS $$ "
+            "DECLARE "
+            "old_row jsonb := to_jsonb(OLD); "
+            "scope_city uuid := (old_row ->> 'city_id')::uuid; "
+            "scope_district uuid := (old_row ->> 'district_id')::uuid; "
+            "BEGIN "
+            f"PERFORM pg_advisory_xact_lock({_LOCK_KEY}); "
+            "IF TG_TABLE_NAME = 'customers' THEN "
+            "SELECT city_id, district_id INTO scope_city, scope_district "
+            "FROM objects WHERE id = (old_row ->> 'object_id')::uuid; "
+            "END IF; "
+            "INSERT INTO change_log (table_name, entity_id, action, version, city_id, district_id, owner_id, changed_at) "
+            "VALUES (TG_TABLE_NAME, OLD.id, 'delete', (old_row ->> 'version')::integer, scope_city, scope_district, "
+            "COALESCE(old_row ->> 'responsible_user_id', old_row ->> 'engineer_id')::uuid, "
+            "timezone('utc', clock_timestamp())); "
+            "RETURN OLD; "
+            "END; $$ LANGUAGE plpgsql"
+        ))
+        for model in TRACKED_MODELS:
+            table_name = model.__tablename__
+            connection.execute(text(f"DROP TRIGGER IF EXISTS change_log_{table_name}_ad ON {table_name}"))
+            connection.execute(text(
+                f"CREATE TRIGGER change_log_{table_name}_ad AFTER DELETE ON {table_name} "
+                f"FOR EACH ROW EXECUTE FUNCTION change_log_tombstone()"
+            ))
+
+
+def drop_change_log_triggers(connection: Connection) -> None:
+    """Удалить триггеры tombstone'ов"""
+    dialect_name = connection.dialect.name
+
+    for model in TRACKED_MODELS:
+        table_name = model.__tablename__
+        if dialect_name == "sqlite":
+            connection.execute(text(f"DROP TRIGGER IF EXISTS change_log_{table_name}_ad"))
+        elif dialect_name == "postgresql":
+            connection.execute(text(f"DROP TRIGGER IF EXISTS change_log_{table_name}_ad ON {table_name}"))
+    if dialect_name == "postgresql":
+        connection.execute(text("DROP FUNCTION IF EXISTS change_log_tombstone()"))
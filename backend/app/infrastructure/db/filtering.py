@@ -0,0 +1,307 @@
+"""
+Фильтры и сортировка списков и отчётов по белому списку
+
+Модели параметров (ObjectFilterParams, VisitFilterParams, CustomerFilterParams;
+база - app.core.filters.FilterParams) превращаются в WHERE и ORDER BY по QuerySpec сущности:
+условия объединяются через AND, неизвестное поле фильтра или сортировки -
+ValidationError, фильтрация всегда выполняется в БД.
+
+Сортировка принимается, только если её обслуживает индекс таблицы: после
+колонок, зафиксированных фильтрами на равенство, индекс должен начинаться с
+колонок сортировки (например, city_id=... и sort=status - индекс
+(city_id, status)). Иначе ORDER BY ... LIMIT превращается в сортировку всей
+выборки.
+"""
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Optional, Union
+from uuid import UUID
+
+from pydantic import Field, ValidationError as PydanticValidationError
+from sqlalchemy import Select, String, and_, cast, func, literal_column, select
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.schema import PrimaryKeyConstraint, UniqueConstraint
+
+from app.core.errors import ValidationError
+from app.core.filters import FilterParams, parse_sort
+from app.infrastructure.db.models import Object, ObjectStatus, ObjectType, Visit, VisitStatus, Customer
+from app.infrastructure.db.search import OBJECTS_SEARCH, CUSTOMERS_SEARCH, SearchSpec, apply_search
+
+SortOrder = dict[str, str]  # поле -> asc | desc (как возвращает parse_sort)
+
+
+class ObjectFilterParams(FilterParams):
+    """Фильтры для объектов"""
+    city_id: Optional[UUID] = None
+    district_id: Optional[UUID] = None
+    status: Optional[ObjectStatus] = None
+    type: Optional[ObjectType] = None
+    responsible_user_id: Optional[UUID] = None
+
+
+class VisitFilterParams(FilterParams):
+    """Фильтры для визитов"""
+    engineer_id: Optional[UUID] = None
+    object_id: Optional[UUID] = None
+    customer_id: Optional[UUID] = None
+    status: Optional[VisitStatus] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    next_action_due: Optional[bool] = None  # Выборка "к прозвону"
+
+
+class CustomerFilterParams(FilterParams):
+    """Фильтры для клиентов"""
+    object_id: Optional[UUID] = None
+    phone: Optional[str] = None
+    interests: Optional[list[str]] = None
+    rating_min: Optional[int] = Field(None, ge=1, le=5)
+    rating_max: Optional[int] = Field(None, ge=1, le=5)
+
+
+
+@dataclass(frozen=True)
+class FilterField:
+    """Поле фильтра: колонка модели и оператор"""
+    column: str
+    op: str = "eq"  # eq | gte | lte | contains_all (JSON-массив) | due (<= сейчас)
+
+
+@dataclass(frozen=True)
+class QuerySpec:
+    """Белый список фильтров и сортировок сущности"""
+    model: Any
+    params: type[FilterParams]
+    filters: dict[str, FilterField]
+    sorts: tuple[str, ...]
+    default_sort: SortOrder
+    keyset: str  # Колонка keyset-пагинации cursor-режима (порядок - по ней, DESC)
+    search: Optional[SearchSpec] = None
+    index_columns: tuple[tuple[str, ...], ...] = field(init=False)
+
+    def __post_init__(self) -> None:
+        table = self.model.__table__
+        indexes = [tuple(column.name for column in index.columns) for index in table.indexes]
+        indexes += [
+            tuple(column.name for column in constraint.columns)
+            for constraint in table.constraints
+            if isinstance(constraint, (PrimaryKeyConstraint, UniqueConstraint))
+        ]
+        object.__setattr__(self, "index_columns", tuple(indexes))
+
+    @property
+    def table_name(self) -> str:
+        return self.model.__tablename__
+
+
+OBJECTS_QUERY = QuerySpec(
+    model=Object,
+    params=ObjectFilterParams,
+    filters={
+        "city_id": FilterField("city_id"),
+        "district_id": FilterField("district_id"),
+        "status": FilterField("status"),
+        "type": FilterField("type"),
+        "responsible_user_id": FilterField("responsible_user_id"),
+    },
+    sorts=("updated_at", "last_visit_at", "status", "version"),
+    default_sort={"updated_at": "desc"},
+    keyset="updated_at",
+    search=OBJECTS_SEARCH,
+)
+
+VISITS_QUERY = QuerySpec(
+    model=Visit,
+    params=VisitFilterParams,
+    filters={
+        "engineer_id": FilterField("engineer_id"),
+        "object_id": FilterField("object_id"),
+        "customer_id": FilterField("customer_id"),
+        "status": FilterField("status"),
+        "date_from": FilterField("scheduled_at", "gte"),
+        "date_to": FilterField("scheduled_at", "lte"),
+        "next_action_due": FilterField("next_action_due_at", "due"),
+    },
+    sorts=("scheduled_at", "finished_at", "status", "next_action_due_at", "version"),
+    default_sort={"scheduled_at": "desc"},
+    keyset="scheduled_at",
+)
+
+CUSTOMERS_QUERY = QuerySpec(
+    model=Customer,
+    params=CustomerFilterParams,
+    filters={
+        "object_id": FilterField("object_id"),
+        "phone": FilterField("phone"),
+        "interests": FilterField("interests", "contains_all"),
+        "rating_min": FilterField("provider_rating", "gte"),
+        "rating_max": FilterField("provider_rating", "lte"),
+    },
+    sorts=("updated_at",),
+    default_sort={"updated_at": "desc"},
+    keyset="updated_at",
+    search=CUSTOMERS_SEARCH,
+)
+
+
+def _json_contains(column: Any, value: Any, dialect_name: str) -> Any:
+    """Элемент JSON-массива равен value (а не подстрока сериализованного массива)"""
+    if dialect_name == "postgresql":
+        return cast(column, JSONB).contains([value])
+    if dialect_name == "sqlite":
+        items = func.json_each(column).table_valued("value")
+        return select(literal_column("1")).select_from(items).where(items.c.value == value).exists()
+    return cast(column, String).like(f"%{json.dumps(value, ensure_ascii=False)}%")
+
+
+def _condition(column: Any, op: str, value: Any, dialect_name: str) -> Any:
+    if op == "eq":
+        return column == value
+    if op == "gte":
+        return column >= value
+    if op == "lte":
+        return column <= value
+    if op == "contains_all":
+        return and_(*(_json_contains(column, item, dialect_name) for item in value))
+    if op == "due":
+        return and_(column.isnot(None), column <= datetime.utcnow())
+    raise ValueError(f"Unknown filter operator: {op}")
+
+
+def filter_values(spec: QuerySpec, params: FilterParams) -> dict[str, Any]:
+    """Заданные фильтры (и q) - для ключа кэша count и логов"""
+    values = {name: getattr(params, name) for name in spec.filters}
+    values["q"] = params.q
+    return {name: value for name, value in values.items() if value not in (None, [], False)}
+
+
+def _active_filters(spec: QuerySpec, params: FilterParams) -> dict[str, Any]:
+    return {name: value for name, value in filter_values(spec, params).items() if name != "q"}
+
+
+def filter_conditions(spec: QuerySpec, params: FilterParams, dialect_name: str) -> list[Any]:
+    """Условия WHERE (объединяются через AND; текстовый поиск - apply_search)"""
+    conditions = []
+    for name, value in _active_filters(spec, params).items():
+        filter_field = spec.filters[name]
+        column = getattr(spec.model, filter_field.column)
+        conditions.append(_condition(column, filter_field.op, value, dialect_name))
+    return conditions
+
+
+def apply_filters(
+    stmt: Select,
+    spec: QuerySpec,
+    params: FilterParams,
+    dialect_name: str,
+    ranked: bool = False,
+) -> Select:
+    """WHERE по фильтрам и полнотекстовый поиск q (ranked - сортировка по релевантности)"""
+    conditions = filter_conditions(spec, params, dialect_name)
+    if conditions:
+        stmt = stmt.where(and_(*conditions))
+    if params.q and spec.search is not None:
+        stmt = apply_search(stmt, spec.search, params.q, dialect_name, ranked=ranked)
+    return stmt
+
+
+def _equality_columns(spec: QuerySpec, params: FilterParams) -> set[str]:
+    return {
+        spec.filters[name].column
+        for name in _active_filters(spec, params)
+        if spec.filters[name].op == "eq"
+    }
+
+
+def _index_supports(index: tuple[str, ...], columns: list[str], fixed: set[str]) -> bool:
+    """Индекс отдаёт строки в порядке columns, если его префикс зафиксирован равенствами"""
+    position = 0
+    while position < len(index) and index[position] in fixed and index[position] not in columns:
+        position += 1
+    return list(index[position:position + len(columns)]) == columns
+
+
+def resolve_sort(
+    spec: QuerySpec,
+    sort: Union[str, SortOrder, None],
+    params: Optional[FilterParams] = None,
+) -> SortOrder:
+    """
+    Проверить сортировку по белому списку и индексам
+
+    sort - строка "-updated_at,status" или {"updated_at": "desc"}; пустая - default_sort.
+    """
+    order = parse_sort(sort) if isinstance(sort, str) or sort is None else dict(sort)
+    if not order:
+        return dict(spec.default_sort)
+
+    errors = []
+    for name, direction in order.items():
+        if name not in spec.sorts:
+            errors.append(f"Unknown sort field '{name}', allowed: {', '.join(spec.sorts)}")
+        if str(direction).lower() not in ("asc", "desc"):
+            errors.append(f"Sort direction for '{name}' must be asc or desc")
+    if errors:
+        raise ValidationError("Invalid sort", fields={"sort": errors})
+
+    order = {name: str(direction).lower() for name, direction in order.items()}
+    if len(set(order.values())) > 1:
+        raise ValidationError(
+            "Invalid sort",
+            fields={"sort": ["Mixed sort directions are not supported by table indexes"]},
+        )
+
+    columns = list(order)
+    fixed = _equality_columns(spec, params) if params is not None else set()
+    if not any(_index_supports(index, columns, fixed) for index in spec.index_columns):
+        raise ValidationError(
+            "Invalid sort",
+            fields={"sort": [f"No index on {spec.table_name} supports sorting by {', '.join(columns)}"]},
+        )
+    return order
+
+
+def order_by_clauses(spec: QuerySpec, order: SortOrder) -> list[Any]:
+    """ORDER BY по проверенной сортировке, id - для стабильного порядка
+
+    Без NULLS LAST: порядок NULL совпадает с порядком индекса при прямом и
+    обратном проходе.
+    """
+    clauses = []
+    for name, direction in order.items():
+        column = getattr(spec.model, name)
+        clauses.append(column.desc() if direction == "desc" else column.asc())
+    id_column = spec.model.id
+    clauses.append(id_column.desc() if list(order.values())[0] == "desc" else id_column.asc())
+    return clauses
+
+
+def check_cursor_sort(spec: QuerySpec, sort: Union[str, SortOrder, None]) -> None:
+    """В cursor-режиме порядок задаёт keyset - другая сортировка не поддерживается"""
+    order = parse_sort(sort) if isinstance(sort, str) or sort is None else dict(sort)
+    if order and order != {spec.keyset: "desc"}:
+        raise ValidationError(
+            "Invalid sort",
+            fields={"sort": [f"Cursor mode is ordered by -{spec.keyset} only"]},
+        )
+
+
+def parse_filters(spec: QuerySpec, filters: Optional[dict[str, Any]]) -> FilterParams:
+    """Фильтры из JSON (отчёты) в модель параметров; незнакомые ключи - ошибка"""
+    filters = filters or {}
+    allowed = set(spec.filters) | {"q"}
+    unknown = sorted(set(filters) - allowed)
+    if unknown:
+        raise ValidationError(
+            "Invalid filters",
+            fields={name: [f"Unknown filter, allowed: {', '.join(sorted(allowed))}"] for name in unknown},
+        )
+    try:
+        return spec.params.model_validate(filters)
+    except PydanticValidationError as e:
+        fields: dict[str, list[str]] = {}
+        for error in e.errors():
+            name = ".".join(str(part) for part in error["loc"]) or "filters"
+            fields.setdefault(name, []).append(error["msg"])
+        raise ValidationError("Invalid filters", fields=fields)
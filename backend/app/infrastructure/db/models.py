@@ -4,7 +4,7 @@ SQLAlchemy ORM модели
 import uuid
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import String, Integer, Float, Boolean, DateTime, Text, JSON, ForeignKey, Enum as SQLEnum, Index
+from sqlalchemy import String, Integer, BigInteger, Float, Boolean, DateTime, Text, JSON, ForeignKey, Enum as SQLEnum, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 import enum
@@ -339,6 +339,14 @@ class ReportJob(Base):
     
     rq_job_id: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
     
+    # Воркер отчётов: кто взял задачу, последний heartbeat, число попыток
+    worker_id: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    heartbeat_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    
+    # Кэш отчётов: sha256 спецификации и водяного знака данных (файл report_{entity}_{fingerprint}.xlsx)
+    fingerprint: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
@@ -379,6 +387,15 @@ class AuditLog(Base):
     )
 
 
+class AuditOutbox(Base):
+    """Outbox аудита: пишется в транзакции изменения, в audit_logs переносится дренером"""
+    __tablename__ = "audit_outbox"
+    
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False)  # Поля будущей записи audit_logs
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
 class SyncToken(Base):
     """Токены для офлайн-синхронизации"""
     __tablename__ = "sync_tokens"
@@ -388,6 +405,7 @@ class SyncToken(Base):
     table_name: Mapped[str] = mapped_column(String(50), nullable=False, index=True)
     server_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False, index=True)
     checksum: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    entity_version: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # Версия сущности после записи checksum
     status: Mapped[str] = mapped_column(String(20), default="synced", nullable=False)
     last_seen_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
     
@@ -397,3 +415,34 @@ class SyncToken(Base):
     __table_args__ = (
         Index("ix_sync_token_table_seen", "table_name", "last_seen_at"),
     )
+
+
+class ChangeLog(Base):
+    """Журнал изменений для /sync/changes: монотонный seq пишется в транзакции изменения"""
+    __tablename__ = "change_log"
+    
+    seq: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    table_name: Mapped[str] = mapped_column(String(50), nullable=False)
+    entity_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    action: Mapped[str] = mapped_column(String(10), nullable=False)  # create | update | delete
+    version: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # Версия записи после изменения (если известна)
+    changed_columns: Mapped[Optional[list[str]]] = mapped_column(JSON, nullable=True)  # Изменённые колонки update; NULL - вся строка
+    # Территория и владелец сущности на момент изменения (лента инженера)
+    city_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True), nullable=True)
+    district_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True), nullable=True)
+    owner_id: Mapped[Optional[uuid.UUID]] = mapped_column(UUID(as_uuid=True), nullable=True)
+    changed_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Индексы
+    __table_args__ = (
+        Index("ix_change_log_changed_at", "changed_at"),
+        Index("ix_change_log_entity", "table_name", "entity_id", "seq"),  # Для компакции
+        Index("ix_change_log_table_seq", "table_name", "seq"),  # Водяной знак таблицы (кэш отчётов)
+        Index("ix_change_log_city_seq", "city_id", "seq"),  # Лента территории
+        Index("ix_change_log_owner_seq", "owner_id", "seq"),  # Свои визиты и объекты
+        {"sqlite_autoincrement": True},  # seq не переиспользуется после удаления строк
+    )
+
+
+# Слушатели журнала изменений регистрируются вместе с моделями
+from app.infrastructure.db import change_log  # noqa: E402,F401  pylint: disable=wrong-import-position,unused-import
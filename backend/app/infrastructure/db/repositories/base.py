@@ -1,25 +1,194 @@
 """
 Базовый репозиторий
 """
-from typing import Generic, TypeVar, Optional, Any
+import enum
+import json
+from typing import Generic, TypeVar, Optional, Any, Sequence
 from uuid import UUID
-from sqlalchemy import select, update, delete
+from sqlalchemy import select, update, delete, and_, or_, func, Select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import raiseload
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.core.filters import FilterParams
+from app.core.pagination import encode_cursor, decode_cursor, CountStrategy
+from app.infrastructure.cache.count_cache import get_cached_count
+from app.infrastructure.db.filtering import (
+    QuerySpec,
+    apply_filters,
+    check_cursor_sort,
+    filter_values,
+    order_by_clauses,
+    resolve_sort,
+)
 
 T = TypeVar("T")
 
 
+class LoadProfile(str, enum.Enum):
+    """Профиль загрузки связей для запроса"""
+    LEAN = "lean"          # Только колонки сущности: для списков, связи не грузятся
+    DETAILED = "detailed"  # Связи для карточек/отчётов одним JOIN, без каскада дальше
+
+
+class _ExplainJSON(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) для оценки количества строк планировщиком"""
+    inherit_cache = False
+    
+    def __init__(self, statement: Select):
+        self.statement = statement
+
+
+@compiles(_ExplainJSON, "postgresql")
+def _compile_explain_pg(element: _ExplainJSON, compiler: Any, **kw: Any) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+async def count_exact(session: AsyncSession, stmt: Select) -> int:
+    """Точный COUNT(*) по отфильтрованному запросу"""
+    count_stmt = select(func.count()).select_from(stmt.order_by(None).subquery())
+    result = await session.execute(count_stmt)
+    return result.scalar_one() or 0
+
+
+async def count_estimated(session: AsyncSession, stmt: Select) -> int:
+    """
+    Оценка количества строк по плану запроса (Postgres)
+    
+    На остальных СУБД оценки планировщика нет - считаем точно.
+    """
+    if session.get_bind().dialect.name != "postgresql":
+        return await count_exact(session, stmt)
+    
+    result = await session.execute(_ExplainJSON(stmt.order_by(None)))
+    plan = result.scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def count_total(
+    session: AsyncSession,
+    stmt: Select,
+    strategy: CountStrategy,
+    table_name: str,
+    filters: dict[str, Any],
+) -> Optional[int]:
+    """
+    Посчитать total для списка согласно стратегии
+    
+    stmt - отфильтрованный SELECT без сортировки/пагинации,
+    filters - значения фильтров для ключа кэша (strategy=cached).
+    """
+    if strategy == CountStrategy.NONE:
+        return None
+    
+    if strategy == CountStrategy.ESTIMATED:
+        return await count_estimated(session, stmt)
+    
+    if strategy == CountStrategy.CACHED:
+        return await get_cached_count(table_name, filters, lambda: count_exact(session, stmt))
+    
+    return await count_exact(session, stmt)
+
+
+def apply_keyset(stmt: Select, sort_column: Any, id_column: Any, cursor: Optional[str], size: int) -> Select:
+    """
+    Keyset-пагинация по (sort_key DESC, id DESC)
+    
+    Вместо OFFSET продолжает выборку строго после позиции курсора, поэтому
+    страница N стоит столько же, сколько первая (индекс по sort_key).
+    NULL-значения ключа сортировки идут в конце.
+    """
+    position = decode_cursor(cursor) if cursor else None
+    
+    if position:
+        sort_value, last_id = position
+        if sort_value is None:
+            stmt = stmt.where(and_(sort_column.is_(None), id_column < last_id))
+        else:
+            stmt = stmt.where(
+                or_(
+                    sort_column < sort_value,
+                    and_(sort_column == sort_value, id_column < last_id),
+                    sort_column.is_(None),
+                )
+            )
+    
+    # Берём на одну строку больше, чтобы узнать has_more без COUNT
+    return stmt.order_by(sort_column.desc().nulls_last(), id_column.desc()).limit(size + 1)
+
+
+def keyset_page(rows: list[Any], sort_attr: str, size: int) -> tuple[list[Any], Optional[str]]:
+    """Отрезать лишнюю строку и сформировать next_cursor"""
+    if len(rows) <= size:
+        return rows, None
+    
+    rows = rows[:size]
+    last = rows[-1]
+    if isinstance(last, dict):
+        return rows, encode_cursor(last[sort_attr], last["id"])
+    return rows, encode_cursor(getattr(last, sort_attr), last.id)
+
+
+def select_columns(model: Any, columns: Sequence[str]) -> Select:
+    """Core-проекция: только перечисленные колонки модели, без сущностей ORM"""
+    return select(*(getattr(model, name) for name in columns))
+
+
+async def fetch_rows(session: AsyncSession, stmt: Select) -> list[dict[str, Any]]:
+    """Выполнить проекцию и вернуть строки как dict (минуя identity map)"""
+    result = await session.execute(stmt)
+    return [dict(row) for row in result.mappings()]
+
+
 class BaseRepository(Generic[T]):
     """Базовый репозиторий с CRUD операциями"""
     
+    # Опции загрузки по профилям; профиль None - стратегии по умолчанию из моделей
+    load_profiles: dict[LoadProfile, tuple] = {
+        LoadProfile.LEAN: (raiseload("*"),),
+    }
+    
+    # Белый список фильтров и сортировок для find_by_filters*
+    query_spec: Optional[QuerySpec] = None
+    
     def __init__(self, session: AsyncSession, model: type[T]):
         self.session = session
         self.model = model
     
-    async def get(self, id: UUID) -> Optional[T]:
+    @classmethod
+    def loader_options(cls, profile: Optional[LoadProfile]) -> tuple:
+        """Опции loader'ов для профиля (для запросов, собранных вне репозитория)"""
+        if profile is None:
+            return ()
+        return cls.load_profiles.get(profile, ())
+    
+    def _select(self, columns: Optional[Sequence[str]] = None) -> Select:
+        """select сущностей или, если заданы columns, Core-проекция"""
+        if columns is None:
+            return select(self.model)
+        return select_columns(self.model, columns)
+    
+    async def _fetch(
+        self,
+        stmt: Select,
+        columns: Optional[Sequence[str]],
+        profile: Optional[LoadProfile],
+    ) -> list[Any]:
+        """Выполнить запрос: сущности с опциями профиля или dict-строки проекции"""
+        if columns is not None:
+            return await fetch_rows(self.session, stmt)
+        result = await self.session.execute(stmt.options(*self.loader_options(profile)))
+        return list(result.scalars().all())
+    
+    async def get(self, id: UUID, profile: Optional[LoadProfile] = None) -> Optional[T]:
         """Получить по ID"""
         result = await self.session.execute(
-            select(self.model).where(self.model.id == id)
+            select(self.model)
+            .where(self.model.id == id)
+            .options(*self.loader_options(profile))
         )
         return result.scalar_one_or_none()
     
@@ -31,6 +200,64 @@ class BaseRepository(Generic[T]):
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
     
+    async def find_by_cursor(
+        self,
+        stmt: Select,
+        sort_attr: str,
+        cursor: Optional[str],
+        size: int,
+        profile: Optional[LoadProfile] = LoadProfile.LEAN,
+        columns: Optional[Sequence[str]] = None,
+    ) -> tuple[list[Any], Optional[str]]:
+        """Выполнить запрос в cursor-режиме: (items, next_cursor)"""
+        stmt = apply_keyset(stmt, getattr(self.model, sort_attr), self.model.id, cursor, size)
+        rows = await self._fetch(stmt, columns, profile)
+        return keyset_page(rows, sort_attr, size)
+    
+    def _filtered(self, params: FilterParams, columns: Optional[Sequence[str]], ranked: bool) -> Select:
+        """SELECT с фильтрами и поиском из params (по query_spec)"""
+        dialect_name = self.session.get_bind().dialect.name
+        return apply_filters(self._select(columns), self.query_spec, params, dialect_name, ranked=ranked)
+    
+    async def find_by_filters(
+        self,
+        params: FilterParams,
+        limit: int = 100,
+        offset: int = 0,
+        count: CountStrategy = CountStrategy.EXACT,
+        profile: Optional[LoadProfile] = LoadProfile.LEAN,
+        columns: Optional[Sequence[str]] = None,
+    ) -> tuple[list[Any], Optional[int]]:
+        """
+        Поиск с фильтрами, сортировкой params.sort и пагинацией (total по стратегии count)
+        
+        columns - Core-проекция: вместо сущностей возвращаются dict'ы с этими колонками.
+        Поиск q сортирует по релевантности, затем по params.sort.
+        """
+        spec = self.query_spec
+        order = resolve_sort(spec, params.sort, params)
+        stmt = self._filtered(params, columns, ranked=True)
+        
+        total = await count_total(self.session, stmt, count, spec.table_name, filter_values(spec, params))
+        
+        stmt = stmt.order_by(*order_by_clauses(spec, order)).limit(limit).offset(offset)
+        items = await self._fetch(stmt, columns, profile)
+        
+        return items, total
+    
+    async def find_by_filters_cursor(
+        self,
+        params: FilterParams,
+        cursor: Optional[str] = None,
+        size: int = 20,
+        profile: Optional[LoadProfile] = LoadProfile.LEAN,
+        columns: Optional[Sequence[str]] = None,
+    ) -> tuple[list[Any], Optional[str]]:
+        """Поиск с фильтрами в cursor-режиме (keyset по query_spec.keyset, id; поиск только фильтрует)"""
+        check_cursor_sort(self.query_spec, params.sort)
+        stmt = self._filtered(params, columns, ranked=False)
+        return await self.find_by_cursor(stmt, self.query_spec.keyset, cursor, size, profile, columns)
+    
     async def find(self, **filters: Any) -> list[T]:
         """Найти все по фильтрам"""
         stmt = select(self.model)
@@ -40,16 +267,14 @@ class BaseRepository(Generic[T]):
         return list(result.scalars().all())
     
     async def add(self, entity: T) -> T:
-        """Добавить сущность"""
+        """Добавить сущность (flush без commit; значения default заполняются при flush)"""
         self.session.add(entity)
         await self.session.flush()
-        await self.session.refresh(entity)
         return entity
     
     async def update(self, entity: T) -> T:
-        """Обновить сущность"""
+        """Обновить сущность (flush без commit)"""
         await self.session.flush()
-        await self.session.refresh(entity)
         return entity
     
     async def delete(self, entity: T) -> None:
@@ -5,14 +5,27 @@ from uuid import UUID
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
+from sqlalchemy.orm import joinedload, raiseload
 
-from app.infrastructure.db.repositories.base import BaseRepository
+from app.infrastructure.db.repositories.base import BaseRepository, LoadProfile
+from app.infrastructure.db.filtering import CUSTOMERS_QUERY
 from app.infrastructure.db.models import Customer
 
 
 class CustomerRepository(BaseRepository[Customer]):
     """Репозиторий клиентов"""
     
+    load_profiles = {
+        LoadProfile.LEAN: (raiseload("*"),),
+        LoadProfile.DETAILED: (
+            joinedload(Customer.object).raiseload("*"),
+            joinedload(Customer.unit).raiseload("*"),
+        ),
+    }
+    
+    # Фильтры CustomerFilterParams, поиск по имени/телефону/портрету, keyset по updated_at
+    query_spec = CUSTOMERS_QUERY
+    
     def __init__(self, session: AsyncSession):
         super().__init__(session, Customer)
     
@@ -39,6 +52,7 @@ class CustomerRepository(BaseRepository[Customer]):
         
         # Применяем пагинацию (использует индекс updated_at для сортировки)
         stmt = stmt.order_by(Customer.updated_at.desc()).limit(limit).offset(offset)
+        stmt = stmt.options(*self.loader_options(LoadProfile.LEAN))
         
         result = await self.session.execute(stmt)
         items = list(result.scalars().all())
@@ -1,14 +1,53 @@
 """
 Репозиторий для синхронизации
 """
+from dataclasses import dataclass
 from uuid import UUID, uuid4
 from datetime import datetime
-from typing import Optional, Any
+from typing import Optional, Any, AsyncIterator, Iterable
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import select, update, delete, func, and_, or_
+from sqlalchemy.orm import aliased, raiseload
 
 from app.infrastructure.db.repositories.base import BaseRepository
-from app.infrastructure.db.models import SyncToken, Object, Visit, Customer
+from app.infrastructure.db.models import SyncToken, ChangeLog, Object, Visit, Customer, User, UserRole
+
+# Таблицы, доступные офлайн-синхронизации
+SYNC_TABLES = {
+    "objects": Object,
+    "visits": Visit,
+    "customers": Customer,
+}
+
+
+
+@dataclass(frozen=True)
+class SyncScope:
+    """
+    Территория ленты изменений инженера
+
+    Без user_id - только территория (снимок для всех устройств района),
+    без city_id - только свои записи (дочитка после снимка).
+    """
+    user_id: Optional[UUID] = None
+    city_id: Optional[UUID] = None
+    district_id: Optional[UUID] = None
+    
+    def clause(self) -> Any:
+        """Условие на журнал: территория, свои записи и записи без территории"""
+        conditions = []
+        if self.city_id is not None:
+            territory = ChangeLog.city_id == self.city_id
+            if self.district_id is not None:
+                # Объекты города без района видны всем районам города
+                territory = and_(
+                    territory,
+                    or_(ChangeLog.district_id == self.district_id, ChangeLog.district_id.is_(None)),
+                )
+            conditions += [territory, and_(ChangeLog.city_id.is_(None), ChangeLog.owner_id.is_(None))]
+        if self.user_id is not None:
+            conditions.append(ChangeLog.owner_id == self.user_id)
+        return or_(*conditions)
 
 
 class SyncRepository(BaseRepository[SyncToken]):
@@ -25,33 +64,46 @@ class SyncRepository(BaseRepository[SyncToken]):
         )
         return result.scalar_one_or_none()
     
-    async def upsert_token(
-        self,
-        client_id: UUID,
-        table_name: str,
-        server_id: UUID,
-        checksum: Optional[str] = None,
-    ) -> SyncToken:
-        """Создать или обновить токен синхронизации"""
-        existing = await self.get_by_client_id(client_id)
-        
-        if existing:
-            existing.server_id = server_id
-            existing.checksum = checksum
-            existing.last_seen_at = datetime.utcnow()
-            existing.status = "synced"
-            return existing
-        
-        new_token = SyncToken(
-            client_generated_id=client_id,
-            table_name=table_name,
-            server_id=server_id,
-            checksum=checksum,
-            status="synced",
+    async def get_by_client_ids(self, client_ids: Iterable[UUID]) -> dict[UUID, SyncToken]:
+        """Токены пачки одним запросом: client_generated_id -> токен"""
+        client_ids = set(client_ids)
+        if not client_ids:
+            return {}
+        result = await self.session.execute(
+            select(SyncToken).where(SyncToken.client_generated_id.in_(client_ids))
         )
-        self.session.add(new_token)
-        await self.session.flush()
-        return new_token
+        return {token.client_generated_id: token for token in result.scalars().all()}
+    
+    async def expire_tokens(self, table_name: str, before: datetime, limit: int) -> int:
+        """Удалить до limit токенов таблицы, не использовавшихся с before (по ix_sync_token_table_seen)"""
+        expired = (
+            select(SyncToken.id)
+            .where(SyncToken.table_name == table_name, SyncToken.last_seen_at < before)
+            .order_by(SyncToken.last_seen_at)
+            .limit(limit)
+        )
+        result = await self.session.execute(
+            delete(SyncToken).where(SyncToken.id.in_(expired.scalar_subquery()))
+        )
+        return result.rowcount or 0
+    
+    async def count_tokens_by_table(self) -> dict[str, int]:
+        """Число токенов по таблицам"""
+        result = await self.session.execute(
+            select(SyncToken.table_name, func.count()).group_by(SyncToken.table_name)
+        )
+        return {table_name: count for table_name, count in result.all()}
+    
+    async def token_storage_bytes(self) -> tuple[Optional[int], Optional[int]]:
+        """Размер sync_tokens и индекса client_generated_id в байтах (только Postgres)"""
+        if self.session.get_bind().dialect.name != "postgresql":
+            return None, None
+        result = await self.session.execute(select(
+            func.pg_total_relation_size("sync_tokens"),
+            func.pg_relation_size("ix_sync_tokens_client_generated_id"),
+        ))
+        table_bytes, index_bytes = result.one()
+        return table_bytes, index_bytes
     
     async def get_entity_by_table(
         self,
@@ -59,40 +111,112 @@ class SyncRepository(BaseRepository[SyncToken]):
         entity_id: UUID,
     ) -> Optional[Any]:
         """Получить сущность по имени таблицы и ID"""
-        table_map = {
-            "objects": Object,
-            "visits": Visit,
-            "customers": Customer,
-        }
-        
-        model = table_map.get(table_name)
+        model = SYNC_TABLES.get(table_name)
         if not model:
             return None
         
         result = await self.session.execute(
-            select(model).where(model.id == entity_id)
+            select(model).where(model.id == entity_id).options(raiseload("*"))
         )
         return result.scalar_one_or_none()
     
-    async def find_changes_since(
+    async def get_entities_by_ids(
         self,
         table_name: str,
-        since: datetime,
-        limit: int = 1000,
-    ) -> list[Any]:
-        """Найти изменения в таблице с указанной даты"""
-        table_map = {
-            "objects": Object,
-            "visits": Visit,
-            "customers": Customer,
-        }
+        entity_ids: Iterable[UUID],
+    ) -> dict[UUID, Any]:
+        """Сущности таблицы одним запросом: id -> сущность"""
+        model = SYNC_TABLES.get(table_name)
+        entity_ids = set(entity_ids)
+        if not model or not entity_ids:
+            return {}
         
-        model = table_map.get(table_name)
-        if not model:
-            return []
-        
-        # Для SQLite используем updated_at, для Postgres можно использовать updated_at или аудит
-        stmt = select(model).where(model.updated_at >= since).order_by(model.updated_at).limit(limit)
+        result = await self.session.execute(
+            select(model).where(model.id.in_(entity_ids)).options(raiseload("*"))
+        )
+        return {entity.id: entity for entity in result.scalars().all()}
+    
+    def _change_log_stmt(
+        self,
+        tables: list[str],
+        after_seq: Optional[int],
+        since: Optional[datetime],
+        scope: Optional[SyncScope] = None,
+    ) -> Any:
+        """Range scan журнала после курсора (или с даты since) в порядке seq"""
+        stmt = select(ChangeLog).where(ChangeLog.table_name.in_(tables))
+        if scope is not None:
+            stmt = stmt.where(scope.clause())
+        if after_seq is not None:
+            stmt = stmt.where(ChangeLog.seq > after_seq)
+        elif since is not None:
+            stmt = stmt.where(ChangeLog.changed_at >= since)
+        return stmt.order_by(ChangeLog.seq)
+    
+    async def find_change_log(
+        self,
+        tables: list[str],
+        after_seq: Optional[int] = None,
+        since: Optional[datetime] = None,
+        limit: int = 1000,
+        scope: Optional[SyncScope] = None,
+    ) -> list[ChangeLog]:
+        """Записи журнала изменений после курсора (range scan по seq)"""
+        stmt = self._change_log_stmt(tables, after_seq, since, scope).limit(limit)
         result = await self.session.execute(stmt)
         return list(result.scalars().all())
-
+    
+    async def stream_change_log(
+        self,
+        tables: list[str],
+        after_seq: Optional[int] = None,
+        since: Optional[datetime] = None,
+        limit: Optional[int] = 1000,
+        batch_size: int = 500,
+        scope: Optional[SyncScope] = None,
+    ) -> AsyncIterator[list[ChangeLog]]:
+        """Записи журнала серверным курсором, пачками по batch_size"""
+        stmt = self._change_log_stmt(tables, after_seq, since, scope).limit(limit).execution_options(yield_per=batch_size)
+        
+        result = await self.session.stream(stmt)
+        try:
+            async for partition in result.scalars().partitions():
+                yield list(partition)
+        finally:
+            await result.close()  # Потребитель мог остановиться раньше конца курсора
+    
+    async def compact_change_log(self, before: datetime) -> int:
+        """
+        Удалить из журнала записи старше before: tombstone'ы и изменения,
+        перекрытые более поздней записью той же сущности
+        """
+        newer = aliased(ChangeLog)
+        superseded = (
+            select(newer.seq)
+            .where(
+                newer.table_name == ChangeLog.table_name,
+                newer.entity_id == ChangeLog.entity_id,
+                newer.seq > ChangeLog.seq,
+            )
+            .exists()
+        )
+        result = await self.session.execute(
+            delete(ChangeLog)
+            .where(ChangeLog.changed_at < before)
+            .where(or_(ChangeLog.action == "delete", superseded))
+        )
+        return result.rowcount or 0
+    
+    async def engineer_territories(self) -> list[tuple[UUID, Optional[UUID]]]:
+        """Территории (город, район) активных инженеров - для снимков начальной синхронизации"""
+        result = await self.session.execute(
+            select(User.city_id, User.district_id)
+            .where(User.role == UserRole.ENGINEER, User.is_active.is_(True), User.city_id.is_not(None))
+            .distinct()
+        )
+        return [(city_id, district_id) for city_id, district_id in result.all()]
+    
+    async def last_change_seq(self) -> int:
+        """Последний seq журнала (0 - журнал пуст)"""
+        result = await self.session.execute(select(func.max(ChangeLog.seq)))
+        return result.scalar() or 0
@@ -4,14 +4,23 @@
 from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.orm import joinedload, raiseload
 
-from app.infrastructure.db.repositories.base import BaseRepository
+from app.infrastructure.db.repositories.base import BaseRepository, LoadProfile
 from app.infrastructure.db.models import User, UserRole
 
 
 class UserRepository(BaseRepository[User]):
     """Репозиторий пользователей"""
     
+    load_profiles = {
+        LoadProfile.LEAN: (raiseload("*"),),
+        LoadProfile.DETAILED: (
+            joinedload(User.city).raiseload("*"),
+            joinedload(User.district).raiseload("*"),
+        ),
+    }
+    
     def __init__(self, session: AsyncSession):
         super().__init__(session, User)
     
@@ -0,0 +1,91 @@
+"""
+Маршрутизация чтения между primary и репликами
+
+Пользователь, только что записавший данные, на READ_YOUR_WRITES_SECONDS
+закрепляется за primary, чтобы не увидеть устаревшую реплику.
+Закрепление хранится в памяти процесса и в Redis (для остальных воркеров);
+в памяти - только закрепления текущего окна: истёкшие удаляются при записи.
+"""
+import time
+from typing import Any, Optional
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.core.security import decode_token
+from app.infrastructure.cache.redis_client import get_redis_client
+
+logger = get_logger(__name__)
+
+_WROTE_KEY = "routing_wrote"
+_local_pins: dict[str, float] = {}
+
+
+def _pin_key(subject: str) -> str:
+    return f"ryw:{subject}"
+
+
+def request_subject(request: Request) -> Optional[str]:
+    """sub из bearer-токена запроса (None для анонимных и невалидных токенов)"""
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return decode_token(token).get("sub")
+    except Exception:
+        return None
+
+
+def session_wrote(session: Any) -> bool:
+    """Был ли в сессии хотя бы один flush с изменениями"""
+    return bool(session.info.get(_WROTE_KEY))
+
+
+async def pin_to_primary(subject: Optional[str]) -> None:
+    """Закрепить пользователя за primary на окно read-your-writes"""
+    if not subject:
+        return
+    ttl = settings.READ_YOUR_WRITES_SECONDS
+    now = time.monotonic()
+    # Переставляем в конец: порядок словаря - порядок истечения (TTL один на всех)
+    _local_pins.pop(subject, None)
+    _local_pins[subject] = now + ttl
+    # Истёкшие закрепления - в начале словаря; без очистки словарь рос бы
+    # с каждым записавшим пользователем
+    while _local_pins:
+        oldest = next(iter(_local_pins))
+        if _local_pins[oldest] > now:
+            break
+        del _local_pins[oldest]
+    try:
+        redis_client = await get_redis_client()
+        await redis_client.set(_pin_key(subject), 1, ex=ttl)
+    except Exception as e:
+        logger.debug("Read-your-writes pin kept in process only", error=str(e))
+
+
+async def is_pinned_to_primary(subject: Optional[str]) -> bool:
+    """Должен ли пользователь сейчас читать с primary"""
+    if not subject:
+        return False
+
+    until = _local_pins.get(subject)
+    if until is not None:
+        if until > time.monotonic():
+            return True
+        _local_pins.pop(subject, None)
+
+    try:
+        redis_client = await get_redis_client()
+        return bool(await redis_client.exists(_pin_key(subject)))
+    except Exception:
+        return False
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_session_wrote(session: Session, flush_context: Any) -> None:
+    session.info[_WROTE_KEY] = True
@@ -0,0 +1,182 @@
+"""
+Поисковый индекс для `search`/`q` параметров списков
+
+SQLite: FTS5-таблицы с trigram-токенизатором, синхронизируются триггерами.
+Postgres: GIN-индексы pg_trgm (ILIKE по подстроке) и tsvector для длинных текстов,
+поддерживаются самой СУБД.
+На других СУБД и для коротких запросов (< 3 символов) используется ILIKE.
+"""
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import Select, select, or_, func, literal_column, table, column, text
+from sqlalchemy.engine import Connection
+
+from app.infrastructure.db.models import Object, Customer
+
+MIN_TRIGRAM_LENGTH = 3
+
+
+@dataclass(frozen=True)
+class SearchSpec:
+    """Описание индексируемой сущности"""
+    model: Any
+    fts_table: str
+    columns: tuple[str, ...]  # Короткие поля: trigram-поиск по подстроке
+    text_columns: tuple[str, ...] = field(default_factory=tuple)  # Длинные тексты: tsvector в Postgres
+
+    @property
+    def table_name(self) -> str:
+        return self.model.__tablename__
+
+    @property
+    def all_columns(self) -> tuple[str, ...]:
+        return self.columns + self.text_columns
+
+
+OBJECTS_SEARCH = SearchSpec(model=Object, fts_table="objects_search", columns=("address",))
+CUSTOMERS_SEARCH = SearchSpec(
+    model=Customer,
+    fts_table="customers_search",
+    columns=("full_name", "phone"),
+    text_columns=("portrait_text",),
+)
+
+SEARCH_SPECS = (OBJECTS_SEARCH, CUSTOMERS_SEARCH)
+
+
+def _fts_match_query(query: str) -> str:
+    """
+    Запрос FTS5: весь запрос - одна фраза (экранирование спецсимволов)
+
+    Фраза trigram-индекса совпадает с подстрокой, как ILIKE '%query%' в
+    Postgres; короче MIN_TRIGRAM_LENGTH - пусто (поиск через ILIKE).
+    """
+    if len(query) < MIN_TRIGRAM_LENGTH:
+        return ""
+    return '"' + query.replace('"', '""') + '"'
+
+
+
+def _ilike_condition(spec: SearchSpec, query: str) -> Any:
+    pattern = f"%{query.lower()}%"
+    return or_(*(getattr(spec.model, name).ilike(pattern) for name in spec.all_columns))
+
+
+def _pg_tsvector(spec: SearchSpec) -> Any:
+    """Выражение tsvector, совпадающее с выражением GIN-индекса"""
+    parts = [func.coalesce(getattr(spec.model, name), literal_column("''")) for name in spec.text_columns]
+    document = parts[0]
+    for part in parts[1:]:
+        document = document + literal_column("' '") + part
+    return func.to_tsvector(literal_column("'simple'::regconfig"), document)
+
+
+def apply_search(stmt: Select, spec: SearchSpec, query: str, dialect_name: str, ranked: bool = True) -> Select:
+    """
+    Добавить к запросу полнотекстовый фильтр (и сортировку по релевантности)
+
+    Фильтры, уже наложенные на stmt, сохраняются. ranked=False - только фильтр
+    (для cursor-режима, где порядок задаёт keyset).
+    """
+    query = query.strip()
+    if not query:
+        return stmt
+
+    if dialect_name == "sqlite":
+        match_query = _fts_match_query(query)
+        if not match_query:
+            return stmt.where(_ilike_condition(spec, query))
+
+        fts = table(spec.fts_table, column("entity_id"), column("rank"))
+        matches = (
+            select(fts.c.entity_id, fts.c.rank)
+            .where(literal_column(spec.fts_table).op("MATCH")(match_query))
+            .subquery()
+        )
+        stmt = stmt.join(matches, matches.c.entity_id == spec.model.id)
+        if ranked:
+            stmt = stmt.order_by(matches.c.rank)  # bm25: меньше - релевантнее
+        return stmt
+
+    if dialect_name == "postgresql":
+        pattern = f"%{query}%"
+        conditions = [getattr(spec.model, name).ilike(pattern) for name in spec.columns]
+        ranks = [func.similarity(getattr(spec.model, name), query) for name in spec.columns]
+
+        if spec.text_columns:
+            tsquery = func.plainto_tsquery(literal_column("'simple'::regconfig"), query)
+            tsvector = _pg_tsvector(spec)
+            conditions.append(tsvector.op("@@")(tsquery))
+            ranks.append(func.ts_rank(tsvector, tsquery))
+
+        stmt = stmt.where(or_(*conditions))
+        if ranked:
+            rank = ranks[0] if len(ranks) == 1 else func.greatest(*ranks)
+            stmt = stmt.order_by(rank.desc())
+        return stmt
+
+    return stmt.where(_ilike_condition(spec, query))
+
+
+def install_search_index(connection: Connection) -> None:
+    """Создать поисковые индексы (идемпотентно) для текущей СУБД"""
+    dialect_name = connection.dialect.name
+
+    if dialect_name == "sqlite":
+        for spec in SEARCH_SPECS:
+            cols = ", ".join(spec.all_columns)
+            new_cols = ", ".join(f"NEW.{name}" for name in spec.all_columns)
+            connection.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {spec.fts_table} "
+                f"USING fts5(entity_id UNINDEXED, {cols}, tokenize='trigram')"
+            ))
+            connection.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {spec.fts_table}_ai AFTER INSERT ON {spec.table_name} BEGIN "
+                f"INSERT INTO {spec.fts_table} (entity_id, {cols}) VALUES (NEW.id, {new_cols}); END"
+            ))
+            connection.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {spec.fts_table}_au AFTER UPDATE OF {cols} ON {spec.table_name} BEGIN "
+                f"DELETE FROM {spec.fts_table} WHERE entity_id = OLD.id; "
+                f"INSERT INTO {spec.fts_table} (entity_id, {cols}) VALUES (NEW.id, {new_cols}); END"
+            ))
+            connection.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {spec.fts_table}_ad AFTER DELETE ON {spec.table_name} BEGIN "
+                f"DELETE FROM {spec.fts_table} WHERE entity_id = OLD.id; END"
+            ))
+            # Заполняем индекс существующими строками
+            connection.execute(text(f"DELETE FROM {spec.fts_table}"))
+            connection.execute(text(
+                f"INSERT INTO {spec.fts_table} (entity_id, {cols}) SELECT id, {cols} FROM {spec.table_name}"
+            ))
+
+    elif dialect_name == "postgresql":
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        for spec in SEARCH_SPECS:
+            for name in spec.columns:
+                connection.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_{spec.table_name}_{name}_trgm "
+                    f"ON {spec.table_name} USING gin ({name} gin_trgm_ops)"
+                ))
+            if spec.text_columns:
+                document = " || ' ' || ".join(f"coalesce({name}, '')" for name in spec.text_columns)
+                connection.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS ix_{spec.table_name}_fts "
+                    f"ON {spec.table_name} USING gin (to_tsvector('simple'::regconfig, {document}))"
+                ))
+
+
+def drop_search_index(connection: Connection) -> None:
+    """Удалить поисковые индексы"""
+    dialect_name = connection.dialect.name
+
+    for spec in SEARCH_SPECS:
+        if dialect_name == "sqlite":
+            for suffix in ("ai", "au", "ad"):
+                connection.execute(text(f"DROP TRIGGER IF EXISTS {spec.fts_table}_{suffix}"))
+            connection.execute(text(f"DROP TABLE IF EXISTS {spec.fts_table}"))
+        elif dialect_name == "postgresql":
+            for name in spec.columns:
+                connection.execute(text(f"DROP INDEX IF EXISTS ix_{spec.table_name}_{name}_trgm"))
+            if spec.text_columns:
+                connection.execute(text(f"DROP INDEX IF EXISTS ix_{spec.table_name}_fts"))
@@ -0,0 +1,88 @@
+"""
+Очередь задач экспорта отчётов
+
+В очереди лежат только id задач - сигнал «есть работа» для воркера.
+Источник истины - таблица report_jobs: потерянный id (Redis недоступен,
+воркер упал) задача не теряет, воркер подберёт её из БД.
+"""
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Optional, Union
+from uuid import UUID
+
+import redis.asyncio as redis
+
+from app.core.config import settings
+
+REPORT_QUEUE_KEY = "reports:queue"
+
+
+class ReportQueue(ABC):
+    """Интерфейс очереди id задач экспорта"""
+
+    @abstractmethod
+    async def push(self, job_id: Union[UUID, str]) -> None:
+        pass
+
+    @abstractmethod
+    async def pop(self, timeout: float) -> Optional[str]:
+        """Следующий id или None, если за timeout секунд ничего не пришло"""
+
+    @abstractmethod
+    async def size(self) -> int:
+        pass
+
+
+class RedisReportQueue(ReportQueue):
+    """Список Redis (LPUSH / BRPOP); для тестов подходит fakeredis.aioredis.FakeRedis"""
+
+    def __init__(self, client: redis.Redis, key: str = REPORT_QUEUE_KEY):
+        self.client = client
+        self.key = key
+
+    async def push(self, job_id: Union[UUID, str]) -> None:
+        await self.client.lpush(self.key, str(job_id))
+
+    async def pop(self, timeout: float) -> Optional[str]:
+        item = await self.client.brpop([self.key], timeout=timeout)
+        if item is None:
+            return None
+        value = item[1]
+        return value.decode() if isinstance(value, bytes) else value
+
+    async def size(self) -> int:
+        return await self.client.llen(self.key)
+
+
+class LocalReportQueue(ReportQueue):
+    """asyncio.Queue в памяти процесса: API и воркер в одном процессе (dev, тесты)"""
+
+    def __init__(self):
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+
+    async def push(self, job_id: Union[UUID, str]) -> None:
+        self._queue.put_nowait(str(job_id))
+
+    async def pop(self, timeout: float) -> Optional[str]:
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def size(self) -> int:
+        return self._queue.qsize()
+
+
+_local_queue: Optional[LocalReportQueue] = None
+
+
+async def get_report_queue() -> ReportQueue:
+    """Очередь по REPORT_QUEUE_BACKEND (redis - общий клиент приложения)"""
+    global _local_queue
+    if settings.REPORT_QUEUE_BACKEND == "local":
+        if _local_queue is None:
+            _local_queue = LocalReportQueue()
+        return _local_queue
+
+    from app.infrastructure.cache.redis_client import get_redis_client
+    return RedisReportQueue(await get_redis_client())
@@ -0,0 +1,326 @@
+"""
+Асинхронный воркер экспорта отчётов
+
+Долгоживущий процесс (scripts/run_report_worker.py) со своим engine и пулом
+соединений: задачи выполняются в одном event loop, до
+REPORT_WORKER_CONCURRENCY одновременно, без нового loop и соединений на
+каждую задачу.
+
+Задача берётся атомарным UPDATE pending -> processing, поэтому несколько
+воркеров (и повторный id в очереди) не выполняют её дважды. Пока задача
+выполняется, воркер обновляет heartbeat_at; задачи с heartbeat старше
+REPORT_JOB_STALE_SECONDS (воркер упал) возвращаются в pending, после
+REPORT_JOB_MAX_ATTEMPTS попыток - failed.
+
+Перед сборкой воркер ищет готовый файл того же отчёта по неизменившимся
+данным (report_cache) и раз в REPORT_CACHE_EVICTION_INTERVAL_SECONDS
+вытесняет старые файлы из REPORTS_PATH.
+"""
+import asyncio
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, AsyncIterator, Optional
+from uuid import UUID, uuid4
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import noload
+
+from app.api.v1.schemas.common import mask_row_phones
+from app.core.config import settings
+from app.core.logging_config import get_logger
+from app.core.security import has_pii_access
+from app.domain.services.report_cache import (
+    evict_reports,
+    find_cached_report,
+    report_fingerprint,
+    store_cached_report,
+)
+from app.domain.services.report_service import (
+    REPORT_TITLES,
+    ReportService,
+    report_columns,
+    report_headers,
+)
+from app.infrastructure.db.models import ReportJob, User
+from app.infrastructure.queues.report_queue import ReportQueue, get_report_queue
+from app.services.excel_exporter import ExcelExporter
+
+logger = get_logger(__name__)
+
+
+async def _masked_phones(batches: AsyncIterator[list[dict[str, Any]]]) -> AsyncIterator[list[dict[str, Any]]]:
+    """Маскирование телефонов - как в /reports/stream"""
+    async for batch in batches:
+        yield mask_row_phones(batch)
+
+
+async def export_report(session: AsyncSession, job: ReportJob) -> tuple[str, Optional[str]]:
+    """Выгрузить задачу в XLSX или взять готовый файл из кэша; возвращает (путь, fingerprint)"""
+    role = await session.scalar(select(User.role).where(User.id == job.owner_id))
+    mask = role is None or not has_pii_access(role.value)
+    fingerprint = await report_fingerprint(session, job, mask) if settings.REPORT_CACHE_ENABLED else None
+    if fingerprint is not None:
+        cached = find_cached_report(job.entity, fingerprint)
+        if cached is not None:
+            logger.info("Report cache hit", job_id=str(job.id), entity=job.entity)
+            return cached, fingerprint
+        filename = f".report_{job.id}.tmp.xlsx"  # Точка - файл не виден кэшу и вытеснению до rename
+    else:
+        filename = f"report_{job.id}_{job.entity}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+
+    # Строки читаются серверным курсором и сразу пишутся в write-only книгу
+    columns = report_columns(job.entity, job.columns)
+    rows = ReportService(session).stream_report(
+        entity=job.entity,
+        filters=job.filters_json,
+        columns=columns,
+        sort=job.sort,
+        batch_size=settings.REPORT_EXPORT_BATCH_SIZE,
+    )
+    try:
+        filepath, _ = await ExcelExporter().export_stream(
+            _masked_phones(rows) if mask else rows,
+            columns=columns,
+            headers=report_headers(job.entity, columns),
+            filename=filename,
+            title=REPORT_TITLES.get(job.entity, job.entity),
+        )
+    except BaseException:
+        if fingerprint is not None:
+            Path(settings.REPORTS_PATH, filename).unlink(missing_ok=True)
+        raise
+
+    if fingerprint is not None:
+        filepath = store_cached_report(filepath, job.entity, fingerprint)
+        # Новый файл мог вывести каталог за бюджет
+        await asyncio.to_thread(evict_reports, keep=filepath)
+    return filepath, fingerprint
+
+
+async def reclaim_stale_jobs(session: AsyncSession) -> int:
+    """Вернуть в pending задачи без heartbeat (исчерпавшие попытки - в failed)"""
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.REPORT_JOB_STALE_SECONDS)
+    stale = (
+        ReportJob.status == "processing",
+        func.coalesce(ReportJob.heartbeat_at, ReportJob.updated_at) < cutoff,
+    )
+
+    await session.execute(
+        update(ReportJob)
+        .where(*stale, ReportJob.attempts >= settings.REPORT_JOB_MAX_ATTEMPTS)
+        .values(
+            status="failed",
+            worker_id=None,
+            error_message=f"Worker lost the job {settings.REPORT_JOB_MAX_ATTEMPTS} times",
+        )
+    )
+    result = await session.execute(
+        update(ReportJob).where(*stale).values(status="pending", worker_id=None)
+    )
+    return result.rowcount or 0
+
+
+class ReportWorker:
+    """Пул корутин, выполняющих задачи экспорта из очереди и БД"""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        queue: ReportQueue,
+        concurrency: Optional[int] = None,
+        worker_id: Optional[str] = None,
+    ):
+        self.session_factory = session_factory
+        self.queue = queue
+        self.concurrency = concurrency or settings.REPORT_WORKER_CONCURRENCY
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:6]}"
+        self.running: set[UUID] = set()
+        self.processed = 0
+        self.failed = 0
+
+    async def run(self) -> None:
+        """Работать до отмены; выполняемые задачи при отмене возвращаются в pending"""
+        logger.info("Report worker started", worker_id=self.worker_id, concurrency=self.concurrency)
+        tasks = [asyncio.create_task(self._consume()) for _ in range(self.concurrency)]
+        tasks.append(asyncio.create_task(self._heartbeat()))
+        if settings.REPORT_CACHE_ENABLED:
+            tasks.append(asyncio.create_task(self._evict()))
+        try:
+            # wait, а не gather: отмена run не должна второй раз отменять корутины,
+            # пока они возвращают задачи в pending
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            logger.info(
+                "Report worker stopped",
+                worker_id=self.worker_id,
+                processed=self.processed,
+                failed=self.failed,
+            )
+
+    async def _consume(self) -> None:
+        """Цикл одной корутины: id из очереди, иначе - старейшая pending-задача из БД"""
+        poll = settings.REPORT_WORKER_POLL_SECONDS
+        backlog = False  # Последний поиск в БД нашёл задачу - ищем следующую без ожидания очереди
+        while True:
+            job_id: Optional[str] = None
+            if not backlog:
+                try:
+                    job_id = await self.queue.pop(poll)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning("Report queue unavailable", error=str(e))
+                    await asyncio.sleep(poll)
+
+            try:
+                claimed = await self.claim(UUID(job_id) if job_id else None)
+                backlog = claimed is not None and job_id is None
+                if claimed is not None:
+                    await self.process(claimed)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Report worker iteration failed", job_id=job_id, error=str(e))
+                backlog = False
+                await asyncio.sleep(poll)
+
+    async def claim(self, job_id: Optional[UUID] = None) -> Optional[UUID]:
+        """Взять задачу (без job_id - старейшую pending); None, если её уже взяли"""
+        async with self.session_factory() as session:
+            if job_id is None:
+                job_id = await session.scalar(
+                    select(ReportJob.id)
+                    .where(ReportJob.status == "pending")
+                    .order_by(ReportJob.created_at)
+                    .limit(1)
+                    .with_for_update(skip_locked=True)
+                )
+                if job_id is None:
+                    return None
+
+            result = await session.execute(
+                update(ReportJob)
+                .where(ReportJob.id == job_id, ReportJob.status == "pending")
+                .values(
+                    status="processing",
+                    worker_id=self.worker_id,
+                    heartbeat_at=datetime.utcnow(),
+                    attempts=ReportJob.attempts + 1,
+                )
+            )
+            await session.commit()
+            return job_id if result.rowcount == 1 else None
+
+    async def process(self, job_id: UUID) -> None:
+        """Выполнить взятую задачу и записать результат"""
+        self.running.add(job_id)
+        started = time.monotonic()
+        try:
+            async with self.session_factory() as session:
+                job = await session.get(ReportJob, job_id, options=[noload(ReportJob.owner)])
+                entity = job.entity
+                filepath, fingerprint = await export_report(session, job)
+            await self._finish(
+                job_id,
+                status="done",
+                file_path=filepath,
+                fingerprint=fingerprint,
+                completed_at=datetime.utcnow(),
+            )
+            self.processed += 1
+            logger.info(
+                "Report job done",
+                job_id=str(job_id),
+                entity=entity,
+                duration_ms=round((time.monotonic() - started) * 1000),
+            )
+        except asyncio.CancelledError:
+            # Остановка воркера: задача не провалена - отдаём её другому воркеру
+            await self._finish(job_id, status="pending", worker_id=None, attempts=ReportJob.attempts - 1)
+            try:
+                await self.queue.push(job_id)
+            except Exception:
+                pass  # Подберут из БД
+            raise
+        except Exception as e:
+            self.failed += 1
+            logger.error("Report job failed", job_id=str(job_id), error=str(e))
+            await self._finish(job_id, status="failed", error_message=str(e))
+        finally:
+            self.running.discard(job_id)
+
+    async def _finish(self, job_id: UUID, **values) -> None:
+        """Обновить задачу, если она всё ещё за этим воркером (не отобрана как брошенная)"""
+        async with self.session_factory() as session:
+            await session.execute(
+                update(ReportJob)
+                .where(
+                    ReportJob.id == job_id,
+                    ReportJob.status == "processing",
+                    ReportJob.worker_id == self.worker_id,
+                )
+                .values(**values)
+            )
+            await session.commit()
+
+    async def _heartbeat(self) -> None:
+        """heartbeat_at выполняемых задач одним UPDATE, затем возврат брошенных задач"""
+        while True:
+            await asyncio.sleep(settings.REPORT_WORKER_HEARTBEAT_SECONDS)
+            try:
+                async with self.session_factory() as session:
+                    if self.running:
+                        await session.execute(
+                            update(ReportJob)
+                            .where(ReportJob.id.in_(list(self.running)), ReportJob.worker_id == self.worker_id)
+                            .values(heartbeat_at=datetime.utcnow())
+                        )
+                    reclaimed = await reclaim_stale_jobs(session)
+                    await session.commit()
+                if reclaimed:
+                    logger.warning("Reclaimed stale report jobs", count=reclaimed)
+                logger.debug(
+                    "Report worker heartbeat",
+                    worker_id=self.worker_id,
+                    running=len(self.running),
+                    processed=self.processed,
+                    failed=self.failed,
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Report worker heartbeat failed", error=str(e))
+
+
+    async def _evict(self) -> None:
+        """Вытеснение файлов отчётов по TTL и бюджету диска"""
+        while True:
+            try:
+                await asyncio.to_thread(evict_reports)
+            except Exception as e:
+                logger.error("Report files eviction failed", error=str(e))
+            await asyncio.sleep(settings.REPORT_CACHE_EVICTION_INTERVAL_SECONDS)
+
+
+async def run_report_worker(concurrency: Optional[int] = None) -> None:
+    """Воркер со своим engine (пул на concurrency + heartbeat); работает до отмены"""
+    concurrency = concurrency or settings.REPORT_WORKER_CONCURRENCY
+    engine_options = {}
+    if not settings.DATABASE_URL.startswith("sqlite"):
+        engine_options["pool_size"] = concurrency + 1
+    # echo выключен: лог каждого запроса воркера съедает пропускную способность
+    engine = create_async_engine(settings.DATABASE_URL, echo=False, **engine_options)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
+
+    try:
+        worker = ReportWorker(session_factory, await get_report_queue(), concurrency=concurrency)
+        await worker.run()
+    finally:
+        await engine.dispose()
@@ -1,6 +1,8 @@
 """
 FastAPI приложение - точка входа
 """
+import asyncio
+import contextlib
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -14,6 +16,7 @@ from app.api.health import router as health_router
 from app.middlewares.logging import LoggingMiddleware
 from app.middlewares.request_id import RequestIDMiddleware
 from app.middlewares.audit import AuditMiddleware
+from app.middlewares.decompression import DecompressionMiddleware
 
 # Инициализация логирования
 setup_logging(log_level=settings.LOG_LEVEL, log_file="logs/app.log")
@@ -34,9 +37,47 @@ async def lifespan(app: FastAPI):
         # Redis не доступен - продолжаем без него
         pass
     
+    # Фоновые циклы обслуживания в процессе API (dev; в проде - один
+    # процесс scripts/run_background_jobs.py на развёртывание)
+    
+    # Перенос outbox аудита в audit_logs
+    drainer_task = None
+    if settings.AUDIT_OUTBOX_DRAINER_ENABLED:
+        from app.domain.services.audit_service import run_outbox_drainer
+        drainer_task = asyncio.create_task(run_outbox_drainer())
+    
+    # Компакция журнала изменений офлайн-синхронизации
+    compaction_task = None
+    if settings.SYNC_COMPACTION_ENABLED:
+        from app.domain.services.sync_service import run_change_log_compaction
+        compaction_task = asyncio.create_task(run_change_log_compaction())
+    
+    # Компакция токенов офлайн-синхронизации
+    token_compaction_task = None
+    if settings.SYNC_TOKEN_COMPACTION_ENABLED:
+        from app.domain.services.sync_service import run_sync_token_compaction
+        token_compaction_task = asyncio.create_task(run_sync_token_compaction())
+    
+    # Снимки территорий для начальной синхронизации
+    snapshot_task = None
+    if settings.SYNC_SNAPSHOT_ENABLED:
+        from app.domain.services.sync_snapshot_service import run_snapshot_builder
+        snapshot_task = asyncio.create_task(run_snapshot_builder())
+    
+    # Воркер отчётов в процессе API (dev; в проде - scripts/run_report_worker.py)
+    report_worker_task = None
+    if settings.REPORT_WORKER_IN_PROCESS:
+        from app.infrastructure.queues.report_worker import run_report_worker
+        report_worker_task = asyncio.create_task(run_report_worker())
+    
     yield
     
     # Shutdown
+    for task in (drainer_task, compaction_task, token_compaction_task, snapshot_task, report_worker_task):
+        if task:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
     await engine.dispose()
     try:
         redis_client = await get_redis_client()
@@ -64,6 +105,7 @@ app.add_middleware(
 )
 
 # Middlewares
+app.add_middleware(DecompressionMiddleware)  # Сжатые тела запросов (офлайн-пуши)
 app.add_middleware(RequestIDMiddleware)
 app.add_middleware(LoggingMiddleware)
 app.add_middleware(AuditMiddleware)  # Аудит после логирования
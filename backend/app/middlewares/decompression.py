@@ -0,0 +1,64 @@
+"""
+Middleware распаковки сжатых тел запросов (Content-Encoding: gzip/deflate/zstd)
+
+Чистый ASGI: тело распаковывается по мере чтения, без буферизации
+сжатого запроса целиком. Размер распакованного тела ограничен
+MAX_DECOMPRESSED_BODY_MB (защита от zip-бомб).
+"""
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.compression import Decompressor, supported_encodings
+from app.core.config import settings
+
+
+class DecompressionMiddleware:
+    """Распаковывает тело запроса и убирает Content-Encoding/Content-Length"""
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        headers = dict(scope["headers"])
+        encoding = headers.get(b"content-encoding", b"").decode("latin-1").strip().lower()
+        if not encoding or encoding == "identity":
+            await self.app(scope, receive, send)
+            return
+        
+        if encoding not in supported_encodings():
+            response = JSONResponse(
+                status_code=415,
+                content={"detail": f"Unsupported Content-Encoding: {encoding}"},
+            )
+            await response(scope, receive, send)
+            return
+        
+        decompressor = Decompressor(encoding, settings.max_decompressed_body_bytes)
+        
+        async def receive_decompressed() -> Message:
+            message = await receive()
+            if message["type"] != "http.request":
+                return message
+            more_body = message.get("more_body", False)
+            try:
+                body = decompressor.decompress(message.get("body", b""))
+                if not more_body:
+                    body += decompressor.flush()
+            except OverflowError:
+                raise HTTPException(status_code=413, detail="Decompressed body too large")
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Malformed compressed body")
+            return {"type": "http.request", "body": body, "more_body": more_body}
+        
+        scope = dict(scope)
+        scope["headers"] = [
+            (name, value)
+            for name, value in scope["headers"]
+            if name not in (b"content-encoding", b"content-length")
+        ]
+        await self.app(scope, receive_decompressed, send)
@@ -1,14 +1,41 @@
 """
 Сервис экспорта данных в XLSX через openpyxl
+
+export_stream пишет книгу в write-only режиме: строки сразу уходят во
+временный XML листа, в памяти - только текущая пачка. Ширина колонок
+оценивается по первым WIDTH_SAMPLE_ROWS строкам (в write-only её нужно
+задать до первой строки), лист переполняется на следующий по лимиту Excel.
 """
-from typing import Any
+import asyncio
+import enum
+from typing import Any, AsyncIterator, Optional
+from uuid import UUID
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.utils import get_column_letter
 from datetime import datetime
 import os
 
 from app.core.config import settings
 
+MAX_SHEET_ROWS = 1_048_576  # Лимит строк листа Excel (с заголовком)
+WIDTH_SAMPLE_ROWS = 1000
+MAX_COLUMN_WIDTH = 50
+
+
+def _cell_value(value: Any) -> Any:
+    """Значение ячейки: типы, которых openpyxl не знает, - строкой"""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(item) for item in value)
+    if isinstance(value, dict):
+        return str(value)
+    return value
+
 
 class ExcelExporter:
     """Экспортёр данных в XLSX"""
@@ -69,3 +96,75 @@ class ExcelExporter:
         wb.save(filepath)
         return filepath
 
+    @staticmethod
+    async def export_stream(
+        batches: AsyncIterator[list[dict[str, Any]]],
+        columns: list[str],
+        headers: list[str],
+        filename: str,
+        title: str = "Отчёт",
+    ) -> tuple[str, int]:
+        """
+        Экспорт потока пачек строк в XLSX (write-only); возвращает (путь, число строк)
+
+        Запись ячеек и сохранение идут в потоке, чтобы не держать event loop.
+        """
+        wb = Workbook(write_only=True)
+        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+        header_font = Font(bold=True, color="FFFFFF")
+        state: dict[str, Any] = {"sheet": None, "sheet_rows": 0, "sheets": 0, "widths": None}
+
+        def new_sheet() -> None:
+            state["sheets"] += 1
+            ws = wb.create_sheet(title if state["sheets"] == 1 else f"{title} ({state['sheets']})")
+            for index, width in enumerate(state["widths"], start=1):
+                ws.column_dimensions[get_column_letter(index)].width = width
+            header_cells = []
+            for header in headers:
+                cell = WriteOnlyCell(ws, value=header)
+                cell.fill = header_fill
+                cell.font = header_font
+                cell.alignment = Alignment(horizontal="center")
+                header_cells.append(cell)
+            ws.append(header_cells)
+            state["sheet"] = ws
+            state["sheet_rows"] = 1
+
+        def write(rows: list[dict[str, Any]]) -> None:
+            for row in rows:
+                if state["sheet"] is None or state["sheet_rows"] >= MAX_SHEET_ROWS:
+                    new_sheet()
+                state["sheet"].append([_cell_value(row.get(name)) for name in columns])
+                state["sheet_rows"] += 1
+
+        def estimate_widths(sample: list[dict[str, Any]]) -> list[int]:
+            widths = []
+            for name, header in zip(columns, headers):
+                longest = max(
+                    [len(header)] + [len(str(_cell_value(row.get(name)) or "")) for row in sample]
+                )
+                widths.append(min(longest + 2, MAX_COLUMN_WIDTH))
+            return widths
+
+        # Пачки до WIDTH_SAMPLE_ROWS копятся для оценки ширины, дальше пишутся сразу
+        sample: Optional[list[dict[str, Any]]] = []
+        total = 0
+        async for rows in batches:
+            total += len(rows)
+            if sample is not None:
+                sample.extend(rows)
+                if len(sample) < WIDTH_SAMPLE_ROWS:
+                    continue
+                state["widths"] = estimate_widths(sample[:WIDTH_SAMPLE_ROWS])
+                rows, sample = sample, None
+            await asyncio.to_thread(write, rows)
+        if sample is not None:
+            state["widths"] = estimate_widths(sample)
+            await asyncio.to_thread(write, sample)
+        if state["sheet"] is None:
+            new_sheet()  # Пустой отчёт - только заголовки
+
+        filepath = os.path.join(settings.REPORTS_PATH, filename)
+        os.makedirs(settings.REPORTS_PATH, exist_ok=True)
+        await asyncio.to_thread(wb.save, filepath)
+        return filepath, total
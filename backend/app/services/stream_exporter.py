@@ -0,0 +1,55 @@
+"""
+Потоковый экспорт строк отчёта в CSV и NDJSON
+
+Пачка строк (ReportService.stream_report) сериализуется и отдаётся сразу,
+без временного файла: первая строка (заголовок CSV) уходит до первого
+чтения из БД.
+"""
+import csv
+import enum
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator
+from uuid import UUID
+
+import pydantic_core
+
+CSV_MEDIA_TYPE = "text/csv; charset=utf-8"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _csv_value(value: Any) -> Any:
+    """Значение ячейки CSV: как в XLSX (списки - через запятую)"""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(item) for item in value)
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+async def csv_stream(batches: AsyncIterator[list[dict[str, Any]]], columns: list[str]) -> AsyncIterator[bytes]:
+    """CSV: заголовок с именами колонок, затем строка на запись"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    yield buffer.getvalue().encode()
+    async for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_value(row.get(name)) for name in columns] for row in rows)
+        yield buffer.getvalue().encode()
+
+
+async def ndjson_stream(batches: AsyncIterator[list[dict[str, Any]]], columns: list[str]) -> AsyncIterator[bytes]:
+    """NDJSON: объект на запись (UUID, enum, datetime - в JSON-виде)"""
+    async for rows in batches:
+        yield b"".join(
+            pydantic_core.to_json({name: row.get(name) for name in columns}) + b"\n" for row in rows
+        )
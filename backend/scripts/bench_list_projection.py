@@ -0,0 +1,145 @@
+"""
+Бенчмарк чтения списка объектов: ORM-сущности против Core-проекции.
+Запускается так:
+    python scripts/bench_list_projection.py [--rows 5000] [--limit 100] [--iterations 200]
+
+Каждый прогон повторяет путь запроса GET /api/v1/objects/ (без HTTP и авторизации):
+выборка страницы из репозитория, сборка ответа и сериализация через response_model.
+Используется временная SQLite-база, рабочая БД не затрагивается.
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Union
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+# Делаем backend корнем Python-пути
+BACKEND_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_ROOT))
+
+from app.api.v1.schemas.objects import ObjectOut  # type: ignore  # pylint: disable=wrong-import-position
+from app.infrastructure.db.filtering import ObjectFilterParams  # type: ignore  # pylint: disable=wrong-import-position
+from app.core.pagination import (  # type: ignore  # pylint: disable=wrong-import-position
+    CountStrategy, CursorResponse, PageParams, PageResponse,
+)
+from app.infrastructure.db.base import Base  # type: ignore  # pylint: disable=wrong-import-position
+from app.infrastructure.db.models import (  # type: ignore  # pylint: disable=wrong-import-position
+    City, District, Object, ObjectStatus, ObjectType, User, UserRole,
+)
+from app.infrastructure.db.repositories.base import LoadProfile  # type: ignore  # pylint: disable=wrong-import-position
+from app.infrastructure.db.repositories.object_repository import ObjectRepository  # type: ignore  # pylint: disable=wrong-import-position
+
+OUT_COLUMNS = tuple(ObjectOut.model_fields)
+RESPONSE_FIELD = create_model_field(
+    name="Response_list_objects",
+    type_=Union[PageResponse[ObjectOut], CursorResponse[ObjectOut]],
+    mode="serialization",
+)
+
+
+async def seed(Session, rows: int) -> None:
+    """Заполнить временную БД объектами"""
+    async with Session() as session:
+        city = City(name="Бенчмарк")
+        session.add(city)
+        await session.flush()
+        district = District(city_id=city.id, name="Центральный")
+        user = User(
+            email="bench@example.com",
+            hashed_password="-",
+            full_name="Бенчмарк",
+            role=UserRole.SUPERVISOR,
+            city_id=city.id,
+        )
+        session.add_all([district, user])
+        await session.flush()
+
+        statuses = list(ObjectStatus)
+        session.add_all([
+            Object(
+                type=ObjectType.MKD,
+                address=f"ул. Тестовая, д. {i}",
+                city_id=city.id,
+                district_id=district.id,
+                status=statuses[i % len(statuses)],
+                tags=["bench", f"tag{i % 7}"],
+                responsible_user_id=user.id if i % 2 else None,
+                contact_name=f"Контакт {i}",
+                contact_phone="+79990000000",
+                created_by=user.id,
+            )
+            for i in range(rows)
+        ])
+        await session.commit()
+
+
+async def render(content) -> bytes:
+    """Сериализация ответа так же, как это делает FastAPI для response_model"""
+    serialized = await serialize_response(field=RESPONSE_FIELD, response_content=content)
+    return JSONResponse(serialized).body
+
+
+async def orm_page(Session, params: PageParams, profile) -> int:
+    async with Session() as session:
+        items, total = await ObjectRepository(session).find_by_filters(
+            ObjectFilterParams(), limit=params.fetch_limit, count=params.count, profile=profile,
+        )
+        response = PageResponse.build([ObjectOut.model_validate(item) for item in items], params, total)
+        await render(response)
+        return len(response.items)
+
+
+async def projection_page(Session, params: PageParams) -> int:
+    async with Session() as session:
+        items, total = await ObjectRepository(session).find_by_filters(
+            ObjectFilterParams(), limit=params.fetch_limit, count=params.count, columns=OUT_COLUMNS,
+        )
+        response = PageResponse.payload(items, params, total)
+        await render(response)
+        return len(response["items"])
+
+
+async def measure(name: str, run, iterations: int) -> float:
+    await run()  # Прогрев
+    returned = 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        returned += await run()
+    elapsed = time.perf_counter() - started
+    rate = returned / elapsed
+    print(f"  {name:<22} {rate:>10.0f} строк/с  ({elapsed / iterations * 1000:.2f} мс/страница)")
+    return rate
+
+
+async def main(rows: int, limit: int, iterations: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/bench.db", echo=False)
+        Session = async_sessionmaker(engine, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await seed(Session, rows)
+
+        params = PageParams(page=1, limit=limit, count=CountStrategy.NONE)
+        print(f"[BENCH] objects: {rows} строк в БД, страница {limit}, {iterations} итераций")
+        before = await measure("ORM (selectin)", lambda: orm_page(Session, params, None), iterations)
+        await measure("ORM (LoadProfile.LEAN)", lambda: orm_page(Session, params, LoadProfile.LEAN), iterations)
+        after = await measure("Core-проекция", lambda: projection_page(Session, params), iterations)
+        print(f"[OK] Ускорение проекции относительно ORM (selectin): x{after / before:.2f}")
+
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000, help="Строк в тестовой таблице")
+    parser.add_argument("--limit", type=int, default=100, help="Размер страницы")
+    parser.add_argument("--iterations", type=int, default=200, help="Число запросов страницы")
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.limit, args.iterations))
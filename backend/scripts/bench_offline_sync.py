@@ -0,0 +1,308 @@
+"""
+Нагрузочный симулятор офлайн-синхронизации.
+Запускается так:
+    python scripts/bench_offline_sync.py [--engineers 20] [--territories 4] [--batches 5] [--batch-size 50]
+        [--stale-ratio 0.1] [--replay-ratio 0.1] [--scenario all] [--seed 42] [--database-url URL]
+
+N инженеров с офлайн-очередями параллельно отправляют POST /api/v1/sync/batch и
+забирают GET /api/v1/sync/changes. Приложение работает в процессе (httpx ASGITransport),
+по умолчанию на временной SQLite-базе с засеянными городами, районами и объектами;
+рабочая БД не затрагивается. --database-url позволяет прогнать то же на пустой Postgres.
+
+Сценарии:
+    push  - только отправка очередей (создания и обновления своих записей)
+    pull  - только чтение ленты: первая синхронизация (since) и дочитывание по cursor
+    mixed - отправка и чтение одновременно
+
+Устаревшая версия (--stale-ratio) имитирует устройство, пропустившее pull, - сервер
+отвечает conflict; повтор пачки (--replay-ratio) - переотправку после обрыва связи.
+По сценарию выводятся пропускная способность, p50/p95/p99 задержки по эндпоинтам,
+доли статусов элементов (в т.ч. conflict) и число SQL-запросов на запрос.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+# Делаем backend корнем Python-пути
+BACKEND_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_ROOT))
+
+SCENARIOS = ("push", "pull", "mixed")
+EPOCH = "2000-01-01T00:00:00"
+
+
+@dataclass
+class Stats:
+    """Замеры одного сценария"""
+    latencies: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    statuses: Counter = field(default_factory=Counter)
+    http_errors: Counter = field(default_factory=Counter)
+    error_messages: Counter = field(default_factory=Counter)
+    pulled_items: int = 0
+    pulled_bytes: int = 0
+    queries: int = 0
+
+    def record(self, endpoint: str, started: float) -> None:
+        self.latencies[endpoint].append((time.perf_counter() - started) * 1000)
+
+
+@dataclass
+class Device:
+    """Устройство инженера: токен, курсор ленты и известные версии своих записей"""
+    user_id: uuid.UUID
+    headers: dict[str, str]
+    object_ids: list[uuid.UUID]
+    cursor: Optional[str] = None
+    versions: dict[uuid.UUID, int] = field(default_factory=dict)  # client_generated_id -> версия
+    payloads: dict[uuid.UUID, dict[str, Any]] = field(default_factory=dict)
+    last_batch: Optional[list[dict[str, Any]]] = None
+
+
+def percentile(values: list[float], share: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(share * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def seed(Session, engineers: int, territories: int, objects_per_territory: int) -> list[tuple]:
+    """Города/районы, инженеры и объекты их территорий; возвращает (user_id, object_ids) инженеров"""
+    from app.infrastructure.db.models import City, District, Object, ObjectType, User, UserRole
+
+    async with Session() as session:
+        city = City(name="Нагрузка")
+        session.add(city)
+        await session.flush()
+        districts = [District(city_id=city.id, name=f"Район {i}") for i in range(territories)]
+        session.add_all(districts)
+        await session.flush()
+
+        author = User(email="bench-admin@example.com", hashed_password="-", full_name="Бенчмарк", role=UserRole.ADMIN)
+        session.add(author)
+        await session.flush()
+
+        territory_objects = []
+        for district in districts:
+            objects = [
+                Object(
+                    type=ObjectType.MKD,
+                    address=f"ул. Нагрузочная, д. {i}",
+                    city_id=city.id,
+                    district_id=district.id,
+                    created_by=author.id,
+                )
+                for i in range(objects_per_territory)
+            ]
+            session.add_all(objects)
+            territory_objects.append(objects)
+        await session.flush()
+
+        users = []
+        for i in range(engineers):
+            district = districts[i % territories]
+            user = User(
+                email=f"engineer{i}@example.com",
+                hashed_password="-",
+                full_name=f"Инженер {i}",
+                role=UserRole.ENGINEER,
+                city_id=city.id,
+                district_id=district.id,
+            )
+            session.add(user)
+            users.append((user, [obj.id for obj in territory_objects[i % territories]]))
+        await session.commit()
+        return [(user.id, object_ids) for user, object_ids in users]
+
+
+def build_batch(device: Device, size: int, stale_ratio: float, rng: random.Random) -> list[dict[str, Any]]:
+    """Очередь устройства: половина - обновления своих визитов, остальное - новые визиты"""
+    items = []
+    known = list(device.versions)
+    updates = min(len(known), size // 2)
+    for client_id in rng.sample(known, updates):
+        version = device.versions[client_id]
+        if rng.random() < stale_ratio:
+            # Устройство не видело последнего изменения (или отстало от сервера)
+            version = version - 1 if version > 1 else version + 1
+        payload = dict(device.payloads[client_id], outcome_text=f"правка {rng.random():.6f}")
+        items.append({
+            "client_generated_id": str(client_id),
+            "table_name": "visits",
+            "payload": payload,
+            "updated_at": "2025-01-01T00:00:00Z",
+            "version": version,
+        })
+    for _ in range(size - updates):
+        client_id = uuid.uuid4()
+        payload = {
+            "object_id": str(rng.choice(device.object_ids)),
+            "engineer_id": str(device.user_id),
+            "outcome_text": "новый визит",
+        }
+        device.payloads[client_id] = payload
+        items.append({
+            "client_generated_id": str(client_id),
+            "table_name": "visits",
+            "payload": payload,
+            "updated_at": "2025-01-01T00:00:00Z",
+        })
+    return items
+
+
+async def push(client, device: Device, items: list[dict[str, Any]], stats: Stats) -> None:
+    started = time.perf_counter()
+    response = await client.post("/api/v1/sync/batch", json={"items": items}, headers=device.headers)
+    stats.record("POST /sync/batch", started)
+    if response.status_code != 200:
+        stats.http_errors[response.status_code] += 1
+        return
+    for item, result in zip(items, response.json()["results"]):
+        stats.statuses[result["status"]] += 1
+        if result["status"] == "error":
+            stats.error_messages[(result.get("error_message") or "")[:80]] += 1
+        client_id = uuid.UUID(item["client_generated_id"])
+        if result["status"] in ("created", "updated"):
+            device.versions[client_id] = device.versions.get(client_id, 0) + 1
+        elif result["status"] in ("conflict", "unchanged") and result.get("server_version"):
+            device.versions[client_id] = result["server_version"]  # Клиент принимает серверную версию
+    device.last_batch = items
+
+
+async def pull(client, device: Device, stats: Stats, limit: int) -> None:
+    """Дочитать ленту до конца: первая синхронизация по since, дальше - по cursor"""
+    while True:
+        params = {"tables": "objects,visits,customers", "limit": limit, "delta": "true"}
+        if device.cursor:
+            params["cursor"] = device.cursor
+        else:
+            params["since"] = EPOCH
+        started = time.perf_counter()
+        response = await client.get("/api/v1/sync/changes", params=params, headers=device.headers)
+        stats.record("GET /sync/changes", started)
+        if response.status_code != 200:
+            stats.http_errors[response.status_code] += 1
+            return
+        body = response.json()
+        stats.pulled_items += len(body["items"])
+        stats.pulled_bytes += len(response.content)
+        device.cursor = body["next_cursor"]
+        if not body["has_more"]:
+            return
+
+
+async def run_device(client, device: Device, scenario: str, args, stats: Stats, rng: random.Random) -> None:
+    for _ in range(args.batches):
+        if scenario in ("push", "mixed"):
+            if device.last_batch and rng.random() < args.replay_ratio:
+                await push(client, device, device.last_batch, stats)  # Повтор после обрыва связи
+            await push(client, device, build_batch(device, args.batch_size, args.stale_ratio, rng), stats)
+        if scenario in ("pull", "mixed"):
+            await pull(client, device, stats, args.pull_limit)
+
+
+def report(scenario: str, stats: Stats, elapsed: float) -> None:
+    requests = sum(len(values) for values in stats.latencies.values())
+    items = sum(stats.statuses.values())
+    print(f"\n[{scenario}] {requests} запросов за {elapsed:.2f} с: {requests / elapsed:.1f} запр/с", end="")
+    if items:
+        print(f", {items / elapsed:.0f} элементов/с", end="")
+    print()
+    for endpoint, values in sorted(stats.latencies.items()):
+        print(
+            f"  {endpoint:<20} n={len(values):<5} p50={percentile(values, 0.50):7.1f} мс"
+            f"  p95={percentile(values, 0.95):7.1f} мс  p99={percentile(values, 0.99):7.1f} мс"
+        )
+    if items:
+        shares = ", ".join(f"{status} {count / items:.1%}" for status, count in stats.statuses.most_common())
+        print(f"  элементы: {items} ({shares})")
+    for message, count in stats.error_messages.most_common(3):
+        print(f"    error x{count}: {message}")
+    if stats.pulled_items:
+        print(f"  лента: {stats.pulled_items} изменений, {stats.pulled_bytes / 1024:.0f} КиБ")
+    if stats.http_errors:
+        print(f"  HTTP-ошибки: {dict(stats.http_errors)}")
+    if requests:
+        print(f"  SQL: {stats.queries} запросов, {stats.queries / requests:.1f} на HTTP-запрос")
+
+
+async def main(args) -> None:
+    import httpx
+    from sqlalchemy import event
+
+    from app.core.security import create_access_token
+    from app.infrastructure.db.base import AsyncSessionLocal, Base, engine
+    from app.infrastructure.db.change_log import install_change_log_triggers
+    from app.infrastructure.db.search import install_search_index
+    from app.main import app
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(install_search_index)
+        await conn.run_sync(install_change_log_triggers)
+    users = await seed(AsyncSessionLocal, args.engineers, args.territories, args.objects)
+
+    current: dict[str, Optional[Stats]] = {"stats": None}
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_query(*_):
+        if current["stats"] is not None:
+            current["stats"].queries += 1
+
+    rng = random.Random(args.seed)
+    devices = [
+        Device(user_id=user_id, headers={"Authorization": "Bearer " + create_access_token({"sub": str(user_id)})}, object_ids=object_ids)
+        for user_id, object_ids in users
+    ]
+    print(
+        f"[BENCH] {args.engineers} инженеров, {args.territories} территорий по {args.objects} объектов, "
+        f"{args.batches} пачек по {args.batch_size} элементов, stale={args.stale_ratio}, replay={args.replay_ratio}"
+    )
+
+    scenarios = SCENARIOS if args.scenario == "all" else (args.scenario,)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for scenario in scenarios:
+            stats = Stats()
+            current["stats"] = stats
+            started = time.perf_counter()
+            await asyncio.gather(*(
+                run_device(client, device, scenario, args, stats, random.Random(rng.random()))
+                for device in devices
+            ))
+            current["stats"] = None
+            report(scenario, stats, time.perf_counter() - started)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engineers", type=int, default=20, help="Число устройств (инженеров)")
+    parser.add_argument("--territories", type=int, default=4, help="Число районов")
+    parser.add_argument("--objects", type=int, default=200, help="Объектов на район")
+    parser.add_argument("--batches", type=int, default=5, help="Циклов push/pull на устройство")
+    parser.add_argument("--batch-size", type=int, default=50, help="Элементов в пачке /sync/batch")
+    parser.add_argument("--pull-limit", type=int, default=1000, help="limit страницы /sync/changes")
+    parser.add_argument("--stale-ratio", type=float, default=0.1, help="Доля обновлений с устаревшей версией")
+    parser.add_argument("--replay-ratio", type=float, default=0.1, help="Вероятность повтора предыдущей пачки")
+    parser.add_argument("--scenario", choices=SCENARIOS + ("all",), default="all")
+    parser.add_argument("--seed", type=int, default=42, help="Seed генератора (воспроизводимость очередей)")
+    parser.add_argument("--database-url", help="Пустая БД для прогона (по умолчанию - временная SQLite)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Настройки приложения читаются при импорте - окружение готовим до него
+        os.environ["DATABASE_URL"] = args.database_url or f"sqlite+aiosqlite:///{tmp}/bench_sync.db"
+        os.environ.setdefault("JWT_SECRET", uuid.uuid4().hex + uuid.uuid4().hex)
+        os.environ["RATE_LIMIT_ENABLED"] = "false"
+        os.environ["DEBUG"] = "false"
+        os.environ.setdefault("LOG_LEVEL", "ERROR")
+        asyncio.run(main(args))
@@ -19,6 +19,8 @@ from app.core.config import settings  # type: ignore  # pylint: disable=wrong-im
 from app.core.security import get_password_hash  # type: ignore  # pylint: disable=wrong-import-position
 from app.infrastructure.db.base import Base  # type: ignore  # pylint: disable=wrong-import-position
 from app.infrastructure.db.models import User, UserRole  # type: ignore  # pylint: disable=wrong-import-position
+from app.infrastructure.db.search import install_search_index  # type: ignore  # pylint: disable=wrong-import-position
+from app.infrastructure.db.change_log import install_change_log_triggers  # type: ignore  # pylint: disable=wrong-import-position
 
 
 async def ensure_schema(engine) -> None:
@@ -30,6 +32,8 @@ async def ensure_schema(engine) -> None:
 
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(install_search_index)
+        await conn.run_sync(install_change_log_triggers)
 
 
 async def create_admin(email: str, password: str, full_name: str) -> None:
@@ -0,0 +1,66 @@
+"""
+Фоновые циклы обслуживания: перенос outbox аудита, компакция журнала
+изменений и sync_tokens, сборка снимков территорий.
+Запускается так (один процесс на развёртывание):
+    python scripts/run_background_jobs.py [--jobs outbox compaction tokens snapshots]
+
+В процессах API эти циклы по умолчанию выключены: с N воркерами uvicorn
+каждый повторял бы ту же работу, а снимки собирались бы в локальные каталоги.
+Работает до SIGTERM/SIGINT.
+"""
+import argparse
+import asyncio
+import contextlib
+import signal
+import sys
+from pathlib import Path
+
+# Делаем backend корнем Python-пути
+BACKEND_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_ROOT))
+
+# Импорты проекта идут после настройки пути
+from app.core.config import settings  # type: ignore  # pylint: disable=wrong-import-position
+from app.core.logging_config import setup_logging  # type: ignore  # pylint: disable=wrong-import-position
+from app.domain.services.audit_service import run_outbox_drainer  # type: ignore  # pylint: disable=wrong-import-position
+from app.domain.services.sync_service import (  # type: ignore  # pylint: disable=wrong-import-position
+    run_change_log_compaction,
+    run_sync_token_compaction,
+)
+from app.domain.services.sync_snapshot_service import run_snapshot_builder  # type: ignore  # pylint: disable=wrong-import-position
+from app.infrastructure.cache.redis_client import close_redis_client  # type: ignore  # pylint: disable=wrong-import-position
+from app.infrastructure.db.base import engine  # type: ignore  # pylint: disable=wrong-import-position
+
+JOBS = {
+    "outbox": run_outbox_drainer,
+    "compaction": run_change_log_compaction,
+    "tokens": run_sync_token_compaction,
+    "snapshots": run_snapshot_builder,
+}
+
+
+async def main(jobs: list[str]) -> None:
+    tasks = [asyncio.create_task(JOBS[name]()) for name in jobs]
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, lambda: [task.cancel() for task in tasks])
+    try:
+        await asyncio.gather(*tasks)
+    except asyncio.CancelledError:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        await engine.dispose()
+        await close_redis_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Фоновые циклы обслуживания")
+    parser.add_argument("--jobs", nargs="+", choices=list(JOBS), default=list(JOBS))
+    args = parser.parse_args()
+
+    setup_logging(log_level=settings.LOG_LEVEL, log_file="logs/background_jobs.log")
+    asyncio.run(main(args.jobs))
@@ -0,0 +1,45 @@
+"""
+Воркер экспорта отчётов.
+Запускается так:
+    python scripts/run_report_worker.py [--concurrency N]
+
+Работает до SIGTERM/SIGINT; выполняемые в этот момент задачи возвращаются
+в pending и достаются другому воркеру.
+"""
+import argparse
+import asyncio
+import signal
+import sys
+from pathlib import Path
+
+# Делаем backend корнем Python-пути
+BACKEND_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_ROOT))
+
+# Импорты проекта идут после настройки пути
+from app.core.config import settings  # type: ignore  # pylint: disable=wrong-import-position
+from app.core.logging_config import setup_logging  # type: ignore  # pylint: disable=wrong-import-position
+from app.infrastructure.cache.redis_client import close_redis_client  # type: ignore  # pylint: disable=wrong-import-position
+from app.infrastructure.queues.report_worker import run_report_worker  # type: ignore  # pylint: disable=wrong-import-position
+
+
+async def main(concurrency: int) -> None:
+    task = asyncio.create_task(run_report_worker(concurrency))
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, task.cancel)
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await close_redis_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Воркер экспорта отчётов")
+    parser.add_argument("--concurrency", type=int, default=settings.REPORT_WORKER_CONCURRENCY)
+    args = parser.parse_args()
+
+    setup_logging(log_level=settings.LOG_LEVEL, log_file="logs/report_worker.log")
+    asyncio.run(main(args.concurrency))
@@ -0,0 +1,77 @@
+"""
+Тесты эндпойнтов аналитики
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.infrastructure.db.models import City, Object, ObjectStatus, ObjectType, Visit, VisitStatus
+from tests.conftest import auth_headers
+
+ANALYTICS_URL = "/api/v1/analytics"
+
+
+@pytest.fixture
+async def seeded(db, city, engineer):
+    """Два города: объекты в разных статусах и визиты внутри и вне месяца"""
+    other_city = City(name="Другой город")
+    db.add(other_city)
+    await db.flush()
+    
+    statuses = [
+        (city, ObjectStatus.INTEREST),
+        (city, ObjectStatus.INTEREST),
+        (city, ObjectStatus.NEW),
+        (other_city, ObjectStatus.INTEREST),
+    ]
+    objects = [
+        Object(type=ObjectType.MKD, address=f"ул. Аналитическая {i}", city_id=owner.id, status=status, created_by=engineer.id)
+        for i, (owner, status) in enumerate(statuses)
+    ]
+    db.add_all(objects)
+    await db.flush()
+    
+    now = datetime.utcnow()
+    for days_ago, status in ((1, VisitStatus.DONE), (2, VisitStatus.PLANNED), (3, VisitStatus.DONE), (60, VisitStatus.DONE)):
+        db.add(Visit(
+            object_id=objects[0].id,
+            engineer_id=engineer.id,
+            scheduled_at=now - timedelta(days=days_ago),
+            status=status,
+        ))
+    await db.commit()
+    return other_city
+
+
+async def test_summary_counts_work_objects_and_period_visits(client, admin, city, seeded):
+    headers = auth_headers(admin)
+    
+    month = (await client.get(f"{ANALYTICS_URL}/summary", headers=headers)).json()
+    year = (await client.get(f"{ANALYTICS_URL}/summary", params={"period": "year"}, headers=headers)).json()
+    
+    assert month["objects_in_work"] == 3
+    assert (month["total_visits"], month["completed_visits"]) == (3, 2)
+    assert month["completion_rate"] == pytest.approx(2 / 3)
+    assert (year["total_visits"], year["completed_visits"]) == (4, 3)
+
+
+async def test_summary_filters_work_objects_by_city(client, admin, city, seeded):
+    headers = auth_headers(admin)
+    
+    own = (await client.get(f"{ANALYTICS_URL}/summary", params={"city_id": str(city.id)}, headers=headers)).json()
+    other = (await client.get(f"{ANALYTICS_URL}/summary", params={"city_id": str(seeded.id)}, headers=headers)).json()
+    
+    assert (own["objects_in_work"], other["objects_in_work"]) == (2, 1)
+
+
+async def test_summary_without_visits(client, admin):
+    body = (await client.get(f"{ANALYTICS_URL}/summary", params={"period": "day"}, headers=auth_headers(admin))).json()
+    
+    assert (body["objects_in_work"], body["total_visits"], body["completion_rate"]) == (0, 0, 0)
+
+
+async def test_objects_by_city(client, admin, city, seeded):
+    items = (await client.get(f"{ANALYTICS_URL}/objects/by-city", headers=auth_headers(admin))).json()["items"]
+    
+    counts = {item["city_id"]: (item["total"], item["in_work"]) for item in items}
+    assert counts == {str(city.id): (3, 2), str(seeded.id): (1, 1)}
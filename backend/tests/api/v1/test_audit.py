@@ -0,0 +1,77 @@
+"""
+Тесты аудита: transactional outbox и эндпойнты журнала
+"""
+from sqlalchemy import func, select
+
+from app.domain.services.audit_service import AuditService
+from app.infrastructure.db.base import AsyncSessionLocal
+from app.infrastructure.db.models import ActionType, AuditLog, AuditOutbox
+from tests.conftest import auth_headers
+
+AUDIT_URL = "/api/v1/audit/"
+
+
+async def _count(model) -> int:
+    async with AsyncSessionLocal() as session:
+        return (await session.execute(select(func.count()).select_from(model))).scalar_one()
+
+
+async def _drain(batch_size: int = 500) -> int:
+    async with AsyncSessionLocal() as session:
+        return await AuditService(session).drain_outbox(batch_size)
+
+
+async def _create_object(client, headers, city, address: str = "ул. Мира 1") -> str:
+    response = await client.post(
+        "/api/v1/objects/", json={"type": "MKD", "address": address, "city_id": str(city.id)}, headers=headers
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+async def test_audit_is_queued_with_the_entity_and_drained(client, admin, city):
+    headers = auth_headers(admin)
+    object_id = await _create_object(client, headers, city)
+    
+    assert (await _count(AuditOutbox), await _count(AuditLog)) == (1, 0)
+    
+    assert await _drain() == 1
+    assert (await _count(AuditOutbox), await _count(AuditLog)) == (0, 1)
+    
+    body = (await client.get(AUDIT_URL, headers=headers)).json()
+    entry, = body["items"]
+    assert (entry["action"], entry["entity_type"], entry["entity_id"]) == ("create", "object", object_id)
+    assert entry["actor_id"] == str(admin.id)
+
+
+async def test_drain_moves_outbox_in_batches(client, admin, city):
+    headers = auth_headers(admin)
+    for number in range(3):
+        await _create_object(client, headers, city, f"ул. Мира {number}")
+    
+    assert [await _drain(batch_size=2) for _ in range(3)] == [2, 1, 0]
+    assert await _count(AuditLog) == 3
+
+
+async def test_rolled_back_change_leaves_no_audit(db, admin):
+    await AuditService(db).log_action(ActionType.UPDATE, "object", None, admin.id)
+    await db.rollback()
+    
+    assert await _count(AuditOutbox) == 0
+
+
+async def test_audit_cursor_pagination(client, admin, city):
+    headers = auth_headers(admin)
+    for number in range(5):
+        await _create_object(client, headers, city, f"ул. Мира {number}")
+    await _drain()
+    
+    seen, cursor = [], ""
+    while True:
+        body = (await client.get(AUDIT_URL, params={"cursor": cursor, "size": 2}, headers=headers)).json()
+        seen += [entry["id"] for entry in body["items"]]
+        if not body["has_more"]:
+            break
+        cursor = body["next_cursor"]
+    
+    assert len(seen) == len(set(seen)) == 5
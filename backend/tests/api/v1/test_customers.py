@@ -0,0 +1,110 @@
+"""
+Тесты эндпойнтов клиентов
+"""
+from uuid import UUID
+
+from sqlalchemy import select
+
+from app.domain.services.bulk_service import BulkService
+from app.infrastructure.db.base import AsyncSessionLocal
+from app.infrastructure.db.models import AuditOutbox, Customer
+from tests.conftest import auth_headers
+
+CUSTOMERS_URL = "/api/v1/customers/"
+
+
+async def _create_object(client, headers, city) -> str:
+    response = await client.post(
+        "/api/v1/objects/", json={"type": "MKD", "address": "ул. Тестовая 1", "city_id": str(city.id)}, headers=headers
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+async def _create_customer(client, headers, object_id: str, **fields) -> dict:
+    response = await client.post(CUSTOMERS_URL, json={"object_id": object_id, **fields}, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+async def test_search_by_name_phone_and_portrait(client, admin, city):
+    headers = auth_headers(admin)
+    object_id = await _create_object(client, headers, city)
+    await _create_customer(
+        client, headers, object_id, full_name="Иван Петров", phone="+79991234567", portrait_text="любит футбол"
+    )
+    await _create_customer(client, headers, object_id, full_name="Анна Смирнова", phone="+79990000000")
+    
+    for query, expected in (("петров", 1), ("футбол", 1), ("1234", 1), ("+7999", 2), ("zzz", 0)):
+        response = await client.get(CUSTOMERS_URL, params={"q": query}, headers=headers)
+        assert response.status_code == 200, response.text
+        assert response.json()["total"] == expected, query
+
+
+async def test_list_items_match_detail_response(client, admin, city):
+    headers = auth_headers(admin)
+    object_id = await _create_object(client, headers, city)
+    customer = await _create_customer(client, headers, object_id, full_name="Иван", phone="+79991234567")
+    detail = (await client.get(f"{CUSTOMERS_URL}{customer['id']}", headers=headers)).json()
+    
+    page_item, = (await client.get(CUSTOMERS_URL, headers=headers)).json()["items"]
+    cursor_item, = (await client.get(CUSTOMERS_URL, params={"size": 5}, headers=headers)).json()["items"]
+    
+    assert page_item == cursor_item
+    assert {key: detail[key] for key in page_item} == page_item
+
+
+async def test_bulk_import_matches_customers_by_phone(client, admin, city):
+    headers = auth_headers(admin)
+    object_id = await _create_object(client, headers, city)
+    existing = await _create_customer(client, headers, object_id, full_name="Иван", phone="+79990000001")
+    other = await _create_customer(client, headers, object_id, full_name="Мария", phone="+79990000009")
+    items = [
+        {"object_id": object_id, "full_name": "Иван Петров", "phone": "+79990000001"},
+        {"object_id": object_id, "full_name": "Олег", "phone": "+79990000002"},
+        {"object_id": object_id, "full_name": "Олег 2", "phone": "+79990000002"},
+        {"id": other["id"], "object_id": object_id, "full_name": "Мария", "phone": "+79990000001"},
+        {"object_id": object_id, "full_name": "Пётр", "phone": "не телефон"},
+    ]
+    
+    body = (await client.post(f"{CUSTOMERS_URL}bulk", json={"items": items}, headers=headers)).json()
+    
+    assert [row["status"] for row in body["results"]] == ["updated", "created", "error", "error", "error"]
+    assert body["results"][0]["id"] == existing["id"]
+    assert body["results"][2]["error"] == "duplicate row in request"
+    assert "already used" in body["results"][3]["error"]
+
+
+async def test_bulk_import_retries_rows_after_concurrent_insert(client, admin, city, monkeypatch):
+    """Конфликт внутри пачки откатывает только её SAVEPOINT; строки пишутся по одной"""
+    headers = auth_headers(admin)
+    object_id = await _create_object(client, headers, city)
+    write = BulkService._write
+    calls = []
+    
+    async def racing_write(self, spec, inserts, updates):
+        calls.append(len(inserts))
+        if len(calls) == 1:
+            # Параллельный запрос занимает телефон второй строки после проверки
+            async with AsyncSessionLocal() as session:
+                session.add(Customer(object_id=UUID(object_id), full_name="Гонка", phone="+79990000002"))
+                await session.commit()
+        return await write(self, spec, inserts, updates)
+    
+    monkeypatch.setattr(BulkService, "_write", racing_write)
+    items = [
+        {"object_id": object_id, "full_name": "Анна", "phone": "+79990000001"},
+        {"object_id": object_id, "full_name": "Олег", "phone": "+79990000002"},
+        {"object_id": object_id, "full_name": "Пётр", "phone": "+79990000003"},
+    ]
+    
+    body = (await client.post(f"{CUSTOMERS_URL}bulk", json={"items": items}, headers=headers)).json()
+    
+    assert [row["status"] for row in body["results"]] == ["created", "error", "created"]
+    assert "integrity error" in body["results"][1]["error"]
+    async with AsyncSessionLocal() as session:
+        names = (await session.execute(select(Customer.full_name).order_by(Customer.full_name))).scalars().all()
+        audit = (await session.execute(select(AuditOutbox.payload))).scalars().all()
+    assert names == ["Анна", "Гонка", "Пётр"]
+    bulk_audit, = [payload for payload in audit if (payload["after"] or {}).get("bulk")]
+    assert len(bulk_audit["after"]["created"]) == 2
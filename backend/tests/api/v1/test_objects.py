@@ -0,0 +1,246 @@
+"""
+Тесты эндпойнтов объектов
+"""
+from tests.conftest import auth_headers
+
+OBJECTS_URL = "/api/v1/objects/"
+
+
+async def _create_objects(client, headers, city, count: int) -> list[str]:
+    ids = []
+    for i in range(count):
+        response = await client.post(
+            OBJECTS_URL,
+            json={"type": "MKD", "address": f"ул. Тестовая {i}", "city_id": str(city.id)},
+            headers=headers,
+        )
+        assert response.status_code == 201, response.text
+        ids.append(response.json()["id"])
+    return ids
+
+
+async def _read_all_pages(client, headers, size: int, **params) -> list[dict]:
+    items, cursor = [], ""
+    while True:
+        response = await client.get(OBJECTS_URL, params={"cursor": cursor, "size": size, **params}, headers=headers)
+        assert response.status_code == 200, response.text
+        body = response.json()
+        assert len(body["items"]) <= size
+        items += body["items"]
+        if not body["has_more"]:
+            assert body["next_cursor"] is None
+            return items
+        cursor = body["next_cursor"]
+
+
+async def test_cursor_pagination_returns_each_object_once(client, admin, city):
+    headers = auth_headers(admin)
+    ids = await _create_objects(client, headers, city, 7)
+    
+    items = await _read_all_pages(client, headers, size=3)
+    
+    assert sorted(item["id"] for item in items) == sorted(ids)
+    updated = [item["updated_at"] for item in items]
+    assert updated == sorted(updated, reverse=True)
+
+
+async def test_cursor_pagination_is_stable_under_inserts(client, admin, city):
+    headers = auth_headers(admin)
+    ids = await _create_objects(client, headers, city, 4)
+    
+    first = (await client.get(OBJECTS_URL, params={"cursor": "", "size": 2}, headers=headers)).json()
+    # Новые объекты попадают в начало списка и не сдвигают следующую страницу
+    await _create_objects(client, headers, city, 2)
+    rest = await _read_all_pages(client, headers, size=2)
+    second = (await client.get(OBJECTS_URL, params={"cursor": first["next_cursor"], "size": 2}, headers=headers)).json()
+    
+    assert len(rest) == 6
+    seen = [item["id"] for item in first["items"] + second["items"]]
+    assert sorted(seen) == sorted(ids)
+
+
+async def test_cursor_pagination_rejects_other_sort(client, admin):
+    response = await client.get(
+        OBJECTS_URL, params={"cursor": "", "sort": "status"}, headers=auth_headers(admin)
+    )
+    
+    assert response.status_code == 422
+    assert "sort" in response.json()["error"]["details"]["fields"]
+
+
+async def test_malformed_cursor_is_rejected(client, admin):
+    response = await client.get(OBJECTS_URL, params={"cursor": "garbage!"}, headers=auth_headers(admin))
+    
+    assert response.status_code == 422
+
+
+async def test_page_mode_exact_count(client, admin, city):
+    headers = auth_headers(admin)
+    await _create_objects(client, headers, city, 7)
+    
+    body = (await client.get(OBJECTS_URL, params={"limit": 3, "page": 2, "count": "exact"}, headers=headers)).json()
+    
+    assert (body["total"], body["pages"], body["has_more"]) == (7, 3, True)
+    assert len(body["items"]) == 3
+
+
+async def test_page_mode_without_count_uses_has_more(client, admin, city):
+    headers = auth_headers(admin)
+    await _create_objects(client, headers, city, 7)
+    
+    middle = (await client.get(OBJECTS_URL, params={"limit": 3, "page": 2, "count": "none"}, headers=headers)).json()
+    last = (await client.get(OBJECTS_URL, params={"limit": 3, "page": 3, "count": "none"}, headers=headers)).json()
+    
+    assert middle["total"] is None and middle["pages"] is None
+    assert (len(middle["items"]), middle["has_more"]) == (3, True)
+    assert (len(last["items"]), last["has_more"]) == (1, False)
+
+
+async def test_estimated_and_cached_counts_fall_back_to_exact(client, admin, city):
+    # SQLite без планировщика и без Redis: обе стратегии дают точное значение
+    headers = auth_headers(admin)
+    await _create_objects(client, headers, city, 4)
+    
+    for strategy in ("estimated", "cached"):
+        body = (await client.get(OBJECTS_URL, params={"limit": 3, "count": strategy}, headers=headers)).json()
+        assert body["total"] == 4, strategy
+    
+    await _create_objects(client, headers, city, 1)
+    body = (await client.get(OBJECTS_URL, params={"limit": 3, "count": "cached"}, headers=headers)).json()
+    assert body["total"] == 5
+
+
+async def test_unknown_count_strategy_is_rejected(client, admin):
+    response = await client.get(OBJECTS_URL, params={"count": "approx"}, headers=auth_headers(admin))
+    
+    assert response.status_code == 422
+
+
+async def test_page_mode_sorts_by_indexed_field(client, admin, city):
+    headers = auth_headers(admin)
+    ids = await _create_objects(client, headers, city, 3)
+    response = await client.patch(f"{OBJECTS_URL}{ids[1]}", json={"status": "DONE"}, headers=headers)
+    assert response.status_code == 200, response.text
+    
+    body = (await client.get(OBJECTS_URL, params={"sort": "-status"}, headers=headers)).json()
+    
+    assert [item["status"] for item in body["items"]] == ["NEW", "NEW", "DONE"]
+
+
+async def test_page_mode_rejects_unsupported_sorts(client, admin):
+    headers = auth_headers(admin)
+    
+    for sort in ("address", "status,-version", "version,status"):
+        response = await client.get(OBJECTS_URL, params={"sort": sort}, headers=headers)
+        assert response.status_code == 422, sort
+        assert response.json()["error"]["details"]["fields"]["sort"], sort
+
+
+async def _create_at(client, headers, city, *addresses: str) -> list[str]:
+    ids = []
+    for address in addresses:
+        response = await client.post(
+            OBJECTS_URL, json={"type": "MKD", "address": address, "city_id": str(city.id)}, headers=headers
+        )
+        assert response.status_code == 201, response.text
+        ids.append(response.json()["id"])
+    return ids
+
+
+async def _search(client, headers, query: str, **params) -> list[str]:
+    response = await client.get(OBJECTS_URL, params={"search": query, **params}, headers=headers)
+    assert response.status_code == 200, response.text
+    return sorted(item["address"] for item in response.json()["items"])
+
+
+async def test_search_matches_address_substring(client, admin, city):
+    headers = auth_headers(admin)
+    await _create_at(client, headers, city, "ул. Пушкина, д. 10", "пр. Ленина, д. 5", "ул. Пушкинская, д. 1")
+    
+    assert await _search(client, headers, "пушк") == ["ул. Пушкина, д. 10", "ул. Пушкинская, д. 1"]
+    assert await _search(client, headers, "ЛЕНИНА") == ["пр. Ленина, д. 5"]
+    assert await _search(client, headers, "пушк", size=5) == ["ул. Пушкина, д. 10", "ул. Пушкинская, д. 1"]
+
+
+async def test_search_treats_query_as_one_phrase(client, admin, city):
+    headers = auth_headers(admin)
+    await _create_at(client, headers, city, "ул Ленина дом 5", "ул Ленина дом 15", "ул Ленина дом 7", "дом 5 ул Мира")
+    
+    assert await _search(client, headers, "Ленина дом 5") == ["ул Ленина дом 5"]
+    assert await _search(client, headers, "дом 5") == ["дом 5 ул Мира", "ул Ленина дом 5"]
+    assert await _search(client, headers, "дом 1") == ["ул Ленина дом 15"]
+    assert await _search(client, headers, 'дом "5') == []
+
+
+async def test_short_search_falls_back_to_substring(client, admin, city):
+    headers = auth_headers(admin)
+    await _create_at(client, headers, city, "ул. Мира, д. 1", "Садовая 3")
+    
+    assert await _search(client, headers, "д.") == ["ул. Мира, д. 1"]
+
+
+async def test_search_index_follows_address_updates(client, admin, city):
+    headers = auth_headers(admin)
+    object_id, = await _create_at(client, headers, city, "Садовая 3")
+    
+    response = await client.patch(f"{OBJECTS_URL}{object_id}", json={"address": "ул. Пушкина, д. 99"}, headers=headers)
+    assert response.status_code == 200, response.text
+    
+    assert await _search(client, headers, "Пушкина") == ["ул. Пушкина, д. 99"]
+    assert await _search(client, headers, "Садовая") == []
+
+
+async def test_list_query_count_does_not_grow_with_rows(client, admin, city, queries):
+    headers = auth_headers(admin)
+    
+    async def list_queries() -> int:
+        queries.clear()
+        response = await client.get(OBJECTS_URL, params={"limit": 50}, headers=headers)
+        assert response.status_code == 200, response.text
+        return len(queries)
+    
+    await _create_objects(client, headers, city, 2)
+    few = await list_queries()
+    await _create_objects(client, headers, city, 8)
+    
+    assert await list_queries() == few
+    # Связи (город, район, ответственный) в списке не подгружаются
+    assert not any("FROM cities" in statement or "FROM districts" in statement for statement in queries)
+
+
+async def test_list_items_match_detail_response(client, admin, city):
+    headers = auth_headers(admin)
+    response = await client.post(
+        OBJECTS_URL,
+        json={"type": "MKD", "address": "ул. Мира 1", "city_id": str(city.id), "tags": ["a"]},
+        headers=headers,
+    )
+    detail = response.json()
+    
+    page_item, = (await client.get(OBJECTS_URL, headers=headers)).json()["items"]
+    cursor_item, = (await client.get(OBJECTS_URL, params={"size": 5}, headers=headers)).json()["items"]
+    
+    assert page_item == cursor_item
+    assert {key: detail[key] for key in page_item} == page_item
+
+
+async def test_bulk_import_reports_each_row(client, admin, city):
+    headers = auth_headers(admin)
+    existing, = await _create_objects(client, headers, city, 1)
+    items = [
+        {"type": "MKD", "address": "ул. Новая 1", "city_id": str(city.id)},
+        {"type": "UNKNOWN", "address": "ул. Новая 2", "city_id": str(city.id)},
+        {"type": "MKD", "address": "ул. Новая 3", "city_id": "00000000-0000-0000-0000-000000000000"},
+        {"id": existing, "type": "MKD", "address": "ул. Обновлённая", "city_id": str(city.id)},
+    ]
+    
+    response = await client.post(f"{OBJECTS_URL}bulk", json={"items": items}, headers=headers)
+    
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["created_count"], body["updated_count"], body["errors_count"]) == (1, 1, 2)
+    assert [row["status"] for row in body["results"]] == ["created", "error", "error", "updated"]
+    assert "city_id" in body["results"][2]["error"]
+    
+    updated = (await client.get(f"{OBJECTS_URL}{existing}", headers=headers)).json()
+    assert (updated["address"], updated["version"]) == ("ул. Обновлённая", 2)
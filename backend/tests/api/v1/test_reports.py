@@ -0,0 +1,382 @@
+"""
+Тесты отчётов: XLSX-экспорт воркером, потоковая выдача, предпросмотр, кэш файлов
+"""
+import asyncio
+import csv
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from uuid import UUID
+
+from openpyxl import load_workbook
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.domain.services.report_cache import evict_reports
+from app.infrastructure.db.base import AsyncSessionLocal
+from app.infrastructure.db.models import ReportJob
+from app.infrastructure.queues import report_worker
+from app.infrastructure.queues.report_queue import LocalReportQueue, get_report_queue
+from app.infrastructure.queues.report_worker import ReportWorker, reclaim_stale_jobs
+from app.services import excel_exporter
+from tests.conftest import auth_headers
+
+REPORTS_URL = "/api/v1/reports"
+
+
+async def create_object(client, headers, city, address: str) -> str:
+    response = await client.post(
+        "/api/v1/objects/", json={"type": "MKD", "address": address, "city_id": str(city.id)}, headers=headers
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+async def create_customer(client, headers, object_id: str, full_name: str, phone: str, **fields) -> str:
+    response = await client.post(
+        "/api/v1/customers/",
+        json={"object_id": object_id, "full_name": full_name, "phone": phone, **fields},
+        headers=headers,
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+async def export(client, headers, **body) -> dict:
+    response = await client.post(f"{REPORTS_URL}/export", json=body, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+async def run_job(job_id: str, worker_id: str = "test") -> None:
+    """Выполнить задачу так, как это делает воркер отчётов"""
+    worker = ReportWorker(AsyncSessionLocal, LocalReportQueue(), worker_id=worker_id)
+    claimed = await worker.claim()
+    assert str(claimed) == job_id
+    await worker.process(claimed)
+
+
+async def job_status(client, headers, job_id: str) -> dict:
+    return (await client.get(f"{REPORTS_URL}/jobs/{job_id}", headers=headers)).json()
+
+
+async def download_rows(client, headers, job_id: str) -> list[list[tuple]]:
+    """Строки каждого листа скачанного XLSX"""
+    response = await client.get(f"{REPORTS_URL}/jobs/{job_id}/download", headers=headers)
+    assert response.status_code == 200, response.text
+    workbook = load_workbook(BytesIO(response.content), read_only=True)
+    try:
+        return [list(sheet.iter_rows(values_only=True)) for sheet in workbook.worksheets]
+    finally:
+        workbook.close()
+
+
+async def test_export_writes_requested_columns(client, admin, city):
+    headers = auth_headers(admin)
+    object_id = await create_object(client, headers, city, "ул. Отчётная 1")
+    await create_customer(client, headers, object_id, "Иван", "+79990000001", interests=["internet", "tv"])
+    job = await export(client, headers, entity="customers", columns=["full_name", "interests", "bogus"])
+    
+    assert (await client.get(f"{REPORTS_URL}/jobs/{job['id']}/download", headers=headers)).status_code == 400
+    await run_job(job["id"])
+    
+    assert (await job_status(client, headers, job["id"]))["status"] == "done"
+    sheet, = await download_rows(client, headers, job["id"])
+    assert len(sheet) == 2 and len(sheet[0]) == 2  # Неизвестная колонка отброшена
+    assert sheet[1] == ("Иван", "internet, tv")
+
+
+async def test_export_overflows_to_next_sheet(client, admin, city, monkeypatch):
+    monkeypatch.setattr(excel_exporter, "MAX_SHEET_ROWS", 3)
+    headers = auth_headers(admin)
+    for number in range(5):
+        await create_object(client, headers, city, f"ул. Отчётная {number}")
+    job = await export(client, headers, entity="objects", columns=["address"])
+    
+    await run_job(job["id"])
+    
+    sheets = await download_rows(client, headers, job["id"])
+    assert [len(sheet) for sheet in sheets] == [3, 3, 2]
+    assert all(sheet[0] == sheets[0][0] for sheet in sheets)
+    addresses = sorted(row[0] for sheet in sheets for row in sheet[1:])
+    assert addresses == [f"ул. Отчётная {number}" for number in range(5)]
+
+
+async def stream(client, headers, **body) -> str:
+    response = await client.post(f"{REPORTS_URL}/stream", json=body, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.text
+
+
+async def test_csv_stream(client, admin, city):
+    headers = auth_headers(admin)
+    for number in range(3):
+        await create_object(client, headers, city, f"ул. Потоковая {number}")
+    
+    text = await stream(client, headers, entity="objects", columns=["address", "status"], format="csv")
+    
+    header, *rows = list(csv.reader(StringIO(text.lstrip("\ufeff"))))
+    assert len(header) == 2
+    assert sorted(rows) == [[f"ул. Потоковая {number}", "NEW"] for number in range(3)]
+
+
+async def test_ndjson_stream_applies_filters(client, admin, city):
+    headers = auth_headers(admin)
+    kept = await create_object(client, headers, city, "ул. Интерес")
+    await create_object(client, headers, city, "ул. Новая")
+    await client.patch(f"/api/v1/objects/{kept}", json={"status": "INTEREST"}, headers=headers)
+    
+    text = await stream(client, headers, entity="objects", columns=["id", "address"], filters={"status": "INTEREST"}, format="ndjson")
+    
+    assert [json.loads(line) for line in text.splitlines()] == [{"id": kept, "address": "ул. Интерес"}]
+
+
+async def test_unknown_filter_is_rejected_before_streaming(client, admin):
+    response = await client.post(
+        f"{REPORTS_URL}/stream", json={"entity": "objects", "filters": {"bogus": 1}}, headers=auth_headers(admin)
+    )
+    
+    assert response.status_code == 422
+
+
+async def test_invalid_filters_and_sorts_are_rejected_before_job(client, admin):
+    headers = auth_headers(admin)
+    bodies = [
+        {"entity": "objects", "filters": {"status": "UNKNOWN"}},
+        {"entity": "visits", "filters": {"city_id": None}},
+        {"entity": "objects", "sort": {"address": "asc"}},
+        {"entity": "objects", "sort": {"status": "asc", "version": "desc"}},
+        {"entity": "customers", "sort": {"phone": "asc"}},
+    ]
+    
+    for body in bodies:
+        for path in ("preview", "export"):
+            response = await client.post(f"{REPORTS_URL}/{path}", json=body, headers=headers)
+            assert response.status_code == 422, (path, body)
+    assert (await client.get(f"{REPORTS_URL}/jobs", headers=headers)).json() == []
+
+
+async def test_preview_applies_filters_and_indexed_sort(client, admin, city):
+    headers = auth_headers(admin)
+    first = await create_object(client, headers, city, "ул. Первая")
+    await create_object(client, headers, city, "ул. Вторая")
+    await client.patch(f"/api/v1/objects/{first}", json={"status": "DONE"}, headers=headers)
+    
+    body = {"entity": "objects", "columns": ["address", "status"], "sort": {"status": "asc"}}
+    rows = (await client.post(f"{REPORTS_URL}/preview", json=body, headers=headers)).json()["rows"]
+    filtered = (await client.post(
+        f"{REPORTS_URL}/preview", json={**body, "filters": {"status": "NEW"}}, headers=headers
+    )).json()
+    
+    assert [row["status"] for row in rows] == ["DONE", "NEW"]
+    assert (filtered["total"], filtered["rows"]) == (1, [{"address": "ул. Вторая", "status": "NEW"}])
+
+
+async def test_phones_are_masked_without_pii_access(client, admin, engineer, city):
+    headers = auth_headers(admin)
+    object_id = await create_object(client, headers, city, "ул. Телефонная")
+    await create_customer(client, headers, object_id, "Иван", "+79991234567")
+    body = {"entity": "customers", "columns": ["full_name", "phone"]}
+    
+    for user, phone in ((admin, "+79991234567"), (engineer, "+7999***-**67")):
+        user_headers = auth_headers(user)
+        preview = (await client.post(f"{REPORTS_URL}/preview", json=body, headers=user_headers)).json()
+        ndjson = await stream(client, user_headers, **body, format="ndjson")
+        csv_text = await stream(client, user_headers, **body, format="csv")
+        
+        assert preview["rows"] == [{"full_name": "Иван", "phone": phone}]
+        assert json.loads(ndjson)["phone"] == phone
+        assert phone in csv_text and ("+79991234567" in csv_text) == (user is admin)
+
+
+async def load_job(job_id: str) -> ReportJob:
+    async with AsyncSessionLocal() as session:
+        return await session.get(ReportJob, UUID(job_id))
+
+
+async def test_worker_processes_queued_jobs(client, admin, city, monkeypatch):
+    monkeypatch.setattr(settings, "REPORT_WORKER_POLL_SECONDS", 0.05)
+    headers = auth_headers(admin)
+    await create_object(client, headers, city, "ул. Очередь")
+    job = await export(client, headers, entity="objects")
+    worker = ReportWorker(AsyncSessionLocal, await get_report_queue(), concurrency=2, worker_id="test")
+    
+    task = asyncio.create_task(worker.run())
+    try:
+        for _ in range(100):
+            if (await load_job(job["id"])).status == "done":
+                break
+            await asyncio.sleep(0.05)
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    
+    assert (await load_job(job["id"])).status == "done"
+    assert worker.processed == 1
+
+
+async def test_job_is_claimed_by_one_worker(client, admin):
+    job = await export(client, auth_headers(admin), entity="objects")
+    first = ReportWorker(AsyncSessionLocal, LocalReportQueue(), worker_id="first")
+    second = ReportWorker(AsyncSessionLocal, LocalReportQueue(), worker_id="second")
+    
+    assert str(await first.claim(UUID(job["id"]))) == job["id"]
+    assert await second.claim(UUID(job["id"])) is None
+    assert await second.claim() is None
+    
+    claimed = await load_job(job["id"])
+    assert (claimed.status, claimed.worker_id, claimed.attempts) == ("processing", "first", 1)
+
+
+async def test_failed_export_marks_the_job(client, admin, monkeypatch):
+    async def broken_export(session, job):
+        raise RuntimeError("disk full")
+    
+    monkeypatch.setattr(report_worker, "export_report", broken_export)
+    job = await export(client, auth_headers(admin), entity="objects")
+    
+    await run_job(job["id"])
+    
+    failed = await load_job(job["id"])
+    assert (failed.status, failed.error_message) == ("failed", "disk full")
+
+
+async def test_stopped_worker_returns_its_job(client, admin, monkeypatch):
+    started = asyncio.Event()
+    
+    async def slow_export(session, job):
+        started.set()
+        await asyncio.sleep(3600)
+    
+    monkeypatch.setattr(report_worker, "export_report", slow_export)
+    job = await export(client, auth_headers(admin), entity="objects")
+    queue = LocalReportQueue()
+    worker = ReportWorker(AsyncSessionLocal, queue, worker_id="test")
+    job_id = await worker.claim()
+    
+    task = asyncio.create_task(worker.process(job_id))
+    await started.wait()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    
+    returned = await load_job(job["id"])
+    assert (returned.status, returned.worker_id, returned.attempts) == ("pending", None, 0)
+    assert await queue.pop(0.1) == job["id"]
+
+
+async def test_stale_jobs_are_reclaimed(client, admin):
+    headers = auth_headers(admin)
+    lost = await export(client, headers, entity="objects")
+    exhausted = await export(client, headers, entity="visits")
+    alive = await export(client, headers, entity="customers")
+    stale_heartbeat = datetime.utcnow() - timedelta(seconds=settings.REPORT_JOB_STALE_SECONDS + 60)
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(ReportJob).values(status="processing", worker_id="gone", heartbeat_at=stale_heartbeat, attempts=1)
+        )
+        await session.execute(
+            update(ReportJob).where(ReportJob.id == UUID(exhausted["id"])).values(attempts=settings.REPORT_JOB_MAX_ATTEMPTS)
+        )
+        await session.execute(
+            update(ReportJob).where(ReportJob.id == UUID(alive["id"])).values(heartbeat_at=datetime.utcnow())
+        )
+        assert await reclaim_stale_jobs(session) == 1
+        await session.commit()
+    
+    assert (await load_job(lost["id"])).status == "pending"
+    assert (await load_job(exhausted["id"])).status == "failed"
+    assert (await load_job(alive["id"])).status == "processing"
+
+
+async def test_repeated_export_reuses_the_file(client, admin, city):
+    headers = auth_headers(admin)
+    await create_object(client, headers, city, "ул. Кэшевая")
+    first = await export(client, headers, entity="objects", columns=["address"])
+    await run_job(first["id"])
+    
+    second = await export(client, headers, entity="objects", columns=["address"])
+    
+    # Готовый файл - задача сразу done, воркеру забирать нечего
+    assert second["status"] == "done" and second["completed_at"] is not None
+    assert await ReportWorker(AsyncSessionLocal, LocalReportQueue(), worker_id="test").claim() is None
+    done = await load_job(first["id"])
+    assert second["file_path"] == done.file_path
+    assert (await load_job(second["id"])).fingerprint == done.fingerprint
+    assert await download_rows(client, headers, second["id"]) == await download_rows(client, headers, first["id"])
+
+
+async def test_data_change_invalidates_the_cached_file(client, admin, city):
+    headers = auth_headers(admin)
+    await create_object(client, headers, city, "ул. Старая")
+    first = await export(client, headers, entity="objects", columns=["address"])
+    await run_job(first["id"])
+    
+    await create_object(client, headers, city, "ул. Новая")
+    second = await export(client, headers, entity="objects", columns=["address"])
+    assert second["status"] == "pending"
+    await run_job(second["id"])
+    
+    assert (await load_job(second["id"])).file_path != (await load_job(first["id"])).file_path
+    sheet, = await download_rows(client, headers, second["id"])
+    assert sorted(row[0] for row in sheet[1:]) == ["ул. Новая", "ул. Старая"]
+
+
+async def test_masked_and_full_exports_do_not_share_a_file(client, admin, engineer, city):
+    admin_headers, engineer_headers = auth_headers(admin), auth_headers(engineer)
+    object_id = await create_object(client, admin_headers, city, "ул. Телефонная")
+    await create_customer(client, admin_headers, object_id, "Иван", "+79991234567")
+    body = {"entity": "customers", "columns": ["full_name", "phone"]}
+    
+    full = await export(client, admin_headers, **body)
+    await run_job(full["id"])
+    masked = await export(client, engineer_headers, **body)
+    assert masked["status"] == "pending"
+    await run_job(masked["id"])
+    
+    assert (await load_job(masked["id"])).fingerprint != (await load_job(full["id"])).fingerprint
+    assert (await download_rows(client, admin_headers, full["id"]))[0][1] == ("Иван", "+79991234567")
+    assert (await download_rows(client, engineer_headers, masked["id"]))[0][1] == ("Иван", "+7999***-**67")
+    # Без колонки телефона маска не меняет файл - он общий для ролей
+    names = await export(client, admin_headers, entity="customers", columns=["full_name"])
+    await run_job(names["id"])
+    assert (await export(client, engineer_headers, entity="customers", columns=["full_name"]))["status"] == "done"
+
+
+async def test_time_dependent_and_disabled_exports_are_not_cached(client, admin, monkeypatch):
+    headers = auth_headers(admin)
+    due = {"entity": "visits", "filters": {"next_action_due": True}}
+    first = await export(client, headers, **due)
+    await run_job(first["id"])
+    assert (await load_job(first["id"])).fingerprint is None
+    assert (await export(client, headers, **due))["status"] == "pending"
+    
+    monkeypatch.setattr(settings, "REPORT_CACHE_ENABLED", False)
+    plain = await export(client, headers, entity="objects")
+    assert plain["status"] == "pending"
+
+
+def _report_file(name: str, size: int, age_seconds: float) -> Path:
+    path = Path(settings.REPORTS_PATH) / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    accessed = time.time() - age_seconds
+    os.utime(path, (accessed, accessed))
+    return path
+
+
+def test_eviction_drops_expired_then_least_recent_files():
+    expired = _report_file("report_objects_expired.xlsx", 10, 8 * 86400)
+    orphan = _report_file(".report_crashed.tmp.xlsx", 10, 2 * 86400)
+    running = _report_file(".report_running.tmp.xlsx", 10, 60)
+    oldest = _report_file("report_objects_oldest.xlsx", 100, 3600)
+    kept = _report_file("report_objects_kept.xlsx", 100, 7200)
+    recent = _report_file("report_objects_recent.xlsx", 100, 60)
+    
+    stats = evict_reports(max_bytes=250, ttl_days=7, keep=str(kept))
+    
+    assert stats == {"removed": 3, "freed_bytes": 120, "total_bytes": 200}
+    assert not expired.exists() and not orphan.exists() and not oldest.exists()
+    assert running.exists() and kept.exists() and recent.exists()
@@ -0,0 +1,583 @@
+"""
+Тесты офлайн-синхронизации: /sync/batch и /sync/changes
+"""
+import gzip
+import hashlib
+import json
+from datetime import datetime, timedelta
+from uuid import UUID, uuid4
+
+import pytest
+from sqlalchemy import delete, func, select, update
+
+from app.core.config import settings
+from app.core.pagination import decode_sequence_cursor, encode_sequence_cursor
+from app.infrastructure.db.base import AsyncSessionLocal
+from app.infrastructure.db.change_log import record_changes
+from app.domain.services.sync_service import SyncService
+from app.domain.services.sync_snapshot_service import SyncSnapshotService
+from app.infrastructure.db.models import ChangeLog, City, Customer, Object, SyncToken, User, UserRole
+from tests.conftest import auth_headers
+
+BATCH_URL = "/api/v1/sync/batch"
+CHANGES_URL = "/api/v1/sync/changes"
+
+
+def object_item(city, user, address: str, **fields) -> dict:
+    """Элемент /sync/batch для создания объекта"""
+    return {
+        "client_generated_id": str(uuid4()),
+        "table_name": "objects",
+        "payload": {"type": "MKD", "address": address, "city_id": str(city.id), "created_by": str(user.id), **fields},
+        "updated_at": "2025-01-01T00:00:00Z",
+    }
+
+
+async def push(client, headers, *items, **params) -> list[dict]:
+    response = await client.post(BATCH_URL, json={"items": list(items), **params}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["results"]
+
+
+async def test_batch_creates_and_updates_items(client, admin, city):
+    headers = auth_headers(admin)
+    items = [object_item(city, admin, f"ул. Синхронная {number}") for number in range(3)]
+    
+    created = await push(client, headers, *items)
+    
+    assert [result["status"] for result in created] == ["created"] * 3
+    
+    changed = dict(items[1], payload=dict(items[1]["payload"], address="ул. Изменённая"), version=1)
+    updated, = await push(client, headers, changed)
+    
+    assert (updated["status"], updated["server_id"], updated["server_version"]) == ("updated", created[1]["server_id"], 2)
+    async with AsyncSessionLocal() as session:
+        addresses = (await session.execute(select(Object.address).order_by(Object.address))).scalars().all()
+    assert addresses == ["ул. Изменённая", "ул. Синхронная 0", "ул. Синхронная 2"]
+
+
+async def test_bad_item_fails_only_itself(client, admin, city):
+    headers = auth_headers(admin)
+    missing_address = object_item(city, admin, "")
+    del missing_address["payload"]["address"]
+    items = [
+        object_item(city, admin, "ул. Первая"),
+        missing_address,
+        object_item(city, admin, "ул. Вторая", type="NOT_A_TYPE"),
+        object_item(city, admin, "ул. Третья"),
+    ]
+    
+    results = await push(client, headers, *items)
+    
+    assert [result["status"] for result in results] == ["created", "error", "error", "created"]
+    assert "address" in results[1]["error_message"]
+
+
+async def test_batch_statement_count_does_not_grow_with_items(client, admin, city, queries):
+    headers = auth_headers(admin)
+    
+    async def batch_queries(count: int) -> int:
+        items = [object_item(city, admin, f"ул. Пачка {number}") for number in range(count)]
+        queries.clear()
+        results = await push(client, headers, *items)
+        assert {result["status"] for result in results} == {"created"}
+        return len(queries)
+    
+    # Пачка пишется одним flush: число INSERT-выражений не зависит от числа элементов
+    # (executemany), чтений токенов и сущностей - по одному на таблицу
+    await batch_queries(1)  # Прогрев кэша пользователя
+    assert await batch_queries(20) == await batch_queries(3)
+
+
+async def create_object(client, headers, city, address: str) -> str:
+    response = await client.post(
+        "/api/v1/objects/", json={"type": "MKD", "address": address, "city_id": str(city.id)}, headers=headers
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+async def read_changes(client, headers, tables: str = "objects", **params) -> dict:
+    if "cursor" not in params:
+        params.setdefault("since", "2020-01-01T00:00:00")
+    response = await client.get(CHANGES_URL, params={"tables": tables, **params}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def test_changes_are_paged_by_cursor(client, admin, city):
+    headers = auth_headers(admin)
+    ids = [await create_object(client, headers, city, f"ул. Лента {number}") for number in range(3)]
+    
+    first = await read_changes(client, headers, limit=2)
+    rest = await read_changes(client, headers, cursor=first["next_cursor"], limit=2)
+    
+    assert first["has_more"] and not rest["has_more"]
+    assert [item["id"] for item in first["items"] + rest["items"]] == ids
+    assert {item["action"] for item in first["items"] + rest["items"]} == {"create"}
+    
+    # Без новых изменений лента пуста, курсор пригоден для следующей синхронизации
+    idle = await read_changes(client, headers, cursor=rest["next_cursor"])
+    assert idle["items"] == [] and idle["next_cursor"]
+
+
+async def test_changes_include_core_writes(client, admin, city):
+    headers = auth_headers(admin)
+    object_id = await create_object(client, headers, city, "ул. Лента 1")
+    cursor = (await read_changes(client, headers))["next_cursor"]
+    
+    async with AsyncSessionLocal() as session:
+        await session.execute(update(Object).values(address="ул. Лента 2", version=Object.version + 1))
+        await record_changes(session, "objects", "update", [UUID(object_id)])
+        await session.commit()
+    
+    item, = (await read_changes(client, headers, cursor=cursor))["items"]
+    assert (item["id"], item["action"], item["data"]["address"], item["version"]) == (object_id, "update", "ул. Лента 2", 2)
+
+
+async def test_post_changes_matches_get(client, admin, city):
+    headers = auth_headers(admin)
+    await create_object(client, headers, city, "ул. Лента 1")
+    
+    response = await client.post(CHANGES_URL, json={"since": "2020-01-01T00:00:00", "tables": ["objects"]}, headers=headers)
+    
+    assert response.json()["items"] == (await read_changes(client, headers))["items"]
+
+
+async def test_invalid_and_expired_cursors(client, admin):
+    headers = auth_headers(admin)
+    expired = encode_sequence_cursor(1, datetime.utcnow() - timedelta(days=365))
+    
+    malformed = await client.get(CHANGES_URL, params={"tables": "objects", "cursor": "garbage!"}, headers=headers)
+    gone = await client.get(CHANGES_URL, params={"tables": "objects", "cursor": expired}, headers=headers)
+    
+    assert malformed.status_code == 422
+    assert (gone.status_code, gone.json()["error"]["code"]) == (410, "CURSOR_EXPIRED")
+
+
+async def age_change_log(days: int = 365) -> None:
+    """Сдвинуть журнал за окно офлайна (для компакции)"""
+    async with AsyncSessionLocal() as session:
+        await session.execute(update(ChangeLog).values(changed_at=datetime.utcnow() - timedelta(days=days)))
+        await session.commit()
+
+
+async def compact() -> int:
+    async with AsyncSessionLocal() as session:
+        return await SyncService(session).compact_change_log()
+
+
+async def logged(table_name: str = "objects") -> list[tuple[str, str]]:
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(ChangeLog.entity_id, ChangeLog.action).where(ChangeLog.table_name == table_name).order_by(ChangeLog.seq)
+        )
+        return [(str(entity_id), action) for entity_id, action in result.all()]
+
+
+async def test_delete_outside_the_app_emits_tombstone(client, admin, city):
+    headers = auth_headers(admin)
+    object_id = await create_object(client, headers, city, "ул. Удаляемая")
+    cursor = (await read_changes(client, headers))["next_cursor"]
+    
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(Object).where(Object.id == UUID(object_id)))
+        await session.commit()
+    
+    item, = (await read_changes(client, headers, cursor=cursor))["items"]
+    assert (item["id"], item["action"], item["data"]) == (object_id, "delete", None)
+
+
+async def test_compaction_keeps_latest_row_per_entity(client, admin, city):
+    headers = auth_headers(admin)
+    kept = await create_object(client, headers, city, "ул. Остаётся")
+    removed = await create_object(client, headers, city, "ул. Удаляемая")
+    await client.patch(f"/api/v1/objects/{kept}", json={"status": "INTEREST"}, headers=headers)
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(Object).where(Object.id == UUID(removed)))
+        await session.commit()
+    await age_change_log()
+    
+    # create вытеснен update; tombstone старше окна больше не нужен
+    assert await compact() == 3
+    assert await logged() == [(kept, "update")]
+    
+    feed = await read_changes(client, headers)
+    assert [(item["id"], item["data"]["status"]) for item in feed["items"]] == [(kept, "INTEREST")]
+
+
+async def test_compaction_keeps_rows_inside_the_offline_window(client, admin, city):
+    headers = auth_headers(admin)
+    object_id = await create_object(client, headers, city, "ул. Свежая")
+    await client.patch(f"/api/v1/objects/{object_id}", json={"status": "INTEREST"}, headers=headers)
+    
+    assert await compact() == 0
+    assert await logged() == [(object_id, "create"), (object_id, "update")]
+
+
+async def test_ndjson_stream_matches_json_feed(client, admin, city):
+    headers = auth_headers(admin)
+    for number in range(3):
+        await create_object(client, headers, city, f"ул. Поток {number}")
+    feed = await read_changes(client, headers)
+    
+    response = await client.get(
+        CHANGES_URL,
+        params={"since": "2020-01-01T00:00:00", "tables": "objects"},
+        headers={**headers, "Accept": "application/x-ndjson", "Accept-Encoding": "gzip"},
+    )
+    
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.headers["content-encoding"] == "gzip"
+    *items, tail = [json.loads(line) for line in response.text.splitlines()]
+    assert items == feed["items"]
+    assert tail["has_more"] is False
+    assert decode_sequence_cursor(tail["next_cursor"])[0] == decode_sequence_cursor(feed["next_cursor"])[0]
+
+
+async def test_large_limit_requires_ndjson(client, admin):
+    response = await client.get(CHANGES_URL, params={"since": "2020-01-01T00:00:00", "tables": "objects", "limit": 50000}, headers=auth_headers(admin))
+    
+    assert response.status_code == 422
+
+
+async def test_gzip_request_body(client, admin, city):
+    body = gzip.compress(json.dumps({"items": [object_item(city, admin, "ул. Сжатая")]}).encode())
+    
+    response = await client.post(
+        BATCH_URL,
+        content=body,
+        headers={**auth_headers(admin), "Content-Encoding": "gzip", "Content-Type": "application/json"},
+    )
+    
+    assert response.status_code == 200, response.text
+    assert response.json()["results"][0]["status"] == "created"
+
+
+async def test_zstd_request_body_is_bounded(client, admin, monkeypatch):
+    zstandard = pytest.importorskip("zstandard")
+    monkeypatch.setattr(settings, "MAX_DECOMPRESSED_BODY_MB", 1)
+    headers = {**auth_headers(admin), "Content-Encoding": "zstd", "Content-Type": "application/json"}
+    
+    async def post(content: bytes) -> int:
+        return (await client.post(BATCH_URL, content=content, headers=headers)).status_code
+    
+    bomb = zstandard.ZstdCompressor(level=19).compress(b" " * (4 << 20))
+    assert await post(bomb) == 413
+    assert await post(b"not zstd") == 400
+    assert await post(zstandard.ZstdCompressor().compress(b'{"items": []}')) == 422
+
+
+async def test_unsupported_request_encoding(client, admin):
+    response = await client.post(
+        BATCH_URL, content=b"{}", headers={**auth_headers(admin), "Content-Encoding": "br", "Content-Type": "application/json"}
+    )
+    
+    assert response.status_code == 415
+
+
+async def test_delta_sends_only_changed_columns(client, admin, city):
+    headers = auth_headers(admin)
+    object_id = await create_object(client, headers, city, "ул. Дельта 1")
+    cursor = (await read_changes(client, headers, delta="true"))["next_cursor"]
+    
+    await client.patch(f"/api/v1/objects/{object_id}", json={"status": "INTEREST"}, headers=headers)
+    
+    item, = (await read_changes(client, headers, cursor=cursor, delta="true"))["items"]
+    full, = (await read_changes(client, headers, cursor=cursor))["items"]
+    assert item["action"] == "update"
+    assert "status" in item["columns"] and "address" not in item["columns"]
+    assert set(item["data"]) == set(item["columns"])
+    assert item["data"]["status"] == "INTEREST"
+    assert full["columns"] is None and full["data"]["address"] == "ул. Дельта 1"
+
+
+async def test_delta_sends_whole_row_for_new_entities(client, admin, city):
+    headers = auth_headers(admin)
+    cursor = (await read_changes(client, headers))["next_cursor"]
+    object_id = await create_object(client, headers, city, "ул. Дельта 2")
+    await client.patch(f"/api/v1/objects/{object_id}", json={"status": "INTEREST"}, headers=headers)
+    
+    item, = (await read_changes(client, headers, cursor=cursor, delta="true"))["items"]
+    first_sync, = (await read_changes(client, headers, delta="true"))["items"]
+    
+    # Клиент не видел create: дельта не применима, нужна строка целиком
+    assert (item["columns"], item["data"]["address"], item["data"]["status"]) == (None, "ул. Дельта 2", "INTEREST")
+    assert first_sync["columns"] is None
+
+
+async def test_delta_for_bulk_updates(client, admin, city):
+    headers = auth_headers(admin)
+    object_id = await create_object(client, headers, city, "ул. Дельта 3")
+    cursor = (await read_changes(client, headers))["next_cursor"]
+    
+    await client.post(
+        "/api/v1/objects/bulk",
+        json={"items": [{"id": object_id, "type": "MKD", "address": "ул. Дельта 3б", "city_id": str(city.id)}]},
+        headers=headers,
+    )
+    
+    item, = (await read_changes(client, headers, cursor=cursor, delta="true"))["items"]
+    assert "address" in item["columns"] and "status" not in item["columns"]
+    assert item["data"]["address"] == "ул. Дельта 3б"
+
+
+@pytest.fixture
+async def other_city(db):
+    city = City(name="Другой город")
+    db.add(city)
+    await db.commit()
+    return city
+
+
+@pytest.fixture
+async def other_engineer(db, other_city):
+    user = User(email="other@test.ru", hashed_password="-", full_name="Другой", role=UserRole.ENGINEER, city_id=other_city.id)
+    db.add(user)
+    await db.commit()
+    return user
+
+
+def territory(feed: dict) -> list[tuple[str, str, str]]:
+    return sorted((item["table_name"], item["action"], item["id"]) for item in feed["items"])
+
+
+async def test_engineer_feed_is_scoped_to_territory(client, admin, engineer, other_engineer, city, other_city):
+    headers = auth_headers(admin)
+    here = await create_object(client, headers, city, "ул. Здесь")
+    there = await create_object(client, headers, other_city, "ул. Там")
+    
+    tables = "objects,customers"
+    assert territory(await read_changes(client, auth_headers(engineer), tables)) == [("objects", "create", here)]
+    assert territory(await read_changes(client, auth_headers(other_engineer), tables)) == [("objects", "create", there)]
+    assert len((await read_changes(client, headers, tables))["items"]) == 2
+
+
+async def test_moved_object_leaves_old_territory(client, admin, engineer, other_engineer, city, other_city):
+    headers = auth_headers(admin)
+    object_id = await create_object(client, headers, city, "ул. Переезд")
+    customer = await client.post(
+        "/api/v1/customers/", json={"object_id": object_id, "full_name": "Иван", "phone": "+79990000001"}, headers=headers
+    )
+    customer_id = customer.json()["id"]
+    tables = "objects,customers"
+    old_cursor = (await read_changes(client, auth_headers(engineer), tables))["next_cursor"]
+    new_cursor = (await read_changes(client, auth_headers(other_engineer), tables))["next_cursor"]
+    
+    response = await client.patch(f"/api/v1/objects/{object_id}", json={"city_id": str(other_city.id)}, headers=headers)
+    assert response.status_code == 200, response.text
+    
+    old = await read_changes(client, auth_headers(engineer), tables, cursor=old_cursor)
+    new = await read_changes(client, auth_headers(other_engineer), tables, cursor=new_cursor)
+    assert territory(old) == [("customers", "delete", customer_id), ("objects", "delete", object_id)]
+    assert territory(new) == [("customers", "update", customer_id), ("objects", "update", object_id)]
+    assert all(item["data"] for item in new["items"])
+
+
+async def test_moved_object_survives_compaction(client, admin, engineer, other_engineer, city, other_city):
+    """Компакция оставляет последнюю запись сущности - это должна быть запись новой территории"""
+    headers = auth_headers(admin)
+    object_id = await create_object(client, headers, city, "ул. Переезд")
+    customer = await client.post(
+        "/api/v1/customers/", json={"object_id": object_id, "full_name": "Иван", "phone": "+79990000001"}, headers=headers
+    )
+    customer_id = customer.json()["id"]
+    await client.patch(f"/api/v1/objects/{object_id}", json={"city_id": str(other_city.id)}, headers=headers)
+    await age_change_log()
+    
+    await compact()
+    
+    tables = "objects,customers"
+    new = await read_changes(client, auth_headers(other_engineer), tables)
+    assert territory(new) == [("customers", "update", customer_id), ("objects", "update", object_id)]
+    assert (await read_changes(client, auth_headers(engineer), tables))["items"] == []
+
+
+def customer_item(object_id: str, full_name: str, phone: str) -> dict:
+    """Элемент /sync/batch для создания клиента"""
+    return {
+        "client_generated_id": str(uuid4()),
+        "table_name": "customers",
+        "payload": {"object_id": object_id, "full_name": full_name, "phone": phone},
+        "updated_at": "2025-01-01T00:00:00Z",
+    }
+
+
+async def test_failing_item_does_not_roll_back_the_batch(client, admin, city, monkeypatch):
+    monkeypatch.setattr(settings, "SYNC_BATCH_CHUNK_SIZE", 2)
+    headers = auth_headers(admin)
+    object_id = await create_object(client, headers, city, "ул. Клиентская")
+    taken, = await push(client, headers, customer_item(object_id, "Иван", "+79990000001"))
+    assert taken["status"] == "created"
+    items = [
+        customer_item(object_id, "Анна", "+79990000002"),
+        customer_item(object_id, "Дубль", "+79990000001"),  # UNIQUE телефона - падает flush чанка
+        customer_item(object_id, "Олег", "+79990000003"),
+        customer_item(object_id, "Пётр", "+79990000004"),
+    ]
+    
+    results = await push(client, headers, *items)
+    
+    assert [result["status"] for result in results] == ["created", "error", "created", "created"]
+    async with AsyncSessionLocal() as session:
+        names = (await session.execute(select(Customer.full_name).order_by(Customer.full_name))).scalars().all()
+    assert names == ["Анна", "Иван", "Олег", "Пётр"]
+    
+    # Исправленный элемент переотправляется отдельно
+    fixed = dict(items[1], payload=dict(items[1]["payload"], phone="+79990000005"))
+    assert (await push(client, headers, fixed))[0]["status"] == "created"
+
+
+async def test_updated_item_reports_new_server_version(client, admin, city):
+    headers = auth_headers(admin)
+    item = object_item(city, admin, "ул. Версия")
+    await push(client, headers, item)
+    
+    for version in (1, 2):
+        changed = dict(item, payload=dict(item["payload"], address=f"ул. Версия {version}"), version=version)
+        result, = await push(client, headers, changed)
+        assert (result["status"], result["server_version"]) == ("updated", version + 1)
+
+
+async def object_state() -> tuple[int, datetime, int]:
+    """(version, updated_at) единственного объекта и размер журнала"""
+    async with AsyncSessionLocal() as session:
+        obj = (await session.execute(select(Object))).scalar_one()
+        logged = (await session.execute(select(func.count()).select_from(ChangeLog))).scalar_one()
+        return obj.version, obj.updated_at, logged
+
+
+async def test_replayed_item_is_not_written_again(client, admin, city):
+    headers = auth_headers(admin)
+    item = object_item(city, admin, "ул. Повтор")
+    await push(client, headers, item)
+    before = await object_state()
+    
+    replay, = await push(client, headers, item)
+    reordered, = await push(client, headers, dict(item, payload=dict(reversed(list(item["payload"].items()))), version=1))
+    
+    assert (replay["status"], replay["server_version"]) == ("unchanged", 1)
+    assert reordered["status"] == "unchanged"
+    assert await object_state() == before
+
+
+async def test_replay_after_another_write_is_not_suppressed(client, admin, city):
+    headers = auth_headers(admin)
+    item = object_item(city, admin, "ул. Повтор")
+    created, = await push(client, headers, item)
+    response = await client.patch(
+        f"/api/v1/objects/{created['server_id']}", json={"status": "INTEREST", "version": 1}, headers=headers
+    )
+    assert response.status_code == 200, response.text
+    
+    stale, = await push(client, headers, dict(item, version=1))
+    
+    # Сущность изменилась после элемента: повтор - конфликт, а не "unchanged"
+    assert (stale["status"], stale["server_version"]) == ("conflict", 2)
+
+
+async def add_tokens(ages_in_days: list[int]) -> None:
+    async with AsyncSessionLocal() as session:
+        session.add_all(
+            SyncToken(
+                client_generated_id=uuid4(),
+                table_name=("objects", "visits", "customers")[number % 3],
+                server_id=uuid4(),
+                last_seen_at=datetime.utcnow() - timedelta(days=age),
+            )
+            for number, age in enumerate(ages_in_days)
+        )
+        await session.commit()
+
+
+async def test_stale_sync_tokens_are_compacted_in_batches():
+    await add_tokens([200] * 7 + [1] * 5)
+    
+    async with AsyncSessionLocal() as session:
+        report = await SyncService(session).compact_sync_tokens(batch_size=2)
+        left = (await session.execute(select(func.count()).select_from(SyncToken))).scalar_one()
+    
+    assert (report["total"], report["removed"], left) == (12, 7, 5)
+    assert report["by_table"] == {"objects": 4, "visits": 4, "customers": 4}
+
+
+async def test_token_stats_report_growth_since_compaction(client, admin, engineer):
+    await add_tokens([1] * 3)
+    async with AsyncSessionLocal() as session:
+        await SyncService(session).compact_sync_tokens()
+    await add_tokens([0] * 2)
+    
+    response = await client.get("/api/v1/sync/tokens/stats", headers=auth_headers(admin))
+    
+    assert response.status_code == 200, response.text
+    stats = response.json()
+    assert stats["total"] == 5
+    assert stats["growth_per_hour"] > 0
+    assert stats["lookup_p50_ms"] >= 0
+    assert (await client.get("/api/v1/sync/tokens/stats", headers=auth_headers(engineer))).status_code == 403
+
+
+SNAPSHOT_URL = "/api/v1/sync/snapshot"
+
+
+async def build_snapshot(city) -> dict:
+    async with AsyncSessionLocal() as session:
+        return await SyncSnapshotService(session).build(city.id)
+
+
+async def test_snapshot_matches_territory_feed(client, admin, engineer, city, other_city):
+    engineer_headers = auth_headers(engineer)
+    assert (await client.get(f"{SNAPSHOT_URL}/info", headers=engineer_headers)).status_code == 404
+    for address in ("ул. Снимок 1", "ул. Снимок 2"):
+        await create_object(client, auth_headers(admin), city, address)
+    await create_object(client, auth_headers(admin), other_city, "ул. Чужая")
+    await build_snapshot(city)
+    
+    info = (await client.get(f"{SNAPSHOT_URL}/info", headers=engineer_headers)).json()
+    response = await client.get(SNAPSHOT_URL, headers=engineer_headers)
+    
+    assert response.status_code == 200
+    assert response.headers["etag"] == f'"{info["sha256"]}"'
+    assert hashlib.sha256(response.content).hexdigest() == info["sha256"]
+    *items, tail = [json.loads(line) for line in gzip.decompress(response.content).decode().splitlines()]
+    feed = await read_changes(client, engineer_headers, "objects,visits,customers")
+    assert info["items"] == len(items) == 2
+    assert items == feed["items"]
+    assert tail["next_cursor"] == info["cursor"] == response.headers["x-sync-cursor"]
+
+
+async def test_snapshot_range_download(client, admin, engineer, city):
+    await create_object(client, auth_headers(admin), city, "ул. Докачка")
+    await build_snapshot(city)
+    headers = auth_headers(engineer)
+    info = (await client.get(f"{SNAPSHOT_URL}/info", headers=headers)).json()
+    whole = (await client.get(SNAPSHOT_URL, headers=headers)).content
+    size = info["size"]
+    
+    async def get_range(value: str, **extra):
+        return await client.get(SNAPSHOT_URL, headers={**headers, "Range": value, **extra})
+    
+    part = await get_range("bytes=10-19")
+    assert (part.status_code, part.headers["content-range"], part.content) == (206, f"bytes 10-19/{size}", whole[10:20])
+    suffix = await get_range("bytes=-5")
+    assert (suffix.status_code, suffix.content) == (206, whole[-5:])
+    resumed = await get_range("bytes=5-", **{"If-Range": f'"{info["sha256"]}"'})
+    assert (resumed.status_code, resumed.content) == (206, whole[5:])
+    # Снимок пересобран - If-Range не совпадает, файл приходит целиком
+    stale = await get_range("bytes=5-", **{"If-Range": '"stale"'})
+    assert (stale.status_code, stale.content) == (200, whole)
+    beyond = await get_range(f"bytes={size}-")
+    assert (beyond.status_code, beyond.headers["content-range"]) == (416, f"bytes */{size}")
+
+
+async def test_snapshot_is_rebuilt_only_after_changes(client, admin, city):
+    headers = auth_headers(admin)
+    object_id = await create_object(client, headers, city, "ул. Пересборка")
+    first = await build_snapshot(city)
+    
+    assert (await build_snapshot(city))["file"] == first["file"]
+    
+    await client.patch(f"/api/v1/objects/{object_id}", json={"address": "ул. Пересборка 2"}, headers=headers)
+    rebuilt = await build_snapshot(city)
+    
+    assert rebuilt["file"] != first["file"] and rebuilt["seq"] > first["seq"]
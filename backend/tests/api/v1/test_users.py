@@ -0,0 +1,30 @@
+"""
+Тесты эндпойнтов пользователей
+"""
+from tests.conftest import auth_headers
+
+
+async def test_role_change_applies_to_next_request(client, admin, engineer):
+    engineer_headers = auth_headers(engineer)
+    me = (await client.get("/api/v1/users/me", headers=engineer_headers)).json()
+    assert me["role"] == "ENGINEER"
+    
+    response = await client.patch(
+        f"/api/v1/users/{engineer.id}", json={"role": "SUPERVISOR"}, headers=auth_headers(admin)
+    )
+    assert response.status_code == 200, response.text
+    
+    me = (await client.get("/api/v1/users/me", headers=engineer_headers)).json()
+    assert me["role"] == "SUPERVISOR"
+
+
+async def test_deactivated_user_is_rejected_immediately(client, admin, engineer):
+    engineer_headers = auth_headers(engineer)
+    assert (await client.get("/api/v1/users/me", headers=engineer_headers)).status_code == 200
+    
+    response = await client.patch(
+        f"/api/v1/users/{engineer.id}", json={"is_active": False}, headers=auth_headers(admin)
+    )
+    assert response.status_code == 200, response.text
+    
+    assert (await client.get("/api/v1/users/me", headers=engineer_headers)).status_code in (401, 403)
@@ -0,0 +1,30 @@
+"""
+Тесты эндпойнтов визитов
+"""
+from tests.conftest import auth_headers
+
+VISITS_URL = "/api/v1/visits/"
+
+
+async def _create_object(client, headers, city) -> str:
+    response = await client.post(
+        "/api/v1/objects/", json={"type": "MKD", "address": "ул. Тестовая 1", "city_id": str(city.id)}, headers=headers
+    )
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+async def test_list_items_match_detail_response(client, admin, city):
+    headers = auth_headers(admin)
+    object_id = await _create_object(client, headers, city)
+    response = await client.post(
+        VISITS_URL, json={"object_id": object_id, "scheduled_at": "2026-01-01T10:00:00"}, headers=headers
+    )
+    assert response.status_code == 201, response.text
+    detail = (await client.get(f"{VISITS_URL}{response.json()['id']}", headers=headers)).json()
+    
+    page_item, = (await client.get(VISITS_URL, headers=headers)).json()["items"]
+    cursor_item, = (await client.get(VISITS_URL, params={"size": 5}, headers=headers)).json()["items"]
+    
+    assert page_item == cursor_item
+    assert {key: detail[key] for key in page_item} == page_item
@@ -0,0 +1,125 @@
+"""
+Общие фикстуры тестов: временная SQLite-база, клиент API и пользователи
+"""
+import os
+import shutil
+import tempfile
+
+# Окружение задаётся до импорта приложения: engine создаётся из settings при импорте
+_TMP_DIR = tempfile.mkdtemp(prefix="crm-tests-")
+_DB_PATH = os.path.join(_TMP_DIR, "test.db")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_DB_PATH}"
+os.environ["DATABASE_REPLICA_URLS"] = "[]"
+os.environ["JWT_SECRET"] = "test-secret-" + "x" * 32
+os.environ["DEBUG"] = "false"
+os.environ["LOG_LEVEL"] = "ERROR"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["REPORT_QUEUE_BACKEND"] = "local"
+# Redis в тестах недоступен: кэши и пины работают в памяти процесса
+os.environ["REDIS_URL"] = "redis://127.0.0.1:1/0"
+
+import httpx
+import pytest
+from sqlalchemy import event
+
+from app.main import app
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.infrastructure.cache import user_cache
+from app.infrastructure.cache.redis_client import close_redis_client
+from app.infrastructure.db import routing
+from app.infrastructure.db.base import Base, AsyncSessionLocal, engine
+from app.infrastructure.db.change_log import install_change_log_triggers
+from app.infrastructure.db.models import City, User, UserRole
+from app.infrastructure.db.search import install_search_index
+from app.infrastructure.queues import report_queue
+from app.domain.services import sync_service
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_TMP_DIR, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+async def database():
+    """Чистая схема на каждый тест, сброс кэшей процесса"""
+    user_cache._local.clear()
+    routing._local_pins.clear()
+    report_queue._local_queue = None
+    sync_service._token_sample = None
+    
+    await engine.dispose()
+    if os.path.exists(_DB_PATH):
+        os.remove(_DB_PATH)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(install_search_index)
+        await conn.run_sync(install_change_log_triggers)
+    
+    yield
+    
+    await engine.dispose()
+    await close_redis_client()
+
+
+@pytest.fixture(autouse=True)
+def storage(tmp_path, monkeypatch):
+    """Файлы отчётов и снимков - в каталоге теста"""
+    monkeypatch.setattr(settings, "REPORTS_PATH", str(tmp_path / "reports"))
+    monkeypatch.setattr(settings, "SYNC_SNAPSHOT_PATH", str(tmp_path / "snapshots"))
+
+
+@pytest.fixture
+async def db():
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+@pytest.fixture
+async def city(db):
+    city = City(name="Город")
+    db.add(city)
+    await db.commit()
+    return city
+
+
+async def _create_user(db, email: str, role: UserRole, **fields) -> User:
+    user = User(email=email, hashed_password="-", full_name=email, role=role, **fields)
+    db.add(user)
+    await db.commit()
+    return user
+
+
+@pytest.fixture
+async def admin(db):
+    return await _create_user(db, "admin@test.ru", UserRole.ADMIN)
+
+
+@pytest.fixture
+async def engineer(db, city):
+    return await _create_user(db, "engineer@test.ru", UserRole.ENGINEER, city_id=city.id)
+
+
+@pytest.fixture
+def queries():
+    """SQL-запросы к primary, выполненные во время теста"""
+    statements: list[str] = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
+def auth_headers(user: User) -> dict[str, str]:
+    """Заголовок Authorization с access токеном пользователя"""
+    return {"Authorization": "Bearer " + create_access_token({"sub": str(user.id)})}
+
+
+@pytest.fixture
+async def client():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
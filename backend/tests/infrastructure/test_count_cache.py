@@ -0,0 +1,31 @@
+"""
+Тесты кэша total-счётчиков
+"""
+from app.infrastructure.cache.count_cache import filters_hash, _WRITTEN_TABLES_KEY
+from app.infrastructure.db.models import City, ObjectStatus
+
+
+def test_filters_hash_ignores_empty_values_and_key_order():
+    assert filters_hash({"a": 1, "b": None, "c": ""}) == filters_hash({"a": 1})
+    assert filters_hash({"a": 1, "b": 2}) == filters_hash({"b": 2, "a": 1})
+    assert filters_hash({"status": ObjectStatus.INTEREST}) == filters_hash({"status": "INTEREST"})
+    assert filters_hash({"a": 1}) != filters_hash({"a": 2})
+
+
+async def test_written_tables_are_collected_until_commit(db):
+    db.add(City(name="Новый"))
+    await db.flush()
+    
+    assert db.sync_session.info[_WRITTEN_TABLES_KEY] == {"cities"}
+    
+    await db.commit()
+    
+    assert _WRITTEN_TABLES_KEY not in db.sync_session.info
+
+
+async def test_written_tables_are_dropped_on_rollback(db):
+    db.add(City(name="Новый"))
+    await db.flush()
+    await db.rollback()
+    
+    assert _WRITTEN_TABLES_KEY not in db.sync_session.info
@@ -0,0 +1,80 @@
+"""
+Тесты компилятора фильтров и сортировок (белые списки, проверка индексов)
+"""
+from uuid import uuid4
+
+import pytest
+
+from app.core.errors import ValidationError
+from app.core.filters import parse_sort
+from app.infrastructure.db.filtering import (
+    OBJECTS_QUERY,
+    VISITS_QUERY,
+    ObjectFilterParams,
+    _index_supports,
+    filter_values,
+    parse_filters,
+    resolve_sort,
+)
+
+
+def _sort_errors(spec, sort, params=None) -> list[str]:
+    with pytest.raises(ValidationError) as exc_info:
+        resolve_sort(spec, sort, params)
+    return exc_info.value.details["fields"]["sort"]
+
+
+def test_parse_sort_reads_directions():
+    assert parse_sort("-updated_at,+city, status") == {"updated_at": "desc", "city": "asc", "status": "asc"}
+    assert parse_sort("") == {}
+
+
+def test_resolve_sort_defaults_and_accepts_indexed_fields():
+    assert resolve_sort(OBJECTS_QUERY, None) == {"updated_at": "desc"}
+    assert resolve_sort(OBJECTS_QUERY, "status") == {"status": "asc"}
+    assert resolve_sort(VISITS_QUERY, {"scheduled_at": "DESC"}) == {"scheduled_at": "desc"}
+
+
+def test_resolve_sort_rejects_unknown_field_and_direction():
+    errors = _sort_errors(OBJECTS_QUERY, {"address": "asc", "status": "up"})
+    
+    assert any("Unknown sort field 'address'" in error for error in errors)
+    assert any("must be asc or desc" in error for error in errors)
+
+
+def test_resolve_sort_rejects_mixed_directions():
+    errors = _sort_errors(OBJECTS_QUERY, "status,-version")
+    
+    assert errors == ["Mixed sort directions are not supported by table indexes"]
+
+
+def test_resolve_sort_requires_supporting_index():
+    errors = _sort_errors(OBJECTS_QUERY, "version,status")
+    
+    assert errors == ["No index on objects supports sorting by version, status"]
+
+
+def test_index_prefix_fixed_by_equality_filter():
+    index = ("city_id", "status")
+    
+    assert _index_supports(index, ["status"], fixed={"city_id"})
+    assert not _index_supports(index, ["status"], fixed=set())
+    assert _index_supports(index, ["city_id", "status"], fixed={"city_id"})
+
+
+def test_parse_filters_rejects_unknown_keys_and_bad_values():
+    with pytest.raises(ValidationError) as exc_info:
+        parse_filters(OBJECTS_QUERY, {"city": "Москва", "status": "NEW"})
+    assert list(exc_info.value.details["fields"]) == ["city"]
+    
+    with pytest.raises(ValidationError) as exc_info:
+        parse_filters(OBJECTS_QUERY, {"status": "UNKNOWN"})
+    assert list(exc_info.value.details["fields"]) == ["status"]
+
+
+def test_filter_values_skip_empty_filters():
+    city_id = uuid4()
+    params = parse_filters(OBJECTS_QUERY, {"city_id": str(city_id), "q": "дом", "status": None})
+    
+    assert isinstance(params, ObjectFilterParams)
+    assert filter_values(OBJECTS_QUERY, params) == {"city_id": city_id, "q": "дом"}
@@ -0,0 +1,56 @@
+"""
+Тесты базового репозитория: профили загрузки связей, Core-проекции
+"""
+import pytest
+from sqlalchemy.exc import InvalidRequestError
+
+from app.infrastructure.db.base import AsyncSessionLocal
+from app.infrastructure.db.filtering import ObjectFilterParams
+from app.infrastructure.db.models import Object, ObjectStatus, ObjectType
+from app.infrastructure.db.repositories.base import LoadProfile
+from app.infrastructure.db.repositories.object_repository import ObjectRepository
+
+
+@pytest.fixture
+async def object_id(db, city, admin):
+    obj = Object(type=ObjectType.MKD, address="ул. Мира 1", city_id=city.id, created_by=admin.id, responsible_user_id=admin.id)
+    db.add(obj)
+    await db.commit()
+    return obj.id
+
+
+async def test_lean_profile_does_not_load_relations(object_id):
+    async with AsyncSessionLocal() as session:
+        obj = await ObjectRepository(session).get(object_id, LoadProfile.LEAN)
+        
+        assert obj.address == "ул. Мира 1"
+        with pytest.raises(InvalidRequestError):
+            obj.city
+
+
+async def test_detailed_profile_loads_one_level_of_relations(object_id):
+    async with AsyncSessionLocal() as session:
+        obj = await ObjectRepository(session).get(object_id, LoadProfile.DETAILED)
+        
+        assert obj.city.name == "Город"
+        assert obj.responsible_user.email == "admin@test.ru"
+        with pytest.raises(InvalidRequestError):
+            obj.responsible_user.city
+
+
+async def test_default_profile_keeps_model_loading(object_id):
+    async with AsyncSessionLocal() as session:
+        obj = await ObjectRepository(session).get(object_id)
+        
+        assert obj.city.name == "Город"
+
+
+async def test_projection_returns_plain_rows(object_id):
+    async with AsyncSessionLocal() as session:
+        rows, total = await ObjectRepository(session).find_by_filters(
+            ObjectFilterParams(), columns=("id", "address", "status")
+        )
+        
+        assert total == 1
+        assert rows == [{"id": object_id, "address": "ул. Мира 1", "status": ObjectStatus.NEW}]
+        assert not session.identity_map  # Сущности ORM не создавались
@@ -0,0 +1,73 @@
+"""
+Тесты маршрутизации чтения между primary и репликами
+"""
+import itertools
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.infrastructure.db import base, routing
+from app.infrastructure.db.base import Base
+from app.infrastructure.db.models import City
+from tests.conftest import auth_headers
+
+
+@pytest.fixture
+async def replica(tmp_path, monkeypatch):
+    """Пустая реплика: чтение с неё не видит данных primary"""
+    replica_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    async with replica_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sessionmaker = async_sessionmaker(replica_engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr(base, "ReplicaSessionLocals", [sessionmaker])
+    monkeypatch.setattr(base, "_replica_cycle", itertools.cycle([sessionmaker]))
+    yield
+    await replica_engine.dispose()
+
+
+async def test_pin_expires_after_window(monkeypatch):
+    await routing.pin_to_primary("user-1")
+    assert await routing.is_pinned_to_primary("user-1")
+    
+    monkeypatch.setattr(settings, "READ_YOUR_WRITES_SECONDS", 0)
+    await routing.pin_to_primary("user-2")
+    
+    assert not await routing.is_pinned_to_primary("user-2")
+    assert not await routing.is_pinned_to_primary(None)
+
+
+async def test_expired_pins_are_swept_on_write(monkeypatch):
+    monkeypatch.setattr(settings, "READ_YOUR_WRITES_SECONDS", 0)
+    for number in range(100):
+        await routing.pin_to_primary(f"user-{number}")
+    
+    assert len(routing._local_pins) <= 1
+    
+    monkeypatch.setattr(settings, "READ_YOUR_WRITES_SECONDS", 60)
+    await routing.pin_to_primary("active")
+    
+    assert list(routing._local_pins) == ["active"]
+
+
+async def test_session_wrote_after_flush(db):
+    assert not routing.session_wrote(db)
+    
+    db.add(City(name="Новый"))
+    await db.flush()
+    
+    assert routing.session_wrote(db)
+
+
+async def test_reads_go_to_replica_unless_user_just_wrote(client, admin, city, replica):
+    headers = auth_headers(admin)
+    response = await client.post(
+        "/api/v1/objects/", json={"type": "MKD", "address": "ул. Мира 1", "city_id": str(city.id)}, headers=headers
+    )
+    assert response.status_code == 201, response.text
+    
+    # Автор записи читает с primary и видит свой объект
+    assert (await client.get("/api/v1/objects/", headers=headers)).json()["total"] == 1
+    
+    routing._local_pins.clear()
+    assert (await client.get("/api/v1/objects/", headers=headers)).json()["total"] == 0
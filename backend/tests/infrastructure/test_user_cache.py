@@ -0,0 +1,45 @@
+"""
+Тесты кэша аутентифицированных пользователей
+"""
+from app.core.config import settings
+from app.infrastructure.cache import user_cache
+from app.infrastructure.db.models import UserRole
+
+
+async def test_cached_user_round_trips_columns(engineer):
+    await user_cache.cache_user(engineer)
+    
+    cached = await user_cache.get_cached_user(engineer.id)
+    
+    assert cached is not engineer
+    assert (cached.id, cached.email, cached.role, cached.city_id) == (
+        engineer.id, engineer.email, UserRole.ENGINEER, engineer.city_id
+    )
+    assert cached.created_at == engineer.created_at
+    assert "hashed_password" not in user_cache._local[f"user:{engineer.id}"][1]
+
+
+async def test_local_cache_is_bounded_lru(monkeypatch, admin, engineer, city):
+    monkeypatch.setattr(settings, "USER_CACHE_SIZE", 1)
+    
+    await user_cache.cache_user(admin)
+    await user_cache.cache_user(engineer)
+    
+    # Без Redis вытесненный пользователь - промах
+    assert await user_cache.get_cached_user(admin.id) is None
+    assert await user_cache.get_cached_user(engineer.id) is not None
+
+
+async def test_local_entry_expires(monkeypatch, admin):
+    monkeypatch.setattr(settings, "USER_CACHE_LOCAL_TTL_SECONDS", 0)
+    
+    await user_cache.cache_user(admin)
+    
+    assert await user_cache.get_cached_user(admin.id) is None
+
+
+async def test_invalidate_user(admin):
+    await user_cache.cache_user(admin)
+    await user_cache.invalidate_user(admin.id)
+    
+    assert await user_cache.get_cached_user(admin.id) is None
@@ -0,0 +1,28 @@
+"""
+Прогон симулятора офлайн-синхронизации на минимальной нагрузке
+"""
+import subprocess
+import sys
+from pathlib import Path
+
+SCRIPT = Path(__file__).resolve().parents[2] / "scripts" / "bench_offline_sync.py"
+
+
+def test_simulator_runs_all_scenarios(tmp_path):
+    result = subprocess.run(
+        [
+            sys.executable, str(SCRIPT),
+            "--engineers", "2", "--territories", "1", "--objects", "5",
+            "--batches", "2", "--batch-size", "5", "--scenario", "all",
+            "--database-url", f"sqlite+aiosqlite:///{tmp_path / 'bench.db'}",
+        ],
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    
+    assert result.returncode == 0, result.stderr
+    for scenario in ("[push]", "[pull]", "[mixed]"):
+        assert scenario in result.stdout
+    # Пачки симулятора валидны: ошибки элементов означали бы поломку /sync/batch
+    assert "error" not in result.stdout
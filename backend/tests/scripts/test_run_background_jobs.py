@@ -0,0 +1,72 @@
+"""
+Фоновые циклы: выключены в процессах API, выполняются отдельным скриптом
+"""
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.config import Settings
+from app.infrastructure.db.base import Base
+from app.infrastructure.db.change_log import install_change_log_triggers
+from app.infrastructure.db.models import City, Object, ObjectType, User, UserRole
+
+SCRIPT = Path(__file__).resolve().parents[2] / "scripts" / "run_background_jobs.py"
+
+
+def test_loops_are_disabled_in_api_processes_by_default():
+    for name in (
+        "AUDIT_OUTBOX_DRAINER_ENABLED",
+        "SYNC_COMPACTION_ENABLED",
+        "SYNC_TOKEN_COMPACTION_ENABLED",
+        "SYNC_SNAPSHOT_ENABLED",
+    ):
+        assert Settings.model_fields[name].default is False, name
+
+
+async def _seed(database_url: str) -> None:
+    engine = create_async_engine(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(install_change_log_triggers)
+    async with async_sessionmaker(engine)() as session:
+        city = City(name="Город")
+        session.add(city)
+        await session.flush()
+        engineer = User(email="e@test.ru", hashed_password="-", full_name="E", role=UserRole.ENGINEER, city_id=city.id)
+        session.add(engineer)
+        await session.flush()
+        session.add(Object(type=ObjectType.MKD, address="ул. Фоновая 1", city_id=city.id, created_by=engineer.id))
+        await session.commit()
+    await engine.dispose()
+
+
+async def test_script_builds_snapshots_and_stops_on_sigint(tmp_path):
+    database_url = f"sqlite+aiosqlite:///{tmp_path / 'jobs.db'}"
+    await _seed(database_url)
+    snapshots = tmp_path / "snapshots"
+    env = {**os.environ, "DATABASE_URL": database_url, "SYNC_SNAPSHOT_PATH": str(snapshots)}
+    
+    process = subprocess.Popen(
+        [sys.executable, str(SCRIPT), "--jobs", "snapshots", "compaction"],
+        cwd=tmp_path,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    try:
+        for _ in range(100):
+            if list(snapshots.glob("*.ndjson.gz")):
+                break
+            await asyncio.sleep(0.1)
+        process.send_signal(signal.SIGINT)
+        _, stderr = process.communicate(timeout=30)
+    finally:
+        process.kill()
+    
+    assert len(list(snapshots.glob("*.ndjson.gz"))) == 1
+    assert process.returncode == 0, stderr.decode()